@@ -1,82 +1,54 @@
-from apps.authentication.models import Profile, Contact
-from apps.products.models import Product
-from apps.orders.models import Order, Cart, CartItem
-from django.db.models import F, Sum
+from django.utils.functional import SimpleLazyObject
 
+from apps.authentication.navbar import (
+    get_cart_count,
+    get_guest_profiles,
+    get_stock_alerts,
+    get_pending_orders,
+    get_user_feedback,
+)
 
-def guest_profiles_context(request):
-    # Fetch all profiles with the role "guest"
-    guest_profiles = Profile.objects.filter(role="guest")
+# Every value below is lazy: nothing touches the cache or the database unless
+# the template actually renders it, and each listing is fetched at most once
+# per request even when both its items and its count are used.
 
-    # Calculate the number of guest profiles
-    guest_count = guest_profiles.count()
 
-    # Return context dictionary
+def _lazy_listing(builder, items_name, count_name):
+    listing = SimpleLazyObject(builder)
     return {
-        "guest_profiles": guest_profiles,
-        "guest_count": guest_count,
+        items_name: SimpleLazyObject(lambda: listing["items"]),
+        count_name: SimpleLazyObject(lambda: listing["count"]),
     }
 
 
-def guest_user_feedback_context(request):
-    # Fetch all invalid feedback entries
-    user_feedback = Contact.objects.filter(is_valid=False)
+def guest_profiles_context(request):
+    # Profiles with the role "guest" and how many there are
+    return _lazy_listing(get_guest_profiles, "guest_profiles", "guest_count")
 
-    # Calculate the count of invalid feedback entries
-    feedback_count = user_feedback.count()
 
-    # Return context dictionary
-    return {
-        "user_feedback": user_feedback,
-        "feedback_count": feedback_count,
-    }
+def guest_user_feedback_context(request):
+    # Feedback entries that have not been validated yet
+    return _lazy_listing(get_user_feedback, "user_feedback", "feedback_count")
 
 
 def low_stock_alerts_context(request):
-    # Fetch all products along with their inventory
-    products = Product.objects.select_related("inventory").all()
-
-    # Filter products with low stock based on inventory
-    low_stock_products = products.filter(
-        inventory__quantity__lte=F("inventory__low_stock_threshold")
-    )
-
-    # Count of low stock products
-    low_stock_count = low_stock_products.count()
-
-    return {
-        "low_stock_products": low_stock_products,
-        "low_stock_count": low_stock_count,
-    }
+    # Open stock alerts: products at or below their low stock threshold
+    return _lazy_listing(get_stock_alerts, "stock_alerts", "low_stock_count")
 
 
 def pending_orders_context(request):
-    # Fetch orders with statuses "Pending" or "Out for Delivery"
-    pending_and_out_for_delivery = Order.objects.filter(
-        status__in=["Pending", "Out for Delivery"]
-    ).select_related("customer")
-
-    # Count the total number of pending and Out for Delivery orders
-    pending_and_out_for_delivery_count = pending_and_out_for_delivery.count()
-
-    return {
-        "pending_and_out_for_delivery": pending_and_out_for_delivery,
-        "pending_orders_count": pending_and_out_for_delivery_count,
-    }
+    # Orders with statuses "Pending" or "Out for Delivery"
+    return _lazy_listing(
+        get_pending_orders, "pending_and_out_for_delivery", "pending_orders_count"
+    )
 
 
 def cart_count_user_context(request):
-    cart_count_user = 0
-
-    if request.user.is_authenticated:
-        cart, _ = Cart.objects.get_or_create(user=request.user)
-        cart_count_user = (
-            CartItem.objects.filter(cart=cart).aggregate(
-                total_quantity=Sum("quantity")
-            )["total_quantity"]
-            or 0
-        )
+    def cart_count_user():
+        if not request.user.is_authenticated:
+            return 0
+        return get_cart_count(request.user.id)
 
     return {
-        "cart_count_user": cart_count_user,
+        "cart_count_user": SimpleLazyObject(cart_count_user),
     }
@@ -0,0 +1,132 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.authentication.models import Profile, Contact
+from apps.inventory.models import StockAlert
+from apps.orders.models import Order, Cart, CartItem
+from apps.orders.services import get_cart_summary, invalidate_cart_summary
+
+
+# Navbar badges tolerate being a minute stale; signals below clear them sooner
+NAVBAR_CACHE_TIMEOUT = 60
+
+# Dropdowns only ever show the most recent entries; the badge carries the total
+NAVBAR_DROPDOWN_LIMIT = 10
+
+GUEST_PROFILES_KEY = "navbar:guest_profiles"
+USER_FEEDBACK_KEY = "navbar:user_feedback"
+LOW_STOCK_KEY = "navbar:low_stock"
+PENDING_ORDERS_KEY = "navbar:pending_orders"
+
+
+# =================================== Cached builders ===================================
+def _cached_listing(key, queryset):
+    """Return ``{"items": [...], "count": n}`` for ``queryset`` through the cache."""
+
+    def build():
+        return {
+            "items": list(queryset[:NAVBAR_DROPDOWN_LIMIT]),
+            "count": queryset.count(),
+        }
+
+    return cache.get_or_set(key, build, NAVBAR_CACHE_TIMEOUT)
+
+
+def get_guest_profiles():
+    return _cached_listing(
+        GUEST_PROFILES_KEY,
+        Profile.objects.filter(role="guest").select_related("user").order_by("-id"),
+    )
+
+
+def get_user_feedback():
+    return _cached_listing(
+        USER_FEEDBACK_KEY,
+        Contact.objects.filter(is_valid=False).order_by("-created_at"),
+    )
+
+
+def get_stock_alerts():
+    return _cached_listing(
+        LOW_STOCK_KEY,
+        StockAlert.objects.filter(resolved_at__isnull=True)
+        .select_related("product__inventory")
+        .order_by("-raised_at", "-id"),
+    )
+
+
+def get_pending_orders():
+    return _cached_listing(
+        PENDING_ORDERS_KEY,
+        Order.objects.filter(status__in=["Pending", "Out for Delivery"])
+        .select_related("customer")
+        .order_by("-created_at"),
+    )
+
+
+def get_cart_count(user_id):
+    return get_cart_summary(user_id)["count"]
+
+
+# =================================== Invalidation ===================================
+def invalidate_navbar_cache(*keys):
+    """Drop cached navbar entries once the current transaction has committed."""
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def profile_changed(sender, instance, **kwargs):
+    invalidate_navbar_cache(GUEST_PROFILES_KEY)
+
+
+@receiver(post_save, sender=Contact)
+@receiver(post_delete, sender=Contact)
+def contact_changed(sender, instance, **kwargs):
+    invalidate_navbar_cache(USER_FEEDBACK_KEY)
+
+
+@receiver(post_save, sender=StockAlert)
+@receiver(post_delete, sender=StockAlert)
+def stock_alert_changed(sender, instance, **kwargs):
+    invalidate_navbar_cache(LOW_STOCK_KEY)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_changed(sender, instance, **kwargs):
+    invalidate_navbar_cache(PENDING_ORDERS_KEY)
+
+
+def _cart_user_key(cart_id):
+    return f"navbar:cart_user:{cart_id}"
+
+
+def _cart_user_id(cart_id):
+    # A cart belongs to one user for life, so the lookup is safe to cache;
+    # emptying a cart fires this receiver once per item otherwise
+    return cache.get_or_set(
+        _cart_user_key(cart_id),
+        lambda: Cart.objects.filter(pk=cart_id)
+        .values_list("user_id", flat=True)
+        .first(),
+        NAVBAR_CACHE_TIMEOUT,
+    )
+
+
+@receiver(post_delete, sender=Cart)
+def cart_deleted(sender, instance, **kwargs):
+    cache.delete(_cart_user_key(instance.pk))
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def cart_item_changed(sender, instance, **kwargs):
+    if CartItem._meta.get_field("cart").is_cached(instance):
+        user_id = instance.cart.user_id
+    else:
+        user_id = _cart_user_id(instance.cart_id)
+    if user_id:
+        invalidate_cart_summary(user_id)
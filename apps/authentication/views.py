@@ -4,7 +4,6 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView, PasswordChangeView, PasswordResetView
 from django.contrib.messages.views import SuccessMessageMixin
 from django.core.exceptions import ObjectDoesNotExist
-from django.core.mail import send_mail
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from django.db import transaction
 from django.http import (
@@ -19,6 +18,7 @@ from apps.authentication.decorators import (
     admin_or_manager_required,
     admin_required,
 )
+from apps.main.services import queue_email
 
 from .forms import (
     ContactForm,
@@ -242,25 +242,16 @@ def send_contact_email(name, email):
         "Management"
     )
 
-    from_email = getattr(settings, "EMAIL_HOST_USER", None)
-    recipients = [email]  # Send to user
-
-    # Send confirmation email to user
-    try:
-        send_mail(subject, message, from_email, recipients)
-    except Exception as e:
-        logger.error(f"Error sending email to {email}: {str(e)}")
+    # Queue confirmation email to user; the send_queued_emails worker delivers it
+    if not queue_email(subject, [email], body=message):
+        logger.error(f"Could not queue email to {email}")
         return False
 
-    # Send notification email to ED_EMAIL
+    # Queue notification email to ED_EMAIL
     if hasattr(settings, "ED_EMAIL") and settings.ED_EMAIL:
         admin_subject = f"New Contact Form Submission from {name}"
         admin_message = f"New message received from {name} ({email}). Please check the system for details."
-
-        try:
-            send_mail(admin_subject, admin_message, from_email, [settings.ED_EMAIL])
-        except Exception as e:
-            logger.error(f"Error sending email to {settings.ED_EMAIL}: {str(e)}")
+        queue_email(admin_subject, [settings.ED_EMAIL], body=admin_message)
 
     return True
 
@@ -1 +1,6 @@
+from django.contrib import admin
+
 # Register your models here.
+from .models import AccountBalanceSnapshot
+
+admin.site.register(AccountBalanceSnapshot)
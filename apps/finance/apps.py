@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FinanceConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.finance"
+
+    def ready(self):
+        import apps.finance.signals  # noqa
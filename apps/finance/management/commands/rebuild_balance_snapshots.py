@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.finance.services import rebuild_balance_snapshots
+
+
+class Command(BaseCommand):
+    help = "Rebuild the monthly AccountBalanceSnapshot rows from the full Transaction history."
+
+    def handle(self, *args, **options):
+        count = rebuild_balance_snapshots()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {count} account balance snapshot rows.")
+        )
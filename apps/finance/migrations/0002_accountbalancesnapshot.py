@@ -0,0 +1,113 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:17
+
+import calendar
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncMonth
+import django.db.models.deletion
+
+
+def backfill_account_balance_snapshots(apps, schema_editor):
+    Transaction = apps.get_model("finance", "Transaction")
+    AccountBalanceSnapshot = apps.get_model("finance", "AccountBalanceSnapshot")
+
+    snapshots = []
+    cumulative = {}
+    for row in (
+        Transaction.objects.annotate(month=TruncMonth("transaction_date"))
+        .values("account_id", "month")
+        .annotate(
+            debit=Sum("amount", filter=Q(transaction_type="debit")),
+            credit=Sum("amount", filter=Q(transaction_type="credit")),
+        )
+        .order_by("account_id", "month")
+    ):
+        debit, credit = cumulative.get(row["account_id"], (Decimal(0), Decimal(0)))
+        debit += row["debit"] or 0
+        credit += row["credit"] or 0
+        cumulative[row["account_id"]] = (debit, credit)
+        month = row["month"]
+        snapshots.append(
+            AccountBalanceSnapshot(
+                account_id=row["account_id"],
+                period_end=month.replace(
+                    day=calendar.monthrange(month.year, month.month)[1]
+                ),
+                cumulative_debit=debit,
+                cumulative_credit=credit,
+            )
+        )
+    AccountBalanceSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("finance", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AccountBalanceSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("period_end", models.DateField(verbose_name="Period End")),
+                (
+                    "cumulative_debit",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=16,
+                        verbose_name="Cumulative Debit",
+                    ),
+                ),
+                (
+                    "cumulative_credit",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=16,
+                        verbose_name="Cumulative Credit",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+                ),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="balance_snapshots",
+                        to="finance.chartofaccounts",
+                        verbose_name="Account",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Account Balance Snapshot",
+                "verbose_name_plural": "Account Balance Snapshots",
+                "db_table": "account_balance_snapshots",
+                "ordering": ["account", "period_end"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="accountbalancesnapshot",
+            constraint=models.UniqueConstraint(
+                fields=("account", "period_end"), name="account_balance_snapshot_uniq"
+            ),
+        ),
+        migrations.RunPython(
+            backfill_account_balance_snapshots, migrations.RunPython.noop
+        ),
+    ]
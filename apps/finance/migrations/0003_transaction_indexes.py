@@ -0,0 +1,26 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("finance", "0002_accountbalancesnapshot"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["account", "transaction_date", "id"],
+                name="transaction_account_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["transaction_date"], name="transaction_date_idx"
+            ),
+        ),
+    ]
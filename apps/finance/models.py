@@ -74,5 +74,57 @@ class Transaction(models.Model):
     transaction_date = models.DateField(verbose_name="Date of Transaction")
     description = models.TextField(null=True, blank=True, verbose_name="Narrations")
 
+    class Meta:
+        indexes = [
+            # Ledger pages walk one account in (date, id) keyset order
+            models.Index(
+                fields=["account", "transaction_date", "id"],
+                name="transaction_account_date_idx",
+            ),
+            # Statements scan every account over a date range
+            models.Index(fields=["transaction_date"], name="transaction_date_idx"),
+        ]
+
     def __str__(self):
         return f"{self.transaction_type.title()} of {self.amount} on {self.transaction_date}"
+
+
+# =================================== AccountBalanceSnapshot Model ===================================
+class AccountBalanceSnapshot(models.Model):
+    """
+    Cumulative debits and credits of an account up to the end of a month.
+
+    Rows exist for months with activity and are kept current by
+    apps.finance.signals; balances start from the nearest one and only scan
+    the transactions after it.
+    """
+
+    account = models.ForeignKey(
+        "ChartOfAccounts",
+        on_delete=models.CASCADE,
+        related_name="balance_snapshots",
+        verbose_name="Account",
+    )
+    period_end = models.DateField(verbose_name="Period End")
+    cumulative_debit = models.DecimalField(
+        max_digits=16, decimal_places=2, default=0, verbose_name="Cumulative Debit"
+    )
+    cumulative_credit = models.DecimalField(
+        max_digits=16, decimal_places=2, default=0, verbose_name="Cumulative Credit"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated at")
+
+    class Meta:
+        db_table = "account_balance_snapshots"
+        verbose_name = "Account Balance Snapshot"
+        verbose_name_plural = "Account Balance Snapshots"
+        ordering = ["account", "period_end"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["account", "period_end"],
+                name="account_balance_snapshot_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.account} @ {self.period_end}"
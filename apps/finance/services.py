@@ -0,0 +1,444 @@
+import calendar
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import (
+    Case,
+    DecimalField,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+    Window,
+)
+from django.db.models.functions import TruncMonth
+
+from apps.sales.models import SaleDetail
+from apps.sales.services import ITEM_COGS
+
+from .models import AccountBalanceSnapshot, ChartOfAccounts, Transaction
+
+
+ZERO = Decimal("0.00")
+AMOUNT_FIELD = DecimalField(max_digits=14, decimal_places=2)
+
+
+def _amount_if(transaction_type):
+    return Case(
+        When(transaction_type=transaction_type, then=F("amount")),
+        default=Value(ZERO),
+        output_field=AMOUNT_FIELD,
+    )
+
+
+def _sum_of(transaction_type):
+    return Sum(_amount_if(transaction_type))
+
+
+# =================================== Balance snapshots ===================================
+# Accounts touched inside the current transaction -> earliest date touched
+_pending_refreshes = threading.local()
+
+
+def _as_date(day):
+    # Dates may arrive as raw query-string or POST values
+    return Transaction._meta.get_field("transaction_date").to_python(day)
+
+
+def _month_end(day):
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def _build_snapshots(account_id, months, debit=ZERO, credit=ZERO):
+    """Cumulative snapshots from ``months`` rows, starting at ``debit``/``credit``."""
+    snapshots = []
+    for row in months:
+        debit += row["debit"] or ZERO
+        credit += row["credit"] or ZERO
+        snapshots.append(
+            AccountBalanceSnapshot(
+                account_id=account_id,
+                period_end=_month_end(row["month"]),
+                cumulative_debit=debit,
+                cumulative_credit=credit,
+            )
+        )
+    return snapshots
+
+
+def _monthly_totals(transactions):
+    return (
+        transactions.annotate(month=TruncMonth("transaction_date"))
+        .values("account_id", "month")
+        .annotate(debit=_sum_of("debit"), credit=_sum_of("credit"))
+        .order_by("account_id", "month")
+    )
+
+
+@transaction.atomic
+def rebuild_balance_snapshots():
+    """Rebuild every snapshot from the full Transaction history. Returns the row count."""
+    snapshots = []
+    for account_id, months in groupby(
+        _monthly_totals(Transaction.objects.all()), key=itemgetter("account_id")
+    ):
+        snapshots += _build_snapshots(account_id, months)
+
+    AccountBalanceSnapshot.objects.all().delete()
+    AccountBalanceSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+    return len(snapshots)
+
+
+@transaction.atomic
+def refresh_balance_snapshots(account_id, since):
+    """
+    Recompute an account's snapshots from the month of ``since`` onwards.
+    The account row is locked first, so concurrent refreshes of the same
+    account run one after the other instead of colliding on period_end.
+    """
+    ChartOfAccounts.objects.select_for_update().filter(pk=account_id).first()
+    month_start = _as_date(since).replace(day=1)
+    previous = (
+        AccountBalanceSnapshot.objects.filter(
+            account_id=account_id, period_end__lt=month_start
+        )
+        .order_by("-period_end")
+        .first()
+    )
+    snapshots = _build_snapshots(
+        account_id,
+        _monthly_totals(
+            Transaction.objects.filter(
+                account_id=account_id, transaction_date__gte=month_start
+            )
+        ),
+        previous.cumulative_debit if previous else ZERO,
+        previous.cumulative_credit if previous else ZERO,
+    )
+
+    AccountBalanceSnapshot.objects.filter(
+        account_id=account_id, period_end__gte=month_start
+    ).delete()
+    AccountBalanceSnapshot.objects.bulk_create(snapshots)
+
+
+def schedule_snapshot_refresh(account_id, day):
+    """Refresh ``account_id``'s snapshots from ``day`` once the transaction commits."""
+    pending = getattr(_pending_refreshes, "accounts", None)
+    if pending is None:
+        pending = _pending_refreshes.accounts = {}
+    day = _as_date(day)
+    pending[account_id] = min(day, pending.get(account_id, day))
+    transaction.on_commit(_flush_pending_refreshes)
+
+
+def _flush_pending_refreshes():
+    pending = getattr(_pending_refreshes, "accounts", None) or {}
+    _pending_refreshes.accounts = {}
+    for account_id, since in pending.items():
+        refresh_balance_snapshots(account_id, since)
+
+
+def get_cumulative_totals(before, account=None):
+    """
+    ``{account_id: {"debit", "credit"}}`` over all transactions dated before ``before``.
+
+    Snapshots close every month an account has postings in, so each account
+    starts from its latest snapshot and only the postings from the start of
+    ``before``'s month are summed. Accounts without a snapshot yet have their
+    earlier postings summed in full.
+    """
+    before = _as_date(before)
+    month_start = before.replace(day=1)
+    latest = AccountBalanceSnapshot.objects.filter(period_end__lt=month_start).order_by(
+        "-period_end"
+    )
+
+    accounts = ChartOfAccounts.objects.annotate(
+        snapshot_debit=Subquery(
+            latest.filter(account=OuterRef("pk")).values("cumulative_debit")[:1]
+        ),
+        snapshot_credit=Subquery(
+            latest.filter(account=OuterRef("pk")).values("cumulative_credit")[:1]
+        ),
+    )
+    transactions = Transaction.objects.all()
+    if account is not None:
+        accounts = accounts.filter(pk=account.pk)
+        transactions = transactions.filter(account=account)
+
+    totals, unsnapshotted = {}, []
+    for row in accounts.values("id", "snapshot_debit", "snapshot_credit"):
+        if row["snapshot_debit"] is None:
+            unsnapshotted.append(row["id"])
+        totals[row["id"]] = {
+            "debit": row["snapshot_debit"] or ZERO,
+            "credit": row["snapshot_credit"] or ZERO,
+        }
+
+    tails = [
+        transactions.filter(
+            transaction_date__gte=month_start, transaction_date__lt=before
+        )
+    ]
+    if unsnapshotted:
+        tails.append(
+            transactions.filter(
+                account_id__in=unsnapshotted, transaction_date__lt=month_start
+            )
+        )
+    for tail in tails:
+        for row in (
+            tail.values("account_id")
+            .annotate(debit=_sum_of("debit"), credit=_sum_of("credit"))
+            .order_by()
+        ):
+            totals[row["account_id"]]["debit"] += row["debit"] or ZERO
+            totals[row["account_id"]]["credit"] += row["credit"] or ZERO
+    return totals
+
+
+# =================================== Statement engine ===================================
+def get_account_totals(start_date, end_date):
+    """
+    Debit, credit and gross totals per account for the period.
+
+    Computed as the difference of the cumulative totals at both ends of the
+    period, each of which starts from the accounts' balance snapshots. Only
+    accounts with movement in the period are returned, by account number.
+    """
+    opening = get_cumulative_totals(start_date)
+    closing = get_cumulative_totals(_as_date(end_date) + timedelta(days=1))
+
+    rows = []
+    for account in ChartOfAccounts.objects.only(
+        "account_name", "account_number", "account_type"
+    ):
+        debit = closing[account.id]["debit"] - opening[account.id]["debit"]
+        credit = closing[account.id]["credit"] - opening[account.id]["credit"]
+        if not debit and not credit:
+            continue
+        rows.append(
+            {
+                "id": account.id,
+                "name": account.account_name,
+                "number": account.account_number,
+                "type": account.account_type,
+                "label": f"{account.account_number} - {account.account_name}",
+                "debit": debit,
+                "credit": credit,
+                "net": debit - credit,
+                "total": debit + credit,
+            }
+        )
+    return rows
+
+
+def get_sales_totals(start_date, end_date):
+    """Sales revenue (price actually charged) and COGS for the period in one query."""
+    totals = SaleDetail.objects.filter(
+        sale__trans_date__range=(start_date, end_date)
+    ).aggregate(revenue=Sum(F("quantity") * F("price")), cogs=Sum(ITEM_COGS))
+    return {
+        "revenue": Decimal(str(totals["revenue"] or 0)).quantize(ZERO),
+        "cogs": totals["cogs"] or ZERO,
+    }
+
+
+def build_profit_and_loss(start_date, end_date):
+    """Figures for the profit and loss statement of the period."""
+    accounts = get_account_totals(start_date, end_date)
+    sales = get_sales_totals(start_date, end_date)
+
+    other_income = [
+        account
+        for account in accounts
+        if account["type"] == "revenue" and account["name"] != "Sales Revenue"
+    ]
+    expenses = [account for account in accounts if account["type"] == "expense"]
+
+    total_other_income = sum((account["total"] for account in other_income), ZERO)
+    total_expenses = sum((account["total"] for account in expenses), ZERO)
+    gross_profit = sales["revenue"] - sales["cogs"]
+
+    return {
+        "sales_revenue": sales["revenue"],
+        "cogs": sales["cogs"],
+        "other_income": other_income,
+        "total_other_income": total_other_income,
+        "total_income": sales["revenue"] + total_other_income,
+        "expenses": expenses,
+        "total_expenses": total_expenses,
+        "gross_profit": gross_profit,
+        "net_profit": gross_profit + total_other_income - total_expenses,
+    }
+
+
+def build_balance_sheet(start_date, end_date):
+    """Figures for the statement of financial position of the period."""
+    accounts = get_account_totals(start_date, end_date)
+    sales = get_sales_totals(start_date, end_date)
+
+    def net_of(account_type):
+        return sum(
+            (account["net"] for account in accounts if account["type"] == account_type),
+            ZERO,
+        )
+
+    def total_of(account_type):
+        return sum(
+            (
+                account["total"]
+                for account in accounts
+                if account["type"] == account_type
+            ),
+            ZERO,
+        )
+
+    assets = net_of("asset")
+    equity = total_of("equity")
+    gross_profit = sales["revenue"] - sales["cogs"]
+    net_income = gross_profit + total_of("revenue") - total_of("expense")
+
+    return {
+        "assets": assets,
+        # Kept balancing: assets = liabilities + equity
+        "liabilities": assets - equity,
+        "equity": equity,
+        "net_income": net_income,
+        "retained_earnings": equity + net_income,
+    }
+
+
+# =================================== Ledger ===================================
+LEDGER_PAGE_SIZE = 100
+
+SIGNED_AMOUNT = Case(
+    When(transaction_type="debit", then=F("amount")),
+    When(transaction_type="credit", then=-F("amount")),
+    default=Value(ZERO),
+    output_field=AMOUNT_FIELD,
+)
+
+
+def _ledger_order():
+    return [F("transaction_date").asc(), F("id").asc()]
+
+
+def encode_ledger_cursor(entry):
+    return f"{entry.transaction_date.isoformat()}_{entry.id}"
+
+
+def decode_ledger_cursor(cursor):
+    """``(date, id)`` of the last entry on the previous page, or None if invalid."""
+    try:
+        day, pk = cursor.split("_")
+        return date.fromisoformat(day), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def get_balance_before(account, start_date, after=None):
+    """
+    Balance carried into a ledger page.
+
+    The opening balance at ``start_date`` comes from the account's nearest
+    snapshot plus its tail; with a ``(date, id)`` cursor the period's entries
+    up to it are added in one more aggregate.
+    """
+    opening = get_cumulative_totals(start_date, account)[account.id]
+    balance = opening["debit"] - opening["credit"]
+    if after:
+        after_date, after_id = after
+        balance += (
+            Transaction.objects.filter(
+                Q(transaction_date__lt=after_date)
+                | Q(transaction_date=after_date, id__lte=after_id),
+                account=account,
+                transaction_date__gte=start_date,
+            ).aggregate(balance=Sum(SIGNED_AMOUNT))["balance"]
+            or ZERO
+        )
+    return balance
+
+
+def get_ledger_totals(account, start_date, end_date):
+    """Total debits and credits of the account in the period, in one aggregate."""
+    totals = Transaction.objects.filter(
+        account=account, transaction_date__range=(start_date, end_date)
+    ).aggregate(debits=_sum_of("debit"), credits=_sum_of("credit"))
+    return {
+        "debits": totals["debits"] or ZERO,
+        "credits": totals["credits"] or ZERO,
+    }
+
+
+def get_ledger_entries(account, start_date, end_date, after=None):
+    """
+    The account's entries in the period, oldest first, each annotated with its
+    ``debit``, ``credit`` and ``running_movement``.
+
+    ``running_movement`` is a window sum of the signed amounts from the first
+    returned row, so adding the balance carried in gives the running balance.
+    ``after`` is a ``(date, id)`` keyset cursor to start past.
+    """
+    entries = Transaction.objects.filter(
+        account=account, transaction_date__range=(start_date, end_date)
+    )
+    if after:
+        after_date, after_id = after
+        entries = entries.filter(
+            Q(transaction_date__gt=after_date)
+            | Q(transaction_date=after_date, id__gt=after_id)
+        )
+    return entries.annotate(
+        debit=_amount_if("debit"),
+        credit=_amount_if("credit"),
+        running_movement=Window(Sum(SIGNED_AMOUNT), order_by=_ledger_order()),
+    ).order_by(*_ledger_order())
+
+
+def get_ledger_page(account, start_date, end_date, cursor=None):
+    """
+    One keyset page of the ledger with running balances.
+
+    Returns the entries, the balance brought forward and the cursor of the next
+    page (None on the last page). Cost does not grow with the page number.
+    """
+    after = decode_ledger_cursor(cursor) if cursor else None
+    balance_before = get_balance_before(account, start_date, after)
+    entries = list(
+        get_ledger_entries(account, start_date, end_date, after)[: LEDGER_PAGE_SIZE + 1]
+    )
+
+    next_cursor = None
+    if len(entries) > LEDGER_PAGE_SIZE:
+        entries = entries[:LEDGER_PAGE_SIZE]
+        next_cursor = encode_ledger_cursor(entries[-1])
+
+    for entry in entries:
+        entry.running_balance = balance_before + entry.running_movement
+    return entries, balance_before, next_cursor
+
+
+def iter_ledger_rows(account, start_date, end_date, chunk_size=2000):
+    """Yield every ledger row of the period for export, streaming from the database."""
+    opening_balance = get_balance_before(account, start_date)
+    yield ("", "Opening Balance", "", "", opening_balance)
+    for entry in get_ledger_entries(account, start_date, end_date).iterator(
+        chunk_size=chunk_size
+    ):
+        yield (
+            entry.transaction_date.isoformat(),
+            entry.description or "",
+            entry.debit,
+            entry.credit,
+            opening_balance + entry.running_movement,
+        )
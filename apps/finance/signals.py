@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Transaction
+from .services import schedule_snapshot_refresh
+
+
+# =================================== Balance snapshot upkeep ===================================
+@receiver(pre_save, sender=Transaction)
+def remember_previous_position(sender, instance, **kwargs):
+    # Refreshed in post_save: a transaction moved to another account or date
+    # leaves its old spot stale, but only once the row has actually moved
+    instance._previous_position = (
+        Transaction.objects.filter(pk=instance.pk)
+        .values_list("account_id", "transaction_date")
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def transaction_changed(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_position", None)
+    if previous:
+        schedule_snapshot_refresh(*previous)
+    schedule_snapshot_refresh(instance.account_id, instance.transaction_date)
@@ -1 +1,286 @@
-# Create your tests here.
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.products.models import Product
+from apps.sales.models import Sale, SaleDetail
+
+from .models import AccountBalanceSnapshot, ChartOfAccounts, Transaction
+from .services import (
+    ZERO,
+    build_balance_sheet,
+    build_profit_and_loss,
+    get_cumulative_totals,
+    get_ledger_page,
+    iter_ledger_rows,
+    rebuild_balance_snapshots,
+)
+
+
+class BalanceSnapshotTests(TestCase):
+    def setUp(self):
+        self.cash = ChartOfAccounts.objects.create(
+            account_name="Cash", account_type="asset", account_number="1000"
+        )
+        self.rent = ChartOfAccounts.objects.create(
+            account_name="Rent", account_type="expense", account_number="5000"
+        )
+
+    def post(self, account, amount, transaction_type, day):
+        # Snapshots are refreshed when the posting commits
+        with self.captureOnCommitCallbacks(execute=True):
+            return Transaction.objects.create(
+                account=account,
+                amount=Decimal(amount),
+                transaction_type=transaction_type,
+                transaction_date=day,
+            )
+
+    def raw_totals(self, before):
+        totals = {}
+        for account in (self.cash, self.rent):
+            transactions = Transaction.objects.filter(
+                account=account, transaction_date__lt=before
+            )
+            totals[account.id] = {
+                transaction_type: sum(
+                    (
+                        t.amount
+                        for t in transactions
+                        if t.transaction_type == transaction_type
+                    ),
+                    ZERO,
+                )
+                for transaction_type in ("debit", "credit")
+            }
+        return totals
+
+    def assert_totals_match_raw_sums(self):
+        for before in (
+            date(2024, 1, 1),
+            date(2024, 1, 20),
+            date(2024, 2, 1),
+            date(2024, 3, 15),
+            date(2024, 5, 31),
+            date(2025, 1, 1),
+        ):
+            with self.subTest(before=before):
+                self.assertEqual(get_cumulative_totals(before), self.raw_totals(before))
+
+    def test_snapshot_totals_equal_raw_sums(self):
+        self.post(self.cash, "100.00", "debit", date(2024, 1, 5))
+        self.post(self.cash, "40.00", "credit", date(2024, 1, 31))
+        self.post(self.rent, "25.00", "debit", date(2024, 3, 1))
+        self.post(self.cash, "60.00", "debit", date(2024, 3, 20))
+        self.post(self.rent, "5.00", "credit", date(2024, 5, 30))
+
+        self.assertEqual(
+            AccountBalanceSnapshot.objects.filter(account=self.cash).count(), 2
+        )
+        self.assert_totals_match_raw_sums()
+
+    def test_backdated_edits_and_deletes_refresh_later_snapshots(self):
+        first = self.post(self.cash, "100.00", "debit", date(2024, 3, 5))
+        self.post(self.cash, "10.00", "credit", date(2024, 5, 5))
+
+        first.transaction_date = date(2024, 1, 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save()
+        self.post(self.rent, "30.00", "debit", date(2024, 1, 2))
+        self.assert_totals_match_raw_sums()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assert_totals_match_raw_sums()
+
+    def test_accounts_without_snapshots_sum_their_history(self):
+        self.post(self.cash, "100.00", "debit", date(2024, 1, 5))
+        self.post(self.rent, "25.00", "debit", date(2024, 2, 5))
+        AccountBalanceSnapshot.objects.filter(account=self.rent).delete()
+
+        self.assert_totals_match_raw_sums()
+
+    def test_rebuild_matches_incremental_snapshots(self):
+        self.post(self.cash, "100.00", "debit", date(2024, 1, 5))
+        self.post(self.cash, "40.00", "credit", date(2024, 2, 5))
+        self.post(self.rent, "25.00", "debit", date(2024, 2, 6))
+        incremental = list(
+            AccountBalanceSnapshot.objects.values_list(
+                "account_id", "period_end", "cumulative_debit", "cumulative_credit"
+            )
+        )
+
+        self.assertEqual(rebuild_balance_snapshots(), 3)
+        self.assertEqual(
+            list(
+                AccountBalanceSnapshot.objects.values_list(
+                    "account_id", "period_end", "cumulative_debit", "cumulative_credit"
+                )
+            ),
+            incremental,
+        )
+
+
+class LedgerPageTests(TestCase):
+    def setUp(self):
+        self.cash = ChartOfAccounts.objects.create(
+            account_name="Cash", account_type="asset", account_number="1000"
+        )
+        postings = [
+            ("500.00", "debit", date(2024, 1, 20)),
+            ("120.00", "credit", date(2024, 2, 1)),
+            ("75.00", "debit", date(2024, 2, 3)),
+            # Several entries on one day, so a page boundary splits the day
+            ("10.00", "debit", date(2024, 2, 5)),
+            ("20.00", "credit", date(2024, 2, 5)),
+            ("30.00", "debit", date(2024, 2, 5)),
+            ("40.00", "credit", date(2024, 2, 5)),
+            ("250.00", "debit", date(2024, 2, 20)),
+            ("90.00", "credit", date(2024, 3, 2)),
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            for amount, transaction_type, day in postings:
+                Transaction.objects.create(
+                    account=self.cash,
+                    amount=Decimal(amount),
+                    transaction_type=transaction_type,
+                    transaction_date=day,
+                )
+
+    def expected_balances(self, start_date, end_date):
+        balance, balances = ZERO, []
+        for entry in Transaction.objects.filter(account=self.cash).order_by(
+            "transaction_date", "id"
+        ):
+            signed = (
+                entry.amount if entry.transaction_type == "debit" else -entry.amount
+            )
+            balance += signed
+            if start_date <= entry.transaction_date <= end_date:
+                balances.append((entry.id, balance))
+        return balances
+
+    @mock.patch("apps.finance.services.LEDGER_PAGE_SIZE", 3)
+    def test_running_balances_carry_across_pages(self):
+        start_date, end_date = date(2024, 2, 1), date(2024, 2, 29)
+        balances, brought_forward, cursor = [], [], None
+        while True:
+            entries, balance_before, cursor = get_ledger_page(
+                self.cash, start_date, end_date, cursor
+            )
+            brought_forward.append(balance_before)
+            balances.extend((entry.id, entry.running_balance) for entry in entries)
+            if cursor is None:
+                break
+
+        expected = self.expected_balances(start_date, end_date)
+        self.assertEqual(balances, expected)
+        self.assertEqual(
+            brought_forward, [Decimal("500.00"), Decimal("465.00"), Decimal("435.00")]
+        )
+        self.assertEqual(
+            [row[4] for row in iter_ledger_rows(self.cash, start_date, end_date)][1:],
+            [balance for _, balance in expected],
+        )
+
+    @mock.patch("apps.finance.services.LEDGER_PAGE_SIZE", 3)
+    def test_invalid_cursors_start_from_the_first_page(self):
+        first_page = get_ledger_page(self.cash, date(2024, 2, 1), date(2024, 2, 29))
+        self.assertEqual(
+            get_ledger_page(
+                self.cash, date(2024, 2, 1), date(2024, 2, 29), "not-a-cursor"
+            ),
+            first_page,
+        )
+
+
+class StatementTests(TestCase):
+    start_date, end_date = date(2024, 2, 1), date(2024, 2, 29)
+
+    def setUp(self):
+        self.accounts = {
+            name: ChartOfAccounts.objects.create(
+                account_name=name, account_type=account_type, account_number=number
+            )
+            for name, account_type, number in (
+                ("Cash", "asset", "1000"),
+                ("Capital", "equity", "3000"),
+                ("Interest", "revenue", "4100"),
+                ("Rent", "expense", "5000"),
+            )
+        }
+        self.post("Capital", "1000.00", "credit", date(2024, 1, 10))
+        self.post("Cash", "1000.00", "debit", date(2024, 1, 10))
+        self.post("Cash", "300.00", "debit", date(2024, 2, 3))
+        self.post("Interest", "50.00", "credit", date(2024, 2, 10))
+        self.post("Rent", "200.00", "debit", date(2024, 2, 15))
+        self.post("Cash", "200.00", "credit", date(2024, 2, 15))
+        self.post("Rent", "999.00", "debit", date(2024, 3, 1))
+
+        product = Product.objects.create(
+            name="Soap",
+            status="ACTIVE",
+            cost=Decimal("500.00"),
+            price=Decimal("800.00"),
+        )
+        for day, price in ((date(2024, 2, 5), 800), (date(2024, 3, 5), 700)):
+            sale = Sale.objects.create(trans_date=day, grand_total=price * 2)
+            SaleDetail.objects.create(
+                sale=sale,
+                product=product,
+                price=price,
+                quantity=2,
+                total_detail=price * 2,
+            )
+
+    def post(self, name, amount, transaction_type, day):
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(
+                account=self.accounts[name],
+                amount=Decimal(amount),
+                transaction_type=transaction_type,
+                transaction_date=day,
+            )
+
+    def test_profit_and_loss_covers_the_period(self):
+        statement = build_profit_and_loss(self.start_date, self.end_date)
+
+        self.assertEqual(statement["sales_revenue"], Decimal("1600.00"))
+        self.assertEqual(statement["cogs"], Decimal("1000.00"))
+        self.assertEqual(statement["gross_profit"], Decimal("600.00"))
+        self.assertEqual(
+            [account["name"] for account in statement["other_income"]], ["Interest"]
+        )
+        self.assertEqual(statement["total_income"], Decimal("1650.00"))
+        self.assertEqual(statement["total_expenses"], Decimal("200.00"))
+        self.assertEqual(statement["net_profit"], Decimal("450.00"))
+
+    def test_balance_sheet_balances(self):
+        statement = build_balance_sheet(self.start_date, self.end_date)
+
+        # Only February moves: cash in 300, out 200, no capital
+        self.assertEqual(statement["assets"], Decimal("100.00"))
+        self.assertEqual(statement["equity"], ZERO)
+        self.assertEqual(statement["liabilities"], Decimal("100.00"))
+        self.assertEqual(statement["net_income"], Decimal("450.00"))
+
+    def test_queries_do_not_grow_with_accounts(self):
+        with CaptureQueriesContext(connection) as before:
+            build_balance_sheet(self.start_date, self.end_date)
+        for number in range(6000, 6010):
+            account = ChartOfAccounts.objects.create(
+                account_name=f"Expense {number}",
+                account_type="expense",
+                account_number=str(number),
+            )
+            self.accounts[account.account_name] = account
+            self.post(account.account_name, "1.00", "debit", date(2024, 2, 20))
+
+        with CaptureQueriesContext(connection) as after:
+            statement = build_balance_sheet(self.start_date, self.end_date)
+        self.assertEqual(len(after), len(before))
+        self.assertEqual(statement["net_income"], Decimal("440.00"))
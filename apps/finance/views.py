@@ -1,10 +1,8 @@
 import logging
 from datetime import datetime
-from decimal import Decimal
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, F
 from django.db import transaction
 from datetime import date
 from openpyxl import load_workbook
@@ -15,8 +13,15 @@ from .forms import (
     TransactionFormSet,
     ImportCOAForm,
 )
-from apps.sales.models import SaleDetail
 from .models import ChartOfAccounts, Transaction
+from .services import (
+    build_balance_sheet,
+    build_profit_and_loss,
+    get_ledger_page,
+    get_ledger_totals,
+    iter_ledger_rows,
+)
+from apps.main.exports import export_format, export_response
 from apps.sales.forms import ReportPeriodForm
 
 from apps.authentication.decorators import (
@@ -365,8 +370,7 @@ def ledger_report_view(request):
     selected_account_id = request.GET.get("account_id")  # Get selected account ID
     ledger_data = []
     accounts = ChartOfAccounts.objects.all()  # Fetch all accounts for the dropdown
-    total_debits = 0
-    total_credits = 0
+    totals = {"debits": 0, "credits": 0}
 
     # Get the start and end dates for the current financial year
     financial_year_start, financial_year_end = get_financial_year_dates()
@@ -377,45 +381,27 @@ def ledger_report_view(request):
 
     selected_account = None
     opening_balance = 0
+    next_cursor = None
+    cursor = request.GET.get("after")
 
     if selected_account_id:
         selected_account = get_object_or_404(ChartOfAccounts, id=selected_account_id)
 
-        # Get transactions within the selected date range
-        ledger_data = Transaction.objects.filter(
-            account=selected_account, transaction_date__range=[start_date, end_date]
-        ).order_by("transaction_date")
+        # Stream the whole period as CSV or XLSX
+        export = export_format(request)
+        if export:
+            return export_response(
+                export,
+                f"ledger_{selected_account.account_number}_{start_date}_{end_date}",
+                ("Date", "Description", "Debits", "Credits", "Balance"),
+                iter_ledger_rows(selected_account, start_date, end_date),
+            )
 
-        # Get opening balance by calculating the balance before the start_date
-        opening_balance_queryset = Transaction.objects.filter(
-            account=selected_account, transaction_date__lt=start_date
+        # One keyset page of entries with running balances computed in SQL
+        ledger_data, opening_balance, next_cursor = get_ledger_page(
+            selected_account, start_date, end_date, cursor
         )
-
-        # Calculate the opening balance as the sum of all prior debits and credits
-        for transaction in opening_balance_queryset:
-            if transaction.transaction_type == "debit":
-                opening_balance += transaction.amount
-            elif transaction.transaction_type == "credit":
-                opening_balance -= transaction.amount
-
-        # Calculate debits, credits, and running balance
-        running_balance = opening_balance
-        for transaction in ledger_data:
-            if transaction.transaction_type == "debit":
-                transaction.debit = transaction.amount
-                transaction.credit = 0
-                total_debits += transaction.amount
-            elif transaction.transaction_type == "credit":
-                transaction.debit = 0
-                transaction.credit = transaction.amount
-                total_credits += transaction.amount
-            else:
-                transaction.debit = 0
-                transaction.credit = 0
-
-            # Update running balance
-            running_balance += transaction.debit - transaction.credit
-            transaction.running_balance = running_balance
+        totals = get_ledger_totals(selected_account, start_date, end_date)
 
     return render(
         request,
@@ -427,9 +413,11 @@ def ledger_report_view(request):
             "selected_account_id": selected_account_id,
             "start_date": start_date,
             "end_date": end_date,
-            "total_debits": total_debits,
-            "total_credits": total_credits,
+            "total_debits": totals["debits"],
+            "total_credits": totals["credits"],
             "opening_balance": opening_balance,  # Pass opening balance to template
+            "is_first_page": not cursor,
+            "next_cursor": next_cursor,
         },
     )
 
@@ -460,120 +448,38 @@ def profit_and_loss_view(request):
         start_date = form.cleaned_data["start_date"]
         end_date = form.cleaned_data["end_date"]
 
-        # Filter data based on the date range
-        # Step 1: Query the related SaleDetails for the desired Sale objects
-        sales_details = SaleDetail.objects.filter(
-            sale__trans_date__range=(start_date, end_date)
-        )
-
-        expense_transactions = Transaction.objects.filter(
-            transaction_date__range=(start_date, end_date),
-            account__account_type="expense",
-        )
-        other_income_transactions = Transaction.objects.filter(
-            transaction_date__range=(start_date, end_date),
-            account__account_type="revenue",
-        ).exclude(account__account_name="Sales Revenue")
-
-        # Step 2: Aggregate total revenue (Sum of quantity * price)
-        total_revenue = sales_details.aggregate(
-            total_revenue=Sum(F("quantity") * F("price"))
-        )
-
-        # Step 3: Extract the total revenue value from the dictionary
-        # Ensure it is a Decimal (if None, set to Decimal("0.00"))
-        revenue_value = Decimal(total_revenue["total_revenue"] or "0.00")
-
-        # Step 4: Calculate Other Income (Sum of amounts for income transactions)
-        other_income = other_income_transactions.aggregate(total_income=Sum("amount"))[
-            "total_income"
-        ] or Decimal(
-            "0.00"
-        )  # Default to Decimal(0.00) if None or no data
+        statement = build_profit_and_loss(start_date, end_date)
 
-        # Step 5: Calculate Total Income (Revenue + Other Income)
-        total_income = revenue_value + other_income
-
-        # Dynamic Operating Expenses Calculation (Aggregate by Account Name or Account Type)
-        expense_categories = (
-            expense_transactions.values(
-                "account__account_name", "account__account_number"
-            )
-            .annotate(total_expense=Sum("amount"))
-            .order_by("account__account_number")
-        )
-
-        operating_expenses = {}
-        for category in expense_categories:
-            account_name = category["account__account_name"]
-            account_number = category["account__account_number"]
-            operating_expenses[f"{account_number} - {account_name}"] = category[
-                "total_expense"
-            ]
-
-        total_expenses = sum(operating_expenses.values())
-
-        # Calculate COGS (Cost of Goods Sold)
-        cogs = (
-            SaleDetail.objects.filter(sale__trans_date__range=[start_date, end_date])
-            .annotate(cogs=F("product__cost") * F("quantity"))
-            .aggregate(total_cogs=Sum("cogs"))
-        )["total_cogs"] or 0
-
-        # Calculate Gross Profit (Revenue - COGS)
-        gross_profit = revenue_value - cogs
-
-        # Calculate Net Profit (Gross Profit + Other Income - Operating Expenses)
-        net_profit = gross_profit + other_income - total_expenses
-
-        # Update the profit_and_loss dictionary with dynamic values
         # Income Section
         profit_and_loss["Income"].append(
-            {"label": "Sales Revenue", "value": revenue_value}
+            {"label": "Sales Revenue", "value": statement["sales_revenue"]}
         )
-
-        # Split Other Income into categories (if applicable)
-        other_income_categories = (
-            other_income_transactions.values(
-                "account__account_name", "account__account_number"
-            )
-            .annotate(total_other_income=Sum("amount"))
-            .order_by("account__account_number")
-        )
-        for income_category in other_income_categories:
-            account_name = income_category["account__account_name"]
-            account_number = income_category["account__account_number"]
+        for account in statement["other_income"]:
             profit_and_loss["Income"].append(
-                {
-                    "label": f"{account_number} - {account_name}",
-                    "value": income_category["total_other_income"],
-                }
+                {"label": account["label"], "value": account["total"]}
             )
-
         profit_and_loss["Income"].append(
-            {"label": "Total Other Income", "value": other_income}
+            {"label": "Total Other Income", "value": statement["total_other_income"]}
         )
         profit_and_loss["Income"].append(
-            {"label": "Total Income", "value": total_income}
+            {"label": "Total Income", "value": statement["total_income"]}
         )
 
-        # Expenses Section (Dynamic categories from operating_expenses)
-        for category, value in operating_expenses.items():
-            profit_and_loss["Expenses"].append({"label": category, "value": value})
-
-        # Add the total expenses
+        # Expenses Section
+        for account in statement["expenses"]:
+            profit_and_loss["Expenses"].append(
+                {"label": account["label"], "value": account["total"]}
+            )
         profit_and_loss["Expenses"].append(
-            {"label": "Total Expenses", "value": total_expenses}
+            {"label": "Total Expenses", "value": statement["total_expenses"]}
         )
-
-        # Add Cost of Goods Sold (COGS)
         profit_and_loss["Expenses"].append(
-            {"label": "Cost of Goods Sold (COGS)", "value": cogs}
+            {"label": "Cost of Goods Sold (COGS)", "value": statement["cogs"]}
         )
 
         # Summary Section
-        profit_and_loss["Summary"][0]["value"] = gross_profit
-        profit_and_loss["Summary"][1]["value"] = net_profit
+        profit_and_loss["Summary"][0]["value"] = statement["gross_profit"]
+        profit_and_loss["Summary"][1]["value"] = statement["net_profit"]
 
     # Pass data to the template
     context = {
@@ -597,95 +503,13 @@ def balance_sheet_view(request):
     start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
     end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
 
-    # Fetch transactions for the selected date range
-    transactions = Transaction.objects.filter(
-        transaction_date__range=[start_date, end_date]
-    )
-
-    # Initialize the balances
-    assets = 0
-    liabilities = 0
-    equity = 0
-    revenue = 0
-    expenses = 0
-
-    # Calculate the balances based on account type
-    for account in ChartOfAccounts.objects.all():
-        account_transactions = transactions.filter(account=account)
-
-        # Calculate the net balance for the account
-        debit_total = (
-            account_transactions.filter(transaction_type="debit").aggregate(
-                Sum("amount")
-            )["amount__sum"]
-            or 0
-        )
-        credit_total = (
-            account_transactions.filter(transaction_type="credit").aggregate(
-                Sum("amount")
-            )["amount__sum"]
-            or 0
-        )
-        net_balance = debit_total - credit_total
-
-        total_amount = account_transactions.aggregate(Sum("amount"))["amount__sum"] or 0
-
-        if account.account_type == "asset":
-            assets += net_balance
-        elif account.account_type == "liability":
-            liabilities += net_balance
-        elif account.account_type == "equity":
-            equity += total_amount
-        elif account.account_type == "revenue":
-            revenue += total_amount
-        elif account.account_type == "expense":
-            expenses += total_amount
-
-    # Fetch SaleDetails within the date range
-    sales_details = SaleDetail.objects.filter(
-        sale__trans_date__range=(start_date, end_date)
-    )
-
-    # Initialize sales revenue
-    sales_revenue = 0
-
-    # Loop through each SaleDetail and apply the discount logic
-    for sale_detail in sales_details:
-        # Get the corresponding Product instance
-        product = sale_detail.product
-        discounted_price = product.get_discounted_price()
-
-        # Accumulate revenue (discounted price * quantity)
-        sales_revenue += discounted_price * sale_detail.quantity
-
-    # Calculate Cost of Goods Sold (COGS) with discounts considered for prices
-    cogs = (
-        sales_details.annotate(cost_price=F("product__cost")).aggregate(
-            total_cogs=Sum(F("cost_price") * F("quantity"))
-        )
-    )["total_cogs"] or 0
-
-    # Calculate Gross Profit (Sales Revenue - COGS)
-    gross_profit = sales_revenue - cogs
-
-    # Calculate Net Profit (Gross Profit + Other Income - Operating Expenses)
-    net_income = gross_profit + revenue - expenses
-
-    # Calculate Retained Earnings: Retained Earnings = Net Income + Previous Retained Earnings
-    retained_earnings = equity + net_income
-
-    # Ensure assets = liabilities + equity
-    liabilities = assets - equity
+    statement = build_balance_sheet(start_date, end_date)
 
     # Return the result to the template
     context = {
         "start_date": start_date,
         "end_date": end_date,
-        "assets": assets,
-        "liabilities": liabilities,
-        "equity": equity,
-        "retained_earnings": retained_earnings,
-        "net_income": net_income,
+        **statement,
         "table_title": "Statement of Financial Position",
     }
 
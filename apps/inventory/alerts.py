@@ -0,0 +1,165 @@
+import logging
+import threading
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+
+from apps.authentication.navbar import LOW_STOCK_KEY, invalidate_navbar_cache
+from apps.main.services import queue_email
+
+from .models import Inventory, StockAlert
+
+logger = logging.getLogger(__name__)
+
+# Who receives the digests, by Profile role
+STOCK_ALERT_DIGEST_ROLES = ("administrator", "manager")
+
+# Products whose stock level may have crossed a threshold; drained on commit.
+_pending_checks = threading.local()
+
+
+# =================================== Detection ===================================
+def schedule_stock_alert_check(product_ids):
+    """Re-check the alerts of ``product_ids`` once the current transaction commits."""
+    pending = getattr(_pending_checks, "product_ids", None)
+    if pending is None:
+        pending = _pending_checks.product_ids = set()
+    pending.update(product_ids)
+    transaction.on_commit(_flush_pending_checks)
+
+
+def _flush_pending_checks():
+    product_ids = getattr(_pending_checks, "product_ids", None) or set()
+    _pending_checks.product_ids = set()
+    if product_ids:
+        refresh_stock_alerts(product_ids)
+
+
+def crossed_threshold(inventory, quantity):
+    """Whether moving ``inventory`` to ``quantity`` changes its alert level."""
+    return inventory.stock_level != StockAlert.level_for(
+        quantity, inventory.low_stock_threshold
+    )
+
+
+def refresh_stock_alerts(product_ids=None):
+    """
+    Bring the open alerts of ``product_ids`` (every product when None) in line
+    with their stock. Only level changes write anything: an alert is raised
+    when a product drops to its threshold, changes level when it runs out or
+    is partly restocked, and is resolved when it climbs back above.
+    Returns the number of alerts raised, changed and resolved.
+    """
+    inventories = Inventory.objects.values_list(
+        "product_id", "quantity", "low_stock_threshold"
+    )
+    open_alerts = StockAlert.objects.filter(resolved_at__isnull=True)
+    if product_ids is not None:
+        inventories = inventories.filter(product_id__in=product_ids)
+        open_alerts = open_alerts.filter(product_id__in=product_ids)
+    open_alerts = {alert.product_id: alert for alert in open_alerts}
+
+    raised, changed = [], []
+    for product_id, quantity, threshold in inventories.iterator():
+        level = StockAlert.level_for(quantity, threshold)
+        alert = open_alerts.pop(product_id, None)
+        if level is None:
+            if alert is not None:
+                open_alerts[product_id] = alert  # resolved below
+        elif alert is None:
+            raised.append(
+                StockAlert(
+                    product_id=product_id,
+                    level=level,
+                    quantity=quantity,
+                    threshold=threshold,
+                )
+            )
+        elif alert.level != level:
+            alert.level = level
+            alert.quantity = quantity
+            alert.threshold = threshold
+            if level == StockAlert.OUT:
+                # Running out goes into the next digest even if low stock did
+                alert.notified_at = None
+            changed.append(alert)
+    # What is left is back above its threshold or has no inventory any more
+    resolved = [alert.pk for alert in open_alerts.values()]
+
+    with transaction.atomic():
+        # A concurrent check may have raised the same alert first
+        StockAlert.objects.bulk_create(raised, ignore_conflicts=True)
+        StockAlert.objects.bulk_update(
+            changed, ["level", "quantity", "threshold", "notified_at"]
+        )
+        StockAlert.objects.filter(pk__in=resolved).update(resolved_at=timezone.now())
+
+    if raised or changed or resolved:
+        invalidate_navbar_cache(LOW_STOCK_KEY)
+    return len(raised), len(changed), len(resolved)
+
+
+@receiver(post_save, sender=Inventory)
+def inventory_saved(sender, instance, **kwargs):
+    # Saved rows (forms, admin) may have moved their quantity or threshold
+    schedule_stock_alert_check([instance.product_id])
+
+
+# =================================== Digests ===================================
+def get_open_alerts():
+    return StockAlert.objects.filter(resolved_at__isnull=True).select_related(
+        "product__inventory"
+    )
+
+
+def send_stock_alert_digest():
+    """
+    Queue one email listing every open alert nobody was told about yet and
+    mark them notified. Returns the number of alerts in the digest.
+    """
+    with transaction.atomic():
+        alerts = list(
+            StockAlert.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(resolved_at__isnull=True, notified_at__isnull=True)
+            .select_related("product")
+            .order_by("-level", "product__name")
+        )
+        if not alerts:
+            return 0
+
+        recipients = User.objects.filter(
+            is_active=True, profile__role__in=STOCK_ALERT_DIGEST_ROLES
+        ).exclude(email="")
+        html_body = format_html(
+            "<p>These products are at or below their low stock threshold:</p>"
+            "<ul>{}</ul>",
+            format_html_join(
+                "",
+                "<li><strong>{}</strong>: {} (stock {}, threshold {})</li>",
+                (
+                    (
+                        alert.product.name,
+                        alert.get_level_display(),
+                        alert.quantity,
+                        alert.threshold,
+                    )
+                    for alert in alerts
+                ),
+            ),
+        )
+        queued = queue_email(
+            f"Stock alerts: {len(alerts)} products need attention",
+            recipients.values_list("email", flat=True),
+            html_body=html_body,
+        )
+        if not queued:
+            logger.warning(f"No recipients for a digest of {len(alerts)} alerts")
+
+        StockAlert.objects.filter(pk__in=[alert.pk for alert in alerts]).update(
+            notified_at=timezone.now()
+        )
+    return len(alerts)
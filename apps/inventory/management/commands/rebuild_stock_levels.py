@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.inventory.services import rebuild_stock_levels, stock_level_drift
+
+
+class Command(BaseCommand):
+    help = "Recompute every inventory quantity from the stock movement ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report quantities that differ from the ledger, and fail if any do.",
+        )
+
+    def handle(self, *args, **options):
+        drift = list(stock_level_drift())
+        for inventory in drift:
+            self.stdout.write(
+                f"{inventory.product.name}: {inventory.quantity} in stock, "
+                f"{inventory.ledger_quantity} in the ledger"
+            )
+
+        if options["check"]:
+            if drift:
+                raise CommandError(f"{len(drift)} inventory rows drifted.")
+            self.stdout.write(self.style.SUCCESS("Inventory matches the ledger."))
+            return
+
+        count = rebuild_stock_levels()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {count} inventory rows, {len(drift)} of them had drifted."
+            )
+        )
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.inventory.alerts import refresh_stock_alerts, send_stock_alert_digest
+
+
+class Command(BaseCommand):
+    help = "Mail one digest of the stock alerts raised since the last digest."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep sending digests instead of exiting after one.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=900,
+            help="Seconds between digests when looping.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            # Catch up on stock changed outside the application, e.g. by SQL
+            raised, changed, resolved = refresh_stock_alerts()
+            sent = send_stock_alert_digest()
+            self.stdout.write(
+                f"{raised} alert(s) raised, {changed} changed, {resolved} resolved; "
+                f"{sent} in the digest."
+            )
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0003_inventory_created_at_inventory_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="inventory",
+            index=models.Index(
+                condition=models.Q(("quantity__lte", models.F("low_stock_threshold"))),
+                fields=["quantity"],
+                name="inventory_low_stock_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def open_stock_ledger(apps, schema_editor):
+    """Record every current stock level as the opening movement of its product."""
+    Inventory = apps.get_model("inventory", "Inventory")
+    StockMovement = apps.get_model("inventory", "StockMovement")
+
+    StockMovement.objects.bulk_create(
+        (
+            StockMovement(
+                product_id=product_id,
+                kind="adjustment",
+                quantity=quantity,
+                note="Opening balance",
+            )
+            for product_id, quantity in Inventory.objects.exclude(quantity=0)
+            .values_list("product_id", "quantity")
+            .iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0007_product_rating_summary"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("inventory", "0004_inventory_inventory_low_stock_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockMovement",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("sale", "Sale"),
+                            ("order", "Order fulfilment"),
+                            ("receipt", "Purchase order receipt"),
+                            ("adjustment", "Adjustment"),
+                            ("return", "Return"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("quantity", models.IntegerField()),
+                ("reference", models.CharField(blank=True, max_length=50)),
+                ("note", models.CharField(blank=True, max_length=255)),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Created at"
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_movements",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "stock_movement",
+                "ordering": ["-created_at", "-id"],
+                "indexes": [
+                    models.Index(
+                        fields=["product", "-created_at", "-id"],
+                        name="stock_movement_product_idx",
+                    ),
+                    models.Index(
+                        fields=["reference", "kind"], name="stock_movement_ref_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(open_stock_ledger, migrations.RunPython.noop),
+    ]
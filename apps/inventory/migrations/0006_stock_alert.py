@@ -0,0 +1,98 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def raise_open_alerts(apps, schema_editor):
+    """Open an alert for every product already at or below its threshold."""
+    Inventory = apps.get_model("inventory", "Inventory")
+    StockAlert = apps.get_model("inventory", "StockAlert")
+
+    StockAlert.objects.bulk_create(
+        (
+            StockAlert(
+                product_id=product_id,
+                level="out" if quantity <= 0 else "low",
+                quantity=quantity,
+                threshold=threshold,
+            )
+            for product_id, quantity, threshold in Inventory.objects.filter(
+                quantity__lte=models.F("low_stock_threshold")
+            )
+            .values_list("product_id", "quantity", "low_stock_threshold")
+            .iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0007_product_rating_summary"),
+        ("inventory", "0005_stock_movement"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockAlert",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "level",
+                    models.CharField(
+                        choices=[("low", "Low Stock"), ("out", "Out of Stock")],
+                        max_length=10,
+                    ),
+                ),
+                ("quantity", models.IntegerField()),
+                ("threshold", models.PositiveIntegerField()),
+                (
+                    "raised_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Raised at"
+                    ),
+                ),
+                ("notified_at", models.DateTimeField(blank=True, null=True)),
+                ("resolved_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_alerts",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "stock_alert",
+                "ordering": ["-raised_at", "-id"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("resolved_at__isnull", True)),
+                        fields=["-raised_at"],
+                        name="stock_alert_open_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="stockalert",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("resolved_at__isnull", True)),
+                fields=("product",),
+                name="stock_alert_open_product_uniq",
+            ),
+        ),
+        migrations.RunPython(raise_open_alerts, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from apps.products.models import Product
 
 
@@ -14,26 +16,132 @@ class Inventory(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created at")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated at")
 
-    def check_stock_alerts(self):
-        """Check stock levels and update stock status."""
-        self.is_out_of_stock = self.quantity <= 0
-
-        # Trigger low stock alert if quantity is less than or equal to threshold
-        if self.quantity <= self.low_stock_threshold and not self.is_out_of_stock:
-            self.send_low_stock_alert()
+    class Meta:
+        indexes = [
+            # Low-stock alerts: only the rows at or below their threshold
+            models.Index(
+                fields=["quantity"],
+                condition=models.Q(quantity__lte=models.F("low_stock_threshold")),
+                name="inventory_low_stock_idx",
+            ),
+        ]
 
-    def send_low_stock_alert(self):
-        """Send an alert for low stock."""
-        # Implement notification logic here
-        # For example, sending an email or logging the alert
-        print(
-            f"Low stock alert for {self.product.name}. Current stock: {self.quantity}"
-        )
+    @property
+    def stock_level(self):
+        """The alert level the stock is at, see ``StockAlert.level_for``."""
+        return StockAlert.level_for(self.quantity, self.low_stock_threshold)
 
     def save(self, *args, **kwargs):
-        # Ensure stock alerts are checked before saving
-        self.check_stock_alerts()
+        # Alerts are raised by apps.inventory.alerts once the write commits
+        self.is_out_of_stock = self.quantity <= 0
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.product.name} - Stock: {self.quantity}"
+
+
+class StockMovement(models.Model):
+    """
+    One append-only change to a product's stock. ``Inventory.quantity`` is
+    the running sum of a product's movements, kept by ``apps.inventory.services``.
+    """
+
+    SALE = "sale"
+    ORDER = "order"
+    RECEIPT = "receipt"
+    ADJUSTMENT = "adjustment"
+    RETURN = "return"
+    KIND_CHOICES = [
+        (SALE, "Sale"),
+        (ORDER, "Order fulfilment"),
+        (RECEIPT, "Purchase order receipt"),
+        (ADJUSTMENT, "Adjustment"),
+        (RETURN, "Return"),
+    ]
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="stock_movements"
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Signed: stock in is positive, stock out negative
+    quantity = models.IntegerField()
+    # What caused the movement, e.g. "sale:12" or "order:7"
+    reference = models.CharField(max_length=50, blank=True)
+    note = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Created at")
+
+    class Meta:
+        db_table = "stock_movement"
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            # A product's history, newest first, without scanning the ledger
+            models.Index(
+                fields=["product", "-created_at", "-id"],
+                name="stock_movement_product_idx",
+            ),
+            # Whether an order or sale has already moved stock
+            models.Index(fields=["reference", "kind"], name="stock_movement_ref_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.quantity:+d} of {self.product_id}"
+
+
+class StockAlert(models.Model):
+    """
+    A product at or below its low stock threshold. Alerts are raised when the
+    stock crosses the threshold and resolved when it climbs back, at most one
+    open per product; ``apps.inventory.alerts`` keeps them and mails digests.
+    """
+
+    LOW = "low"
+    OUT = "out"
+    LEVEL_CHOICES = [
+        (LOW, "Low Stock"),
+        (OUT, "Out of Stock"),
+    ]
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="stock_alerts"
+    )
+    level = models.CharField(max_length=10, choices=LEVEL_CHOICES)
+    # The stock and threshold when the alert was raised or last changed level
+    quantity = models.IntegerField()
+    threshold = models.PositiveIntegerField()
+    raised_at = models.DateTimeField(default=timezone.now, verbose_name="Raised at")
+    notified_at = models.DateTimeField(null=True, blank=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "stock_alert"
+        ordering = ["-raised_at", "-id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product"],
+                condition=models.Q(resolved_at__isnull=True),
+                name="stock_alert_open_product_uniq",
+            ),
+        ]
+        indexes = [
+            # The navbar and the alerts page only ever read open alerts
+            models.Index(
+                fields=["-raised_at"],
+                condition=models.Q(resolved_at__isnull=True),
+                name="stock_alert_open_idx",
+            ),
+        ]
+
+    @classmethod
+    def level_for(cls, quantity, threshold):
+        """``OUT``, ``LOW`` or None when the stock is above its threshold."""
+        if quantity <= 0:
+            return cls.OUT
+        if quantity <= threshold:
+            return cls.LOW
+        return None
+
+    def __str__(self):
+        return f"{self.get_level_display()}: {self.product_id} at {self.quantity}"
@@ -0,0 +1,250 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import (
+    BooleanField,
+    Case,
+    Count,
+    ExpressionWrapper,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.orders.models import Order
+from apps.products.catalogue import schedule_catalogue_bump
+
+from .alerts import crossed_threshold, refresh_stock_alerts, schedule_stock_alert_check
+from .models import Inventory, StockMovement
+
+OUT_OF_STOCK = ExpressionWrapper(Q(quantity__lte=0), output_field=BooleanField())
+
+
+# =================================== Stock movements ===================================
+class InsufficientStockError(ValueError):
+    """Raised when movements would take more than the locked inventory holds."""
+
+
+def _lock_inventories(product_ids):
+    return {
+        inventory.product_id: inventory
+        for inventory in Inventory.objects.select_for_update(of=("self",))
+        .select_related("product")
+        .filter(product_id__in=product_ids)
+    }
+
+
+@transaction.atomic
+def record_stock_movements(movements):
+    """
+    Append ``movements`` (unsaved StockMovement rows) to the ledger and move
+    ``Inventory.quantity`` by their net per product.
+
+    Every involved Inventory row is locked in one query, missing rows are
+    created empty, and the whole batch is validated before anything is
+    written. The projection then moves by F() increments in one UPDATE.
+    """
+    movements = [movement for movement in movements if movement.quantity]
+    deltas = defaultdict(int)
+    for movement in movements:
+        deltas[movement.product_id] += movement.quantity
+    if not deltas:
+        return []
+
+    inventories = _lock_inventories(deltas)
+    missing = deltas.keys() - inventories.keys()
+    if missing:
+        Inventory.objects.bulk_create(
+            [Inventory(product_id=product_id) for product_id in missing],
+            ignore_conflicts=True,
+        )
+        inventories = _lock_inventories(deltas)
+
+    shortages = [
+        inventory.product.name
+        for product_id, inventory in inventories.items()
+        if inventory.quantity + deltas[product_id] < 0
+    ]
+    if shortages:
+        raise InsufficientStockError(
+            f"Oops! Insufficient stock for {', '.join(shortages)}"
+        )
+
+    movements = StockMovement.objects.bulk_create(movements)
+    Inventory.objects.filter(
+        pk__in=[inventory.pk for inventory in inventories.values()]
+    ).update(
+        quantity=F("quantity")
+        + Case(
+            *[
+                When(pk=inventory.pk, then=Value(deltas[product_id]))
+                for product_id, inventory in inventories.items()
+            ],
+            default=Value(0),
+        ),
+        is_out_of_stock=Case(
+            *[
+                When(
+                    pk=inventory.pk,
+                    then=Value(inventory.quantity + deltas[product_id] <= 0),
+                )
+                for product_id, inventory in inventories.items()
+            ],
+            default=F("is_out_of_stock"),
+        ),
+        updated_at=timezone.now(),
+    )
+
+    # update() bypasses Inventory's post_save, so act on its changes directly
+    crossed = [
+        product_id
+        for product_id, inventory in inventories.items()
+        if crossed_threshold(inventory, inventory.quantity + deltas[product_id])
+    ]
+    if crossed:
+        schedule_stock_alert_check(crossed)
+    schedule_catalogue_bump()
+    return movements
+
+
+@transaction.atomic
+def set_stock_level(product_id, quantity, user=None, note=""):
+    """Record the adjustment that brings a product's stock to ``quantity``."""
+    current = (
+        Inventory.objects.select_for_update()
+        .filter(product_id=product_id)
+        .values_list("quantity", flat=True)
+        .first()
+    ) or 0
+    return record_stock_movements(
+        [
+            StockMovement(
+                product_id=product_id,
+                kind=StockMovement.ADJUSTMENT,
+                quantity=quantity - current,
+                note=note,
+                created_by=user,
+            )
+        ]
+    )
+
+
+def is_off_stock(reference):
+    """
+    Whether an order's lines are currently off stock: it has been fulfilled
+    more times than returned, as it can go back and forth between statuses.
+    """
+    counts = StockMovement.objects.filter(reference=reference).aggregate(
+        fulfilled=Count("pk", filter=Q(kind=StockMovement.ORDER)),
+        returned=Count("pk", filter=Q(kind=StockMovement.RETURN)),
+    )
+    return counts["fulfilled"] > counts["returned"]
+
+
+# =================================== Orders and sales ===================================
+def _lock_order(order):
+    """Serialize stock changes of one order, so each happens once."""
+    Order.objects.select_for_update().filter(pk=order.pk).first()
+    return f"order:{order.pk}"
+
+
+@transaction.atomic
+def fulfil_order(order, user=None):
+    """Take an order's lines off stock unless they already are."""
+    reference = _lock_order(order)
+    if is_off_stock(reference):
+        return []
+    return record_stock_movements(
+        StockMovement(
+            product_id=detail.product_id,
+            kind=StockMovement.ORDER,
+            quantity=-detail.quantity,
+            reference=reference,
+            created_by=user,
+        )
+        for detail in order.details.all()
+    )
+
+
+@transaction.atomic
+def return_order(order, user=None):
+    """Put a fulfilled order's lines back on stock unless they already are."""
+    reference = _lock_order(order)
+    if not is_off_stock(reference):
+        return []
+    return record_stock_movements(
+        StockMovement(
+            product_id=detail.product_id,
+            kind=StockMovement.RETURN,
+            quantity=detail.quantity,
+            reference=reference,
+            created_by=user,
+        )
+        for detail in order.details.all()
+    )
+
+
+@transaction.atomic
+def return_sale(sale, user=None, note=""):
+    """Put a sale's lines back on stock, e.g. before the sale is deleted."""
+    return record_stock_movements(
+        StockMovement(
+            product_id=detail.product_id,
+            kind=StockMovement.RETURN,
+            quantity=detail.quantity,
+            reference=f"sale:{sale.pk}",
+            note=note,
+            created_by=user,
+        )
+        for detail in sale.items.all()
+    )
+
+
+# =================================== Projection ===================================
+def stock_level_drift():
+    """Inventory rows whose quantity differs from the sum of their movements."""
+    return (
+        Inventory.objects.annotate(
+            ledger_quantity=Coalesce(
+                Subquery(
+                    StockMovement.objects.filter(product_id=OuterRef("product_id"))
+                    .order_by()
+                    .values("product_id")
+                    .annotate(total=Sum("quantity"))
+                    .values("total")
+                ),
+                0,
+            )
+        )
+        .exclude(quantity=F("ledger_quantity"))
+        .select_related("product")
+    )
+
+
+@transaction.atomic
+def rebuild_stock_levels():
+    """
+    Recompute every ``Inventory.quantity`` from the ledger in two statements.
+    Returns the number of inventory rows.
+    """
+    totals = (
+        StockMovement.objects.filter(product_id=OuterRef("product_id"))
+        .order_by()
+        .values("product_id")
+        .annotate(total=Sum("quantity"))
+        .values("total")
+    )
+    count = Inventory.objects.update(
+        quantity=Coalesce(Subquery(totals), 0), updated_at=timezone.now()
+    )
+    Inventory.objects.update(is_out_of_stock=OUT_OF_STOCK)
+
+    transaction.on_commit(refresh_stock_alerts)
+    schedule_catalogue_bump()
+    return count
@@ -1 +1,187 @@
-# Create your tests here.
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from apps.authentication.models import Profile
+from apps.customers.models import Customer
+from apps.main.models import OutboxEmail
+from apps.orders.models import Order, OrderDetail
+from apps.products.models import Product
+
+from .alerts import send_stock_alert_digest
+from .models import Inventory, StockAlert, StockMovement
+from .services import (
+    InsufficientStockError,
+    fulfil_order,
+    record_stock_movements,
+    return_order,
+    stock_level_drift,
+)
+
+
+def create_product(name, quantity):
+    product = Product.objects.create(
+        name=name, status="ACTIVE", cost=Decimal("500.00"), price=Decimal("800.00")
+    )
+    record_stock_movements(
+        [
+            StockMovement(
+                product=product, kind=StockMovement.ADJUSTMENT, quantity=quantity
+            )
+        ]
+    )
+    return product
+
+
+def stock_of(product):
+    return Inventory.objects.get(product=product).quantity
+
+
+class RecordStockMovementsTests(TestCase):
+    def setUp(self):
+        self.soap = create_product("Soap", 10)
+        self.salt = create_product("Salt", 2)
+
+    def test_moves_stock_by_the_net_of_each_product(self):
+        record_stock_movements(
+            [
+                StockMovement(product=self.soap, kind=StockMovement.SALE, quantity=-4),
+                StockMovement(product=self.soap, kind=StockMovement.RETURN, quantity=1),
+                StockMovement(
+                    product=self.salt, kind=StockMovement.RECEIPT, quantity=5
+                ),
+            ]
+        )
+
+        self.assertEqual(stock_of(self.soap), 7)
+        self.assertEqual(stock_of(self.salt), 7)
+        self.assertEqual(
+            StockMovement.objects.exclude(kind=StockMovement.ADJUSTMENT).count(), 3
+        )
+        self.assertFalse(stock_level_drift().exists())
+
+    def test_oversell_rejects_the_whole_batch(self):
+        with self.assertRaises(InsufficientStockError):
+            record_stock_movements(
+                [
+                    StockMovement(
+                        product=self.soap, kind=StockMovement.SALE, quantity=-1
+                    ),
+                    StockMovement(
+                        product=self.salt, kind=StockMovement.SALE, quantity=-3
+                    ),
+                ]
+            )
+
+        self.assertEqual(stock_of(self.soap), 10)
+        self.assertEqual(stock_of(self.salt), 2)
+        self.assertFalse(StockMovement.objects.filter(kind=StockMovement.SALE).exists())
+
+    def test_running_out_marks_the_product_out_of_stock(self):
+        record_stock_movements(
+            [StockMovement(product=self.salt, kind=StockMovement.SALE, quantity=-2)]
+        )
+
+        self.assertTrue(Inventory.objects.get(product=self.salt).is_out_of_stock)
+
+
+class OrderStockTests(TestCase):
+    def setUp(self):
+        self.product = create_product("Soap", 10)
+        customer = Customer.objects.create(first_name="Test")
+        self.order = Order.objects.create(
+            customer=customer, total_amount=Decimal("2400.00"), status="Pending"
+        )
+        OrderDetail.objects.create(
+            order=self.order, product=self.product, quantity=3, price=Decimal("800.00")
+        )
+
+    def test_fulfil_and_return_happen_once_each(self):
+        levels = []
+        for change in (fulfil_order, fulfil_order, return_order, return_order):
+            change(self.order)
+            levels.append(stock_of(self.product))
+
+        self.assertEqual(levels, [7, 7, 10, 10])
+
+    def test_an_order_fulfilled_again_after_a_return_leaves_stock_again(self):
+        levels = []
+        for change in (fulfil_order, return_order, fulfil_order):
+            change(self.order)
+            levels.append(stock_of(self.product))
+
+        self.assertEqual(levels, [7, 10, 7])
+
+    def test_return_without_fulfilment_changes_nothing(self):
+        self.assertEqual(return_order(self.order), [])
+        self.assertEqual(stock_of(self.product), 10)
+
+
+class StockAlertTests(TestCase):
+    def setUp(self):
+        # The default low stock threshold is 5
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soap = create_product("Soap", 10)
+
+    def move(self, quantity):
+        # Alerts are checked when the movement commits
+        with self.captureOnCommitCallbacks(execute=True):
+            record_stock_movements(
+                [
+                    StockMovement(
+                        product=self.soap,
+                        kind=StockMovement.ADJUSTMENT,
+                        quantity=quantity,
+                    )
+                ]
+            )
+
+    def open_alert(self):
+        return StockAlert.objects.filter(resolved_at__isnull=True).first()
+
+    def test_alerts_follow_threshold_crossings_only(self):
+        self.move(-3)
+        self.assertFalse(StockAlert.objects.exists())
+
+        self.move(-2)
+        alert = self.open_alert()
+        self.assertEqual((alert.level, alert.quantity), (StockAlert.LOW, 5))
+
+        # Still low: the open alert is left as it was
+        self.move(-1)
+        self.assertEqual(StockAlert.objects.get(), alert)
+        self.assertEqual(self.open_alert().quantity, 5)
+
+        self.move(-4)
+        self.assertEqual(
+            (self.open_alert().pk, self.open_alert().level), (alert.pk, StockAlert.OUT)
+        )
+
+        self.move(2)
+        self.assertEqual(self.open_alert().level, StockAlert.LOW)
+
+        self.move(8)
+        self.assertIsNone(self.open_alert())
+        alert.refresh_from_db()
+        self.assertIsNotNone(alert.resolved_at)
+
+        self.move(-6)
+        self.assertEqual(StockAlert.objects.count(), 2)
+        self.assertNotEqual(self.open_alert().pk, alert.pk)
+
+    def test_digests_list_each_alert_once(self):
+        manager = User.objects.create_user("manager", "manager@example.com")
+        Profile.objects.create(user=manager, role="manager")
+
+        self.move(-6)
+        self.assertEqual(send_stock_alert_digest(), 1)
+        self.assertEqual(send_stock_alert_digest(), 0)
+        self.assertEqual(
+            list(OutboxEmail.objects.values_list("to_email", flat=True)),
+            ["manager@example.com"],
+        )
+
+        # Running out is news even though the low stock alert was sent
+        self.move(-4)
+        self.assertEqual(send_stock_alert_digest(), 1)
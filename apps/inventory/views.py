@@ -1,13 +1,15 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.core.paginator import Paginator
-from django.db.models import Q
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db.models import Sum
 from .models import Inventory
 from .forms import InventoryForm
+from .services import set_stock_level
 from apps.inventory.models import Product
+from apps.main.exports import export_format, export_queryset
+from apps.products.search import search_products
 
 from apps.authentication.decorators import (
     admin_or_manager_or_staff_required,
@@ -24,9 +26,8 @@ def inventory_list_view(request):
 
     # If there's a search query, filter the inventory based on the product name or category
     if search_query:
-        inventories = inventories.filter(
-            Q(product__name__icontains=search_query)
-            | Q(product__category__name__icontains=search_query)
+        inventories = search_products(
+            inventories, search_query, product_field="product"
         )
 
     # Pagination logic
@@ -43,18 +44,35 @@ def inventory_list_view(request):
 
 
 # =================================== Inventory Report view ===================================
+INVENTORY_EXPORT_COLUMNS = (
+    ("Product", "product__name"),
+    ("SKU", "product__sku"),
+    ("Category", "product__category__name"),
+    ("Stock Quantity", "quantity"),
+    ("Low Stock Threshold", "low_stock_threshold"),
+    ("Out of Stock", "is_out_of_stock"),
+    ("Updated At", "updated_at"),
+)
+
+
 @login_required
 @admin_or_manager_or_staff_required
 def inventory_report_view(request):
     # Search functionality
     search_query = request.GET.get("search", "")
+    inventories = Inventory.objects.select_related("product").all()
     if search_query:
-        inventories = Inventory.objects.filter(
-            Q(product__name__icontains=search_query)
-            | Q(product__description__icontains=search_query)
-        ).select_related("product")
-    else:
-        inventories = Inventory.objects.select_related("product").all()
+        inventories = search_products(
+            inventories, search_query, product_field="product"
+        )
+
+    export = export_format(request)
+    if export:
+        if not search_query:
+            inventories = inventories.order_by("product__name")
+        return export_queryset(
+            export, "inventory", inventories, INVENTORY_EXPORT_COLUMNS
+        )
 
     # Pagination
     paginator = Paginator(inventories, 25)  # Show 25 inventories per page
@@ -136,10 +154,19 @@ def inventory_add_view(request):
             # Save the form but don't commit yet
             inventory = form.save(commit=False)
 
-            # Assign the selected product to the inventory item
+            # Assign the selected product to the inventory item; the opening
+            # stock comes in through the ledger like any other movement
             inventory.product = product
+            inventory.quantity = 0
             try:
-                inventory.save()
+                with transaction.atomic():
+                    inventory.save()
+                    set_stock_level(
+                        product.id,
+                        form.cleaned_data["quantity"],
+                        user=request.user,
+                        note="Opening stock",
+                    )
                 messages.success(
                     request, "Inventory added successfully!", extra_tags="bg-success"
                 )
@@ -168,7 +195,17 @@ def inventory_update_view(request, pk):
     if request.method == "POST":
         form = InventoryForm(request.POST, instance=inventory)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                # The threshold is saved as is, the quantity as a ledger adjustment
+                form.save(commit=False).save(
+                    update_fields=["low_stock_threshold", "updated_at"]
+                )
+                set_stock_level(
+                    inventory.product_id,
+                    form.cleaned_data["quantity"],
+                    user=request.user,
+                    note="Stock count",
+                )
             messages.success(
                 request, "Inventory updated successfully!", extra_tags="bg-success"
             )
@@ -1 +1,17 @@
+from django.contrib import admin
+
 # Register your models here.
+from .models import NewsletterCampaign, OutboxEmail
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "to_email", "status", "attempts", "next_attempt_at")
+    list_filter = ("status",)
+    search_fields = ("to_email", "subject")
+
+
+@admin.register(NewsletterCampaign)
+class NewsletterCampaignAdmin(admin.ModelAdmin):
+    list_display = ("subject", "status", "recipients_queued", "created_at")
+    list_filter = ("status",)
@@ -0,0 +1,240 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.db.models.expressions import RawSQL
+
+from apps.customers.models import Customer
+from apps.finance.models import ChartOfAccounts, Transaction
+from apps.inventory.models import Inventory, StockAlert
+from apps.orders.models import Order
+from apps.products.models import Category, Product, ProductImage, Review
+from apps.sales.models import Sale
+
+# The reporting and storefront indexes, by model
+HOT_INDEXES = [
+    (Sale, "sales_trans_date_idx"),
+    (Order, "orders_status_created_idx"),
+    (Transaction, "transaction_account_date_idx"),
+    (Transaction, "transaction_date_idx"),
+    (Product, "product_status_name_idx"),
+    (ProductImage, "product_image_default_idx"),
+    (Review, "review_verified_idx"),
+    (Inventory, "inventory_low_stock_idx"),
+    (StockAlert, "stock_alert_open_idx"),
+]
+
+
+def hot_queries(run):
+    """
+    The query shapes the indexes serve, as issued by the views.
+
+    Each query selects the literal ``run`` number so its SQL text differs
+    between passes; SQLite would otherwise reuse the first pass's cached plan.
+    """
+    today = date.today()
+    month_start = today.replace(day=1)
+    account_id = Transaction.objects.values_list("account_id", flat=True).first()
+    product_ids = list(Product.objects.values_list("id", flat=True)[:24])
+    run = RawSQL(str(int(run)), ())
+
+    return [
+        (
+            "Sales report for the month",
+            Sale.objects.filter(trans_date__range=(month_start, today))
+            .annotate(run=run)
+            .order_by("trans_date", "id"),
+        ),
+        (
+            "Orders to be processed",
+            Order.objects.filter(status__in=["Pending", "Out for Delivery"])
+            .annotate(run=run)
+            .order_by("-created_at")[:10],
+        ),
+        (
+            "Ledger page for one account",
+            Transaction.objects.filter(
+                account_id=account_id, transaction_date__range=(month_start, today)
+            )
+            .annotate(run=run)
+            .order_by("transaction_date", "id")[:100],
+        ),
+        (
+            "Statement totals for the month",
+            Transaction.objects.filter(transaction_date__range=(month_start, today))
+            .values("account_id")
+            .annotate(total=Sum("amount"), run=run)
+            .order_by(),
+        ),
+        (
+            "Active products by name",
+            Product.objects.filter(status="ACTIVE")
+            .annotate(run=run)
+            .order_by("name")[:24],
+        ),
+        (
+            "Product card images",
+            ProductImage.objects.filter(product_id__in=product_ids)
+            .annotate(run=run)
+            .order_by("-is_default", "-created_at"),
+        ),
+        (
+            "Verified reviews of a product",
+            Review.objects.filter(
+                product_id=product_ids[0] if product_ids else None, is_verified=True
+            )
+            .annotate(run=run)
+            .order_by("-created_at")[:5],
+        ),
+        (
+            "Low stock products",
+            Inventory.objects.filter(quantity__lte=F("low_stock_threshold"))
+            .annotate(run=run)
+            .order_by("quantity")[:10],
+        ),
+        (
+            "Open stock alerts",
+            StockAlert.objects.filter(resolved_at__isnull=True)
+            .annotate(run=run)
+            .order_by("-raised_at")[:10],
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Print EXPLAIN plans of the hot reporting and storefront queries with and "
+        "without their indexes. Everything, including --seed data, is rolled back. "
+        "Dropping indexes locks their tables until then, so run it against a "
+        "staging copy rather than production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Add this many synthetic rows per table before explaining.",
+        )
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Run EXPLAIN ANALYZE (PostgreSQL) to include actual timings.",
+        )
+
+    def handle(self, *args, **options):
+        explain_options = {}
+        if options["analyze"] and connection.vendor == "postgresql":
+            explain_options = {"analyze": True}
+
+        with transaction.atomic():
+            if options["seed"]:
+                self.seed(options["seed"])
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+
+            with_indexes = self.explain_all(1, explain_options)
+            self.drop_hot_indexes()
+            without_indexes = self.explain_all(2, explain_options)
+
+            for label, plan in with_indexes.items():
+                self.stdout.write(self.style.MIGRATE_HEADING(f"=== {label} ==="))
+                self.stdout.write(self.style.SUCCESS("-- with indexes"))
+                self.stdout.write(plan)
+                self.stdout.write(self.style.WARNING("-- without indexes"))
+                self.stdout.write(without_indexes[label])
+                self.stdout.write("")
+
+            transaction.set_rollback(True)
+
+    def explain_all(self, run, explain_options):
+        return {
+            label: queryset.explain(**explain_options)
+            for label, queryset in hot_queries(run)
+        }
+
+    def drop_hot_indexes(self):
+        schema_editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for model, name in HOT_INDEXES:
+                index = next(i for i in model._meta.indexes if i.name == name)
+                cursor.execute(str(index.remove_sql(model, schema_editor)))
+
+    def seed(self, count):
+        self.stdout.write(f"Seeding {count} synthetic rows per table...")
+        today = date.today()
+        days = [today - timedelta(days=offset) for offset in range(730)]
+        statuses = ["Pending", "Out for Delivery", "Delivered", "Canceled"]
+
+        category = Category.objects.create(name="Benchmark")
+        products = Product.objects.bulk_create(
+            Product(
+                name=f"Benchmark product {n}",
+                sku=f"BENCH{n}",
+                status=random.choice(["ACTIVE", "INACTIVE"]),
+                category=category,
+                cost=Decimal("10.00"),
+                price=Decimal("15.00"),
+            )
+            for n in range(count)
+        )
+        Inventory.objects.bulk_create(
+            Inventory(product=product, quantity=random.randint(0, 50))
+            for product in products
+        )
+        ProductImage.objects.bulk_create(
+            ProductImage(
+                product=product,
+                image=f"https://example.com/{product.sku}.jpg",
+                is_default=n == 0,
+            )
+            for product in products
+            for n in range(2)
+        )
+        Review.objects.bulk_create(
+            Review(
+                product=random.choice(products),
+                rating=random.randint(1, 5),
+                review_text="Benchmark review",
+                is_verified=random.random() < 0.5,
+            )
+            for _ in range(count)
+        )
+
+        customer = Customer.objects.create(first_name="Benchmark")
+        Sale.objects.bulk_create(
+            Sale(customer=customer, trans_date=random.choice(days), grand_total=15)
+            for _ in range(count)
+        )
+        Order.objects.bulk_create(
+            Order(
+                customer=customer,
+                total_amount=Decimal("15.00"),
+                status=random.choice(statuses),
+            )
+            for _ in range(count)
+        )
+
+        accounts = ChartOfAccounts.objects.bulk_create(
+            ChartOfAccounts(
+                account_name=f"Benchmark {n}",
+                account_type="asset",
+                account_number=f"9{n:05d}",
+            )
+            for n in range(20)
+        )
+        Transaction.objects.bulk_create(
+            (
+                Transaction(
+                    account=random.choice(accounts),
+                    amount=Decimal("10.00"),
+                    transaction_type=random.choice(["debit", "credit"]),
+                    transaction_date=random.choice(days),
+                )
+                for _ in range(count)
+            ),
+            batch_size=1000,
+        )
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.main.services import (
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_MAX_ATTEMPTS,
+    queue_pending_campaigns,
+    send_queued_emails,
+)
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox emails in batches, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=OUTBOX_BATCH_SIZE)
+        parser.add_argument("--max-attempts", type=int, default=OUTBOX_MAX_ATTEMPTS)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling the outbox instead of exiting once it is drained.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to sleep between polls when the outbox is empty.",
+        )
+        parser.add_argument(
+            "--throttle",
+            type=float,
+            default=0,
+            help="Seconds to pause between batches, to respect SMTP rate limits.",
+        )
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            queue_pending_campaigns()
+            sent, failed = send_queued_emails(
+                batch_size=options["batch_size"],
+                max_attempts=options["max_attempts"],
+            )
+            total_sent += sent
+            total_failed += failed
+
+            if sent or failed:
+                time.sleep(options["throttle"])
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Sent {total_sent} email(s), {total_failed} failed.")
+        )
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0002_outboxemail"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NewsletterCampaign",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("subject", models.CharField(max_length=255, verbose_name="Subject")),
+                ("body", models.TextField(blank=True, verbose_name="Text Body")),
+                ("html_body", models.TextField(blank=True, verbose_name="HTML Body")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("queuing", "Queuing"), ("queued", "Queued")],
+                        default="queuing",
+                        max_length=10,
+                    ),
+                ),
+                ("last_subscriber_id", models.BigIntegerField(default=0)),
+                (
+                    "recipients_queued",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Recipients Queued"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created at"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+                ),
+            ],
+            options={
+                "db_table": "newsletter_campaigns",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AlterField(
+            model_name="outboxemail",
+            name="subject",
+            field=models.CharField(blank=True, max_length=255, verbose_name="Subject"),
+        ),
+        migrations.AddField(
+            model_name="outboxemail",
+            name="campaign",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="emails",
+                to="main.newslettercampaign",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="outboxemail",
+            constraint=models.UniqueConstraint(
+                fields=("campaign", "to_email"),
+                name="email_outbox_campaign_recipient_uniq",
+            ),
+        ),
+    ]
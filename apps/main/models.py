@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class Testimonial(models.Model):
@@ -22,3 +23,96 @@ class Subscriber(models.Model):
 
     def __str__(self):
         return self.email
+
+
+class NewsletterCampaign(models.Model):
+    """A newsletter rendered once and fanned out to subscribers through the outbox."""
+
+    STATUS_QUEUING = "queuing"
+    STATUS_QUEUED = "queued"
+    STATUS_CHOICES = [
+        (STATUS_QUEUING, "Queuing"),
+        (STATUS_QUEUED, "Queued"),
+    ]
+
+    subject = models.CharField(max_length=255, verbose_name="Subject")
+    body = models.TextField(blank=True, verbose_name="Text Body")
+    html_body = models.TextField(blank=True, verbose_name="HTML Body")
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUING
+    )
+    # Highest Subscriber id already queued, so an interrupted run can resume
+    last_subscriber_id = models.BigIntegerField(default=0)
+    recipients_queued = models.PositiveIntegerField(
+        default=0, verbose_name="Recipients Queued"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created at")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated at")
+
+    class Meta:
+        db_table = "newsletter_campaigns"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.subject} ({self.status})"
+
+
+class OutboxEmail(models.Model):
+    """One queued message for one recipient, delivered by ``send_queued_emails``."""
+
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENDING, "Sending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    campaign = models.ForeignKey(
+        NewsletterCampaign,
+        related_name="emails",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    to_email = models.EmailField(verbose_name="Recipient")
+    from_email = models.CharField(max_length=254, blank=True, verbose_name="Sender")
+    # Campaign emails leave these blank and render from the campaign instead
+    subject = models.CharField(max_length=255, blank=True, verbose_name="Subject")
+    body = models.TextField(blank=True, verbose_name="Text Body")
+    html_body = models.TextField(blank=True, verbose_name="HTML Body")
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Attempts")
+    last_error = models.TextField(blank=True, verbose_name="Last Error")
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now, verbose_name="Next Attempt at"
+    )
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Sent at")
+    # When a worker took the row for sending; stale claims are taken over
+    claimed_at = models.DateTimeField(null=True, blank=True, verbose_name="Claimed at")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created at")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated at")
+
+    class Meta:
+        db_table = "email_outbox"
+        verbose_name = "Outbox Email"
+        verbose_name_plural = "Outbox Emails"
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"], name="email_outbox_due_idx"
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["campaign", "to_email"],
+                name="email_outbox_campaign_recipient_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email} ({self.status})"
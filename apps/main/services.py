@@ -0,0 +1,239 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import NewsletterCampaign, OutboxEmail, Subscriber
+
+logger = logging.getLogger(__name__)
+
+
+# =================================== Email outbox ===================================
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 5
+# Retries back off 1, 2, 4, 8... minutes after each failed attempt
+OUTBOX_RETRY_BASE = timedelta(minutes=1)
+# A worker that died mid-batch leaves its rows sending; others take them over after this
+OUTBOX_CLAIM_TIMEOUT = timedelta(minutes=10)
+NEWSLETTER_CHUNK_SIZE = 2000
+
+
+def queue_email(subject, recipients, body="", html_body="", from_email=None):
+    """
+    Queue one message per recipient in the outbox and return how many were queued.
+
+    Rows are written in the caller's transaction, so mail for work that is
+    rolled back is never sent. When only ``html_body`` is given the text part
+    is derived from it.
+    """
+    from_email = from_email or getattr(settings, "EMAIL_HOST_USER", None) or ""
+    if html_body and not body:
+        body = strip_tags(html_body)
+
+    emails = OutboxEmail.objects.bulk_create(
+        [
+            OutboxEmail(
+                to_email=recipient,
+                from_email=from_email,
+                subject=subject,
+                body=body,
+                html_body=html_body,
+            )
+            for recipient in dict.fromkeys(recipients)
+            if recipient
+        ]
+    )
+    return len(emails)
+
+
+def _build_message(email, connection):
+    # Campaign rows share the campaign's rendered content instead of a copy each
+    content = email.campaign if email.campaign_id else email
+    message = EmailMultiAlternatives(
+        content.subject,
+        content.body,
+        email.from_email or None,
+        [email.to_email],
+        connection=connection,
+    )
+    if content.html_body:
+        message.attach_alternative(content.html_body, "text/html")
+    return message
+
+
+def claim_due_emails(batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Mark up to ``batch_size`` due outbox emails as sending and return them.
+    The claim commits at once, so no transaction stays open while they are
+    sent, and concurrent workers skip each other's rows.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        email_ids = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=OutboxEmail.STATUS_PENDING, next_attempt_at__lte=now)
+                | Q(
+                    status=OutboxEmail.STATUS_SENDING,
+                    claimed_at__lt=now - OUTBOX_CLAIM_TIMEOUT,
+                )
+            )
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        OutboxEmail.objects.filter(pk__in=email_ids).update(
+            status=OutboxEmail.STATUS_SENDING, claimed_at=now, updated_at=now
+        )
+    return list(
+        OutboxEmail.objects.filter(pk__in=email_ids)
+        .select_related("campaign")
+        .order_by("next_attempt_at", "id")
+    )
+
+
+def send_queued_emails(batch_size=OUTBOX_BATCH_SIZE, max_attempts=OUTBOX_MAX_ATTEMPTS):
+    """
+    Deliver one batch of due outbox emails over a single SMTP connection.
+
+    The batch is claimed first and sent outside any transaction; each
+    outcome is saved as soon as it is known, so a crash mid-batch never
+    forgets mail that already went out. Returns ``(sent, failed)``.
+    """
+    batch = claim_due_emails(batch_size)
+    sent = failed = 0
+    if not batch:
+        return sent, failed
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        # Nothing can go out this round; push the whole batch back
+        logger.error(f"Could not open the email connection: {e}")
+        for email in batch:
+            _record_failure(email, e, max_attempts)
+        return sent, len(batch)
+
+    try:
+        for email in batch:
+            try:
+                _build_message(email, connection).send()
+            except Exception as e:
+                logger.error(f"Error sending email to {email.to_email}: {e}")
+                _record_failure(email, e, max_attempts)
+                failed += 1
+            else:
+                _record_outcome(
+                    email,
+                    status=OutboxEmail.STATUS_SENT,
+                    attempts=email.attempts + 1,
+                    sent_at=timezone.now(),
+                    last_error="",
+                )
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def _record_outcome(email, **fields):
+    # Guarded by the claim, so a worker whose claim was taken over writes nothing
+    OutboxEmail.objects.filter(pk=email.pk, claimed_at=email.claimed_at).update(
+        updated_at=timezone.now(), **fields
+    )
+
+
+def _record_failure(email, error, max_attempts):
+    attempts = email.attempts + 1
+    if attempts >= max_attempts:
+        _record_outcome(
+            email,
+            status=OutboxEmail.STATUS_FAILED,
+            attempts=attempts,
+            last_error=str(error),
+        )
+    else:
+        _record_outcome(
+            email,
+            status=OutboxEmail.STATUS_PENDING,
+            attempts=attempts,
+            last_error=str(error),
+            next_attempt_at=timezone.now() + OUTBOX_RETRY_BASE * 2 ** (attempts - 1),
+        )
+
+
+# =================================== Newsletter campaigns ===================================
+def create_campaign(subject, html_body):
+    """Render a newsletter once; the outbox worker fans it out to subscribers."""
+    return NewsletterCampaign.objects.create(
+        subject=subject, html_body=html_body, body=strip_tags(html_body)
+    )
+
+
+def queue_campaign(campaign, chunk_size=NEWSLETTER_CHUNK_SIZE):
+    """
+    Add one outbox row per subscriber for ``campaign`` and return how many.
+
+    Subscribers are read in id order one chunk at a time. Every chunk locks
+    the campaign row, starts from its stored cursor and commits together with
+    it, so memory stays bounded, a crashed run resumes where it stopped and
+    concurrent workers take turns instead of queuing anyone twice.
+    """
+    from_email = getattr(settings, "EMAIL_HOST_USER", None) or ""
+    queued = 0
+    while True:
+        added, more = _queue_campaign_chunk(campaign.pk, chunk_size, from_email)
+        queued += added
+        if not more:
+            break
+
+    campaign.refresh_from_db(fields=["last_subscriber_id", "recipients_queued"])
+    campaign.status = NewsletterCampaign.STATUS_QUEUED
+    campaign.save(update_fields=["status", "updated_at"])
+    return queued
+
+
+@transaction.atomic
+def _queue_campaign_chunk(campaign_id, chunk_size, from_email):
+    """Queue the next chunk; returns the rows added and whether more may follow."""
+    campaign = NewsletterCampaign.objects.select_for_update().get(pk=campaign_id)
+    chunk = list(
+        Subscriber.objects.filter(id__gt=campaign.last_subscriber_id)
+        .order_by("id")
+        .values_list("id", "email")[:chunk_size]
+    )
+    if not chunk:
+        return 0, False
+
+    emails = [email for _, email in chunk]
+    # Rows left by an interrupted run are skipped and not counted again
+    existing = OutboxEmail.objects.filter(
+        campaign_id=campaign_id, to_email__in=emails
+    ).count()
+    OutboxEmail.objects.bulk_create(
+        [
+            OutboxEmail(campaign_id=campaign_id, to_email=email, from_email=from_email)
+            for email in emails
+        ],
+        ignore_conflicts=True,
+    )
+    added = len(emails) - existing
+    campaign.last_subscriber_id = chunk[-1][0]
+    campaign.recipients_queued += added
+    campaign.save(
+        update_fields=["last_subscriber_id", "recipients_queued", "updated_at"]
+    )
+    return added, len(chunk) == chunk_size
+
+
+def queue_pending_campaigns(chunk_size=NEWSLETTER_CHUNK_SIZE):
+    """Finish queuing every campaign that is new or was interrupted."""
+    campaigns = NewsletterCampaign.objects.filter(
+        status=NewsletterCampaign.STATUS_QUEUING
+    ).order_by("id")
+    return sum(queue_campaign(campaign, chunk_size) for campaign in campaigns)
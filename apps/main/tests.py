@@ -1 +1,156 @@
-# Create your tests here.
+import csv
+import io
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives
+from django.test import TestCase
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from .exports import export_response
+from .models import NewsletterCampaign, OutboxEmail, Subscriber
+from .services import (
+    OUTBOX_CLAIM_TIMEOUT,
+    create_campaign,
+    queue_campaign,
+    queue_email,
+    send_queued_emails,
+)
+
+
+class WorkerCrash(BaseException):
+    """Stands in for a worker killed in the middle of a batch."""
+
+
+class SendQueuedEmailsTests(TestCase):
+    def test_sends_due_emails_once(self):
+        queue_email("Hello", ["a@example.com", "b@example.com"], html_body="<p>Hi</p>")
+
+        self.assertEqual(send_queued_emails(), (2, 0))
+        self.assertEqual(send_queued_emails(), (0, 0))
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(
+            set(OutboxEmail.objects.values_list("status", flat=True)),
+            {OutboxEmail.STATUS_SENT},
+        )
+
+    @mock.patch(
+        "django.core.mail.EmailMultiAlternatives.send", side_effect=OSError("down")
+    )
+    def test_failures_back_off_then_give_up(self, _):
+        queue_email("Hello", ["a@example.com"], body="Hi")
+
+        self.assertEqual(send_queued_emails(max_attempts=2), (0, 1))
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.status, OutboxEmail.STATUS_PENDING)
+        self.assertEqual(email.last_error, "down")
+        self.assertGreater(email.next_attempt_at, timezone.now())
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(send_queued_emails(max_attempts=2), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.STATUS_FAILED)
+        self.assertEqual(email.attempts, 2)
+
+    def test_stale_claims_are_taken_over(self):
+        queue_email("Hello", ["a@example.com"], body="Hi")
+        OutboxEmail.objects.update(
+            status=OutboxEmail.STATUS_SENDING, claimed_at=timezone.now()
+        )
+        self.assertEqual(send_queued_emails(), (0, 0))
+
+        OutboxEmail.objects.update(
+            claimed_at=timezone.now() - OUTBOX_CLAIM_TIMEOUT - timedelta(seconds=1)
+        )
+        self.assertEqual(send_queued_emails(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class NewsletterCampaignTests(TestCase):
+    def setUp(self):
+        Subscriber.objects.bulk_create(
+            Subscriber(email=f"reader{i}@example.com") for i in range(5)
+        )
+        self.campaign = create_campaign("News", "<p>Hello readers</p>")
+
+    def test_queues_each_subscriber_once(self):
+        self.assertEqual(queue_campaign(self.campaign, chunk_size=2), 5)
+        self.assertEqual(queue_campaign(self.campaign, chunk_size=2), 0)
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, NewsletterCampaign.STATUS_QUEUED)
+        self.assertEqual(self.campaign.recipients_queued, 5)
+        self.assertEqual(self.campaign.emails.count(), 5)
+
+    def test_a_crashed_batch_resumes_without_resending(self):
+        queue_campaign(self.campaign)
+        send = EmailMultiAlternatives.send
+        calls = []
+
+        def crash_on_third(message, *args, **kwargs):
+            calls.append(message)
+            if len(calls) == 3:
+                raise WorkerCrash
+            return send(message, *args, **kwargs)
+
+        with mock.patch.object(EmailMultiAlternatives, "send", crash_on_third):
+            with self.assertRaises(WorkerCrash):
+                send_queued_emails()
+        self.assertEqual(
+            self.campaign.emails.filter(status=OutboxEmail.STATUS_SENT).count(), 2
+        )
+
+        # The crashed worker's claim runs out and another worker finishes
+        self.campaign.emails.filter(status=OutboxEmail.STATUS_SENDING).update(
+            claimed_at=timezone.now() - OUTBOX_CLAIM_TIMEOUT - timedelta(seconds=1)
+        )
+        self.assertEqual(send_queued_emails(), (3, 0))
+
+        recipients = [message.to[0] for message in mail.outbox]
+        self.assertEqual(len(recipients), 5)
+        self.assertEqual(len(set(recipients)), 5)
+        self.assertEqual(mail.outbox[0].subject, "News")
+
+
+class ExportTests(TestCase):
+    header = ["Customer", "Note", "Amount"]
+    rows = [
+        ('=HYPERLINK("http://example.com")', "+254700000000", Decimal("-5.00")),
+        ("-1+1", "@SUM(A1)", -5),
+        ("Jane", "a = b", 7),
+    ]
+
+    def test_csv_escapes_formulas(self):
+        response = export_response("csv", "customers", self.header, iter(self.rows))
+        content = b"".join(response.streaming_content).decode()
+
+        self.assertEqual(
+            list(csv.reader(io.StringIO(content))),
+            [
+                self.header,
+                ['\'=HYPERLINK("http://example.com")', "'+254700000000", "-5.00"],
+                ["'-1+1", "'@SUM(A1)", "-5"],
+                ["Jane", "a = b", "7"],
+            ],
+        )
+
+    def test_xlsx_escapes_formulas(self):
+        response = export_response("xlsx", "customers", self.header, iter(self.rows))
+        sheet = load_workbook(io.BytesIO(b"".join(response.streaming_content))).active
+        cells = list(sheet.iter_rows(min_row=2))
+
+        self.assertFalse(
+            [cell for row in cells for cell in row if cell.data_type == "f"]
+        )
+        self.assertEqual(
+            [[cell.value for cell in row] for row in cells],
+            [
+                ['\'=HYPERLINK("http://example.com")', "'+254700000000", -5],
+                ["'-1+1", "'@SUM(A1)", -5],
+                ["Jane", "a = b", 7],
+            ],
+        )
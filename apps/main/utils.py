@@ -1,5 +1,7 @@
 from django.db.models import Sum, F
+from django.db.models.functions import ExtractMonth
 from apps.products.models import Product
+from apps.sales.models import DailySalesSummary
 
 
 def get_top_selling_products():
@@ -11,3 +13,16 @@ def get_top_selling_products():
         .filter(total_quantity_sold__gt=0)  # Only include products that have been sold
         .order_by("-total_quantity_sold")[:6]
     )
+
+
+def get_monthly_earnings(year):
+    """Return 12 monthly revenue totals for ``year`` from the daily sales rollup."""
+    totals = dict(
+        DailySalesSummary.objects.filter(date__year=year)
+        .annotate(month=ExtractMonth("date"))
+        .values("month")
+        .annotate(total=Sum("revenue"))
+        .order_by()
+        .values_list("month", "total")
+    )
+    return [float(totals.get(month) or 0) for month in range(1, 13)]
@@ -1,30 +1,33 @@
 import json
-from django.conf import settings
-from django.core.mail import send_mail
 from django.http import JsonResponse
 from decimal import Decimal
 from datetime import date, timedelta
 from django.db.models.functions import ExtractYear
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, FloatField, F
+from django.db.models import Q, Sum, Value
 from django.db.models.functions import Coalesce
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.core.paginator import Paginator, EmptyPage
+from django.core.paginator import Paginator
 
 from apps.products.models import Product, Category, Review
-from apps.sales.models import Sale
-from apps.orders.models import Cart, CartItem, Order, Wishlist
+from apps.sales.models import Sale, DailySalesSummary
+from apps.orders.models import Order, Wishlist
+from apps.orders.services import get_cart_summary
 
 from .models import Testimonial, Subscriber
 from .forms import TestimonialForm, NewsletterForm, EmailForm
+from .services import create_campaign
 from apps.products.forms import ProductFilterForm
+from apps.products.catalogue import catalogue_filters, get_catalogue_page
+from apps.products.ratings import verify_review
 
 from apps.authentication.decorators import (
     admin_or_manager_or_staff_required,
 )
 
 from .utils import (
+    get_monthly_earnings,
     get_top_selling_products,
 )
 
@@ -35,7 +38,7 @@ def index(request):
     form = ProductFilterForm(request.GET)
 
     # Start with all active products
-    products = Product.objects.prefetch_related("images").order_by("name")
+    products = Product.objects.for_cards().order_by("name")
 
     # Initialize counts for cart, wishlist, and orders
     cart_count = 0
@@ -46,14 +49,8 @@ def index(request):
     if request.user.is_authenticated:
         customer = getattr(request.user, "customer", None)
 
-        # Get or create the user's cart
-        cart, _ = Cart.objects.get_or_create(user=request.user)
-        cart_count = (
-            CartItem.objects.filter(cart=cart).aggregate(
-                total_quantity=Sum("quantity")
-            )["total_quantity"]
-            or 0
-        )
+        # The cart quantity comes from the cached cart summary
+        cart_count = get_cart_summary(request.user.id)["count"]
 
         # Fetch the user's wishlist count
         wishlist_count = Wishlist.objects.filter(user=request.user).count()
@@ -61,57 +58,23 @@ def index(request):
         # Fetch the user's order count, ensuring a valid customer instance
         order_count = Order.objects.filter(customer=customer).count() if customer else 0
 
-    # Apply filters if the form is valid
-    if form.is_valid():
-        category_filter = form.cleaned_data.get("category")
-        min_price = form.cleaned_data.get("min_price")
-        max_price = form.cleaned_data.get("max_price")
-        search_query = form.cleaned_data.get("search")
-
-        # Filter by category if selected
-        if category_filter:
-            products = products.filter(category=category_filter)
-
-        # Filter by price range if provided
-        if min_price is not None and max_price is not None:
-            products = products.filter(price__gte=min_price, price__lte=max_price)
-        elif min_price is not None:
-            products = products.filter(price__gte=min_price)
-        elif max_price is not None:
-            products = products.filter(price__lte=max_price)
-
-        # Filter by search query if provided
-        if search_query:
-            products = products.filter(name__icontains=search_query)
-
-    # Pagination setup
-    paginator = Paginator(products, 16)
-    page_number = request.GET.get("page", 1)
-
-    try:
-        page_number = int(page_number)
-        if page_number < 1:
-            page_number = 1
-    except ValueError:
-        page_number = 1
-
-    try:
-        page_obj = paginator.page(page_number)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
+    # Filtered, paginated products are read through the catalogue cache
+    page_obj = get_catalogue_page(
+        "index",
+        products,
+        catalogue_filters(form),
+        request.GET.get("page", 1),
+        16,
+    )
 
     # Prepare the products with images
     products_with_images = []
     for product in page_obj:
-        images = product.images.filter(is_default=True)
-        if not images.exists():
-            images = product.images.all()
-
         # Just use product's price directly
         products_with_images.append(
             {
                 "product": product,
-                "images": images,
+                "images": product.get_card_images(),
                 "min_price": product.price,  # Direct price from Product
                 "max_price": product.price,
             }
@@ -181,59 +144,30 @@ def get_total_sales_for_period(start_date, end_date):
 def dashboard(request):
     today = date.today()
     year = today.year
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
 
-    # Helper function to get total sales for a period
-    def get_total_sales_for_period(start_date, end_date):
-        return (
-            Sale.objects.filter(trans_date__range=[start_date, end_date]).aggregate(
-                total_sales=Coalesce(Sum("grand_total"), 0.0)
-            )["total_sales"]
-            or 0
-        )
-
-    # Calculate monthly and annual earnings
-    monthly_earnings = [
-        Sale.objects.filter(trans_date__year=year, trans_date__month=month).aggregate(
-            total=Coalesce(Sum("grand_total"), 0.0)
-        )["total"]
-        for month in range(1, 13)
-    ]
+    # Calculate monthly and annual earnings from the daily rollup
+    monthly_earnings = get_monthly_earnings(year)
     annual_earnings = format(sum(monthly_earnings), ".2f")
     avg_month = format(sum(monthly_earnings) / 12, ".2f")
 
-    # Get total sales for today, week, and month
-    total_sales_today = get_total_sales_for_period(today, today)
-    total_sales_week = get_total_sales_for_period(
-        today - timedelta(days=today.weekday()), today
+    # Get total sales for today, week and month plus all-time profit in one query
+    zero = Value(Decimal("0"))
+    totals = DailySalesSummary.objects.aggregate(
+        total_sales_today=Coalesce(Sum("revenue", filter=Q(date=today)), zero),
+        total_sales_week=Coalesce(
+            Sum("revenue", filter=Q(date__range=[week_start, today])), zero
+        ),
+        total_sales_month=Coalesce(
+            Sum("revenue", filter=Q(date__range=[month_start, today])), zero
+        ),
+        total_profit_after_sales=Coalesce(Sum("profit"), zero),
     )
-    total_sales_month = get_total_sales_for_period(today.replace(day=1), today)
 
     # Get top-selling products using the new method
     top_products = get_top_selling_products()
 
-    # Fetch all sales and prefetch related data
-    sales = Sale.objects.prefetch_related("items__product")
-
-    # Initialize total profit after sales
-    total_profit_after_sales = Decimal(0)
-
-    # Calculate total profit from all sales
-    for sale in sales:
-        for item in sale.items.all():
-            product = item.product
-
-            # Determine cost and price details for the product
-            cost = product.cost  # Direct cost from Product model
-            discounted_price = item.price  # Price directly from SaleDetail
-
-            # Calculate and accumulate profit
-            item_profit = (Decimal(discounted_price) - Decimal(cost)) * Decimal(
-                item.quantity
-            )
-            total_profit_after_sales += item_profit
-
-    # total_profit_after_sales now holds the total profit from all sales
-
     # Total stock from Inventory
     total_stock = Product.objects.filter(status="ACTIVE").aggregate(
         total=Coalesce(Sum("inventory__quantity"), 0)
@@ -246,11 +180,11 @@ def dashboard(request):
         "annual_earnings": annual_earnings,
         "monthly_earnings": json.dumps(monthly_earnings),
         "avg_month": avg_month,
-        "total_sales_today": total_sales_today,
-        "total_sales_week": total_sales_week,
-        "total_sales_month": total_sales_month,
+        "total_sales_today": totals["total_sales_today"],
+        "total_sales_week": totals["total_sales_week"],
+        "total_sales_month": totals["total_sales_month"],
         "top_products": top_products,
-        "total_profit_after_sales": total_profit_after_sales,
+        "total_profit_after_sales": totals["total_profit_after_sales"],
     }
 
     return render(request, "main/dashboard.html", context)
@@ -259,21 +193,7 @@ def dashboard(request):
 @login_required
 @admin_or_manager_or_staff_required
 def monthly_earnings_view(request):
-    today = date.today()
-    year = today.year
-    monthly_earnings = []
-
-    for month in range(1, 13):
-        earning = (
-            Sale.objects.filter(trans_date__year=year, trans_date__month=month)
-            .aggregate(
-                total_variable=Coalesce(
-                    Sum(F("grand_total")), 0.0, output_field=FloatField()
-                )
-            )
-            .get("total_variable")
-        )
-        monthly_earnings.append(earning)
+    monthly_earnings = get_monthly_earnings(date.today().year)
 
     return JsonResponse(
         {
@@ -300,18 +220,18 @@ def monthly_earnings_view(request):
 @login_required
 @admin_or_manager_or_staff_required
 def sales_data_api(request):
-    # Query to get total sales grouped by year
+    # Query to get total sales grouped by year from the daily rollup
     sales_per_year = (
-        Sale.objects.annotate(year=ExtractYear("trans_date"))
+        DailySalesSummary.objects.annotate(year=ExtractYear("date"))
         .values("year")
-        .annotate(total_sales=Sum("grand_total"))
+        .annotate(total_sales=Sum("revenue"))
         .order_by("year")
     )
 
     # Prepare the data as a dictionary
     data = {
         "years": [item["year"] for item in sales_per_year],
-        "total_sales": [item["total_sales"] for item in sales_per_year],
+        "total_sales": [float(item["total_sales"]) for item in sales_per_year],
     }
 
     # Return the data as JSON
@@ -440,23 +360,14 @@ def send_bulk_email_view(request):
         if form.is_valid():
             subject = form.cleaned_data["subject"]
             message = form.cleaned_data["message"]  # This will be rich text
-            from_email = settings.EMAIL_HOST_USER
-
-            # Fetch all subscriber emails
-            recipients = list(Subscriber.objects.values_list("email", flat=True))
 
+            # The outbox worker fans the campaign out, one message per subscriber
+            recipients = Subscriber.objects.count()
             if recipients:
-                send_mail(
-                    subject,
-                    message,
-                    from_email,
-                    recipients,
-                    fail_silently=False,
-                    html_message=message,  # Send the message as HTML content
-                )
+                create_campaign(subject, message)
                 messages.success(
                     request,
-                    "Email sent successfully to all subscribers.",
+                    f"Newsletter queued for {recipients} subscriber(s).",
                     extra_tags="bg-success",
                 )
             else:
@@ -489,8 +400,7 @@ def reviews_list_view(request):
         review = get_object_or_404(Review, id=review_id)
 
         if action == "verify" and not review.is_verified:
-            review.is_verified = True
-            review.save()
+            verify_review(review)
             messages.success(
                 request,
                 f"Review for {review.product.name} has been verified.",
@@ -506,10 +416,8 @@ def toggle_is_verified(request, review_id):
     # Fetch the review object based on the given ID
     review = get_object_or_404(Review, id=review_id)
 
-    # Toggle the 'is_verified' status if it's not already verified
-    if not review.is_verified:
-        review.is_verified = True
-        review.save()
+    # Verify it once and count it in the product's rating summary
+    verify_review(review)
 
     # Return a JSON response with the updated status
     return JsonResponse({"is_verified": review.is_verified})
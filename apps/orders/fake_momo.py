@@ -0,0 +1,182 @@
+"""
+An in-process stand-in for the MTN MoMo collection API used by
+``apps.orders.payments``, for local development and tests::
+
+    gateway = FakeMomoGateway(outcome="SUCCESSFUL").start()
+    settings.MTN_BASE_URL = gateway.url
+    ...
+    gateway.shutdown()
+"""
+
+import base64
+import json
+import logging
+import re
+import threading
+import time
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+FAKE_MOMO_OUTCOMES = ("SUCCESSFUL", "FAILED", "PENDING")
+STATUS_PATH = re.compile(r"^/collection/v1_0/requesttopay/([0-9a-f-]{36})$")
+
+
+class FakeMomoGateway(ThreadingHTTPServer):
+    """
+    Issues tokens, accepts requests to pay once per reference and reports
+    them PENDING for ``delay`` seconds, then as ``outcome``. Requests that
+    carry an X-Callback-Url get the outcome POSTed there once it is final.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self, address=("127.0.0.1", 0), outcome="SUCCESSFUL", delay=0, token_ttl=3600
+    ):
+        super().__init__(address, FakeMomoHandler)
+        self.outcome = outcome
+        self.delay = delay
+        self.token_ttl = token_ttl
+        self.tokens = {}
+        self.payments = {}
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def issue_token(self):
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.tokens[token] = time.monotonic() + self.token_ttl
+        return token
+
+    def token_valid(self, token):
+        with self.lock:
+            return self.tokens.get(token, 0) > time.monotonic()
+
+    def add_payment(self, reference, payment, callback_url=None):
+        """Store a request to pay; False if ``reference`` is already taken."""
+        with self.lock:
+            if reference in self.payments:
+                return False
+            self.payments[reference] = dict(
+                payment, _created=time.monotonic(), _callback_url=callback_url
+            )
+        if callback_url and self.outcome != "PENDING":
+            timer = threading.Timer(self.delay, self.deliver_callback, [reference])
+            timer.daemon = True
+            timer.start()
+        return True
+
+    def payment_status(self, reference):
+        with self.lock:
+            payment = self.payments.get(reference)
+        if payment is None:
+            return None
+        if time.monotonic() - payment["_created"] < self.delay:
+            status = "PENDING"
+        else:
+            status = self.outcome
+        result = {key: value for key, value in payment.items() if key[0] != "_"}
+        result["status"] = status
+        if status == "SUCCESSFUL":
+            result["financialTransactionId"] = str(uuid.UUID(reference).int)[:9]
+        return result
+
+    def deliver_callback(self, reference):
+        with self.lock:
+            callback_url = self.payments[reference]["_callback_url"]
+        request = urllib.request.Request(
+            callback_url,
+            data=json.dumps(self.payment_status(reference)).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                logger.debug(f"Callback for {reference}: {response.status}")
+        except OSError as e:
+            logger.warning(f"Callback for {reference} failed: {e}")
+
+
+class FakeMomoHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so clients can reuse pooled connections
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.server.requests.append(("POST", self.path))
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        if self.path.rstrip("/") == "/collection/token":
+            if not self._basic_auth() or not self.headers.get(
+                "Ocp-Apim-Subscription-Key"
+            ):
+                return self._reply(401, {"error": "invalid_client"})
+            return self._reply(
+                200,
+                {
+                    "access_token": self.server.issue_token(),
+                    "token_type": "access_token",
+                    "expires_in": self.server.token_ttl,
+                },
+            )
+
+        if self.path == "/collection/v1_0/requesttopay":
+            if not self._bearer_auth():
+                return self._reply(401, {"message": "Access token is invalid"})
+            reference = self.headers.get("X-Reference-Id", "")
+            try:
+                uuid.UUID(reference)
+                payment = json.loads(body)
+            except ValueError:
+                return self._reply(400, {"code": "INVALID_REQUEST"})
+            callback_url = self.headers.get("X-Callback-Url")
+            if not self.server.add_payment(reference, payment, callback_url):
+                return self._reply(409, {"code": "RESOURCE_ALREADY_EXIST"})
+            return self._reply(202)
+
+        self._reply(404, {"code": "NOT_FOUND"})
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path))
+        match = STATUS_PATH.match(self.path)
+        if not match:
+            return self._reply(404, {"code": "NOT_FOUND"})
+        if not self._bearer_auth():
+            return self._reply(401, {"message": "Access token is invalid"})
+        payment = self.server.payment_status(match.group(1))
+        if payment is None:
+            return self._reply(404, {"code": "RESOURCE_NOT_FOUND"})
+        self._reply(200, payment)
+
+    def _basic_auth(self):
+        scheme, _, credentials = self.headers.get("Authorization", "").partition(" ")
+        try:
+            return scheme == "Basic" and b":" in base64.b64decode(credentials)
+        except ValueError:
+            return False
+
+    def _bearer_auth(self):
+        scheme, _, token = self.headers.get("Authorization", "").partition(" ")
+        return scheme == "Bearer" and self.server.token_valid(token)
+
+    def _reply(self, status, data=None):
+        body = json.dumps(data).encode() if data is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from apps.orders.fake_momo import FAKE_MOMO_OUTCOMES, FakeMomoGateway
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve a fake MTN MoMo collection API for development. Set MTN_BASE_URL "
+        "to the printed address and any MTN_* credentials."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument(
+            "--outcome",
+            choices=FAKE_MOMO_OUTCOMES,
+            default="SUCCESSFUL",
+            help="Final status of every request to pay.",
+        )
+        parser.add_argument(
+            "--delay",
+            type=float,
+            default=10,
+            help="Seconds a request to pay stays PENDING before its outcome.",
+        )
+
+    def handle(self, *args, **options):
+        gateway = FakeMomoGateway(
+            (options["host"], options["port"]),
+            outcome=options["outcome"],
+            delay=options["delay"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Fake MoMo gateway on {gateway.url}"))
+        try:
+            gateway.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            gateway.server_close()
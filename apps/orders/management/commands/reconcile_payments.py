@@ -0,0 +1,54 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.orders.payments import (
+    PAYMENT_RECONCILE_WORKERS,
+    PAYMENT_STALE_AFTER,
+    reconcile_pending_payments,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Settle Mobile Money payments left pending without a callback by asking "
+        "MoMo for their status, several at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--stale-after",
+            type=float,
+            default=PAYMENT_STALE_AFTER.total_seconds() / 60,
+            help="Minutes a payment stays pending before it is checked.",
+        )
+        parser.add_argument("--workers", type=int, default=PAYMENT_RECONCILE_WORKERS)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep sweeping instead of exiting after one pass.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=60,
+            help="Seconds to sleep between sweeps when looping.",
+        )
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(minutes=options["stale_after"])
+        while True:
+            counts = reconcile_pending_payments(
+                stale_after=stale_after, workers=options["workers"]
+            )
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{counts['completed']} payment(s) completed, {counts['failed']} "
+                f"failed, {counts['pending']} still pending."
+            )
+        )
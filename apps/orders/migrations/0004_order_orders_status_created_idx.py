@@ -0,0 +1,19 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0003_cart_updated_at_cartitem_created_at_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["status", "-created_at"], name="orders_status_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0004_order_orders_status_created_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaymentEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "provider",
+                    models.CharField(
+                        choices=[("momo", "MTN MoMo"), ("flutterwave", "Flutterwave")],
+                        max_length=20,
+                    ),
+                ),
+                ("transaction_id", models.CharField(max_length=100)),
+                (
+                    "payment_status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("payload", models.JSONField(default=dict)),
+                (
+                    "received_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Received at"),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["transaction_id"], name="orders_transaction_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("payment_status", "pending")),
+                fields=["updated_at"],
+                name="orders_payment_pending_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="paymentevent",
+            constraint=models.UniqueConstraint(
+                fields=("provider", "transaction_id"),
+                name="payment_event_transaction_uniq",
+            ),
+        ),
+    ]
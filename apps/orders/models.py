@@ -1,11 +1,19 @@
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
-from apps.products.models import Product
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from apps.products.models import Product, discounted_price_expression
 from apps.customers.models import Customer
 from django.contrib.auth.models import User
 from django.utils.functional import cached_property
 
+# A cart line's price after discount and its total, for CartItem queries
+CART_UNIT_PRICE = discounted_price_expression("product__")
+CART_LINE_TOTAL = ExpressionWrapper(
+    CART_UNIT_PRICE * F("quantity"),
+    output_field=DecimalField(max_digits=12, decimal_places=2),
+)
+
 
 class Cart(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -16,7 +24,7 @@ class Cart(models.Model):
         return f"Cart of {self.user.username}"
 
     def get_total_price(self):
-        return sum(item.get_total_price() for item in self.items.all())
+        return self.items.aggregate(total=Sum(CART_LINE_TOTAL))["total"] or 0
 
     def checkout(self, payment_method, total_amount):
         order = Order.objects.create(
@@ -96,6 +104,22 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created at")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated at")
 
+    class Meta:
+        indexes = [
+            # Orders to process and the navbar badge: by status, newest first
+            models.Index(
+                fields=["status", "-created_at"], name="orders_status_created_idx"
+            ),
+            # Payment callbacks find their order by transaction id
+            models.Index(fields=["transaction_id"], name="orders_transaction_idx"),
+            # Reconciliation sweeps pending payments by age
+            models.Index(
+                fields=["updated_at"],
+                condition=models.Q(payment_status="pending"),
+                name="orders_payment_pending_idx",
+            ),
+        ]
+
     def __str__(self):
         # Use customer full name regardless of online or offline
         return f"Order {self.id} by {self.customer.full_name()}"
@@ -142,6 +166,33 @@ class OrderDetail(models.Model):
         super().save(*args, **kwargs)
 
 
+class PaymentEvent(models.Model):
+    """A verified provider callback, recorded once per transaction."""
+
+    PROVIDER_CHOICES = [
+        ("momo", "MTN MoMo"),
+        ("flutterwave", "Flutterwave"),
+    ]
+    provider = models.CharField(max_length=20, choices=PROVIDER_CHOICES)
+    transaction_id = models.CharField(max_length=100)
+    payment_status = models.CharField(
+        max_length=20, choices=Order.PAYMENT_STATUS_CHOICES
+    )
+    payload = models.JSONField(default=dict)
+    received_at = models.DateTimeField(auto_now_add=True, verbose_name="Received at")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["provider", "transaction_id"],
+                name="payment_event_transaction_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_provider_display()} {self.transaction_id}: {self.payment_status}"
+
+
 class Wishlist(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
@@ -0,0 +1,443 @@
+import hmac
+import logging
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+import requests
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .models import Order, PaymentEvent
+
+logger = logging.getLogger(__name__)
+
+
+# =================================== Gateway client ===================================
+MOMO_TOKEN_CACHE_KEY = "momo:access_token"
+# Cached tokens are dropped this many seconds before MoMo expires them
+MOMO_TOKEN_MARGIN = 60
+MOMO_POOL_SIZE = 10
+# Requests to pay are identified by uuid5(namespace, Order.external_id)
+MOMO_REFERENCE_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "pure-shopper/momo")
+# MoMo request-to-pay statuses as Order.payment_status values
+MOMO_PAYMENT_STATUSES = {
+    "PENDING": "pending",
+    "SUCCESSFUL": "completed",
+    "FAILED": "failed",
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class PaymentError(Exception):
+    """The payment service refused a request or could not be reached."""
+
+
+def get_session():
+    """The process-wide gateway session, so connections are pooled and reused."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # Every call is safe to repeat: requests to pay carry a fixed
+                # reference id, so MoMo answers a resubmission with 409
+                retries = Retry(
+                    total=2,
+                    backoff_factor=0.5,
+                    status_forcelist=(502, 503, 504),
+                    allowed_methods=None,
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=MOMO_POOL_SIZE, max_retries=retries
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _url(path):
+    return f"{settings.MTN_BASE_URL.rstrip('/')}/collection/{path}"
+
+
+def _timeout():
+    return (settings.MTN_CONNECT_TIMEOUT, settings.MTN_READ_TIMEOUT)
+
+
+def get_access_token(refresh=False):
+    """
+    A collection API bearer token, cached until shortly before it expires.
+    Returns None when the credentials are missing or refused.
+    """
+    if not refresh:
+        token = cache.get(MOMO_TOKEN_CACHE_KEY)
+        if token:
+            return token
+
+    client_id = settings.MTN_CLIENT_ID
+    client_secret = settings.MTN_CLIENT_SECRET
+    subscription_key = settings.MTN_SUBSCRIPTION_KEY
+    if not client_id or not client_secret or not subscription_key:
+        logger.error("MTN API credentials are missing in settings.")
+        return None
+
+    try:
+        response = get_session().post(
+            _url("token/"),
+            auth=(client_id, client_secret),
+            headers={"Ocp-Apim-Subscription-Key": subscription_key},
+            timeout=_timeout(),
+        )
+        response.raise_for_status()
+        data = response.json()
+    except (requests.RequestException, ValueError) as e:
+        logger.error(f"Error fetching access token: {e}")
+        return None
+
+    token = data.get("access_token")
+    if token:
+        expires_in = int(data.get("expires_in") or 3600)
+        cache.set(
+            MOMO_TOKEN_CACHE_KEY, token, timeout=max(expires_in - MOMO_TOKEN_MARGIN, 1)
+        )
+    return token
+
+
+def _call(method, path, headers=None, **kwargs):
+    """Call the collection API, fetching a new token once if the cached one is refused."""
+    for refresh in (False, True):
+        token = get_access_token(refresh=refresh)
+        if not token:
+            raise PaymentError("Failed to authenticate with the payment service.")
+        try:
+            response = get_session().request(
+                method,
+                _url(path),
+                headers={
+                    "Authorization": f"Bearer {token}",
+                    "Ocp-Apim-Subscription-Key": settings.MTN_SUBSCRIPTION_KEY,
+                    "X-Target-Environment": settings.MTN_TARGET_ENVIRONMENT,
+                    **(headers or {}),
+                },
+                timeout=_timeout(),
+                **kwargs,
+            )
+        except requests.RequestException as e:
+            logger.error(f"Request error occurred: {e}")
+            raise PaymentError(
+                "Payment failed due to server error. Please try again."
+            ) from e
+        if response.status_code != 401:
+            break
+    return response
+
+
+# =================================== Requests to pay ===================================
+# Pending requests to pay older than this are no longer reconciled
+MOMO_RECONCILE_WINDOW = timedelta(days=1)
+
+
+def payment_reference(order):
+    """The X-Reference-Id of ``order``'s current payment attempt."""
+    return str(uuid.uuid5(MOMO_REFERENCE_NAMESPACE, order.external_id))
+
+
+def _start_attempt(order):
+    """
+    Give ``order`` a fresh ``external_id`` unless an attempt is already in
+    flight, so a resubmitted form reuses the same reference.
+    """
+    if (
+        order.external_id
+        and order.transaction_id == payment_reference(order)
+        and order.payment_status != "failed"
+    ):
+        return
+    external_id = uuid.uuid4().hex
+    Order.objects.filter(pk=order.pk, external_id=order.external_id).update(
+        external_id=external_id,
+        transaction_id=str(uuid.uuid5(MOMO_REFERENCE_NAMESPACE, external_id)),
+        payment_status="pending",
+        updated_at=timezone.now(),
+    )
+    # Reloaded because a concurrent submit may have started the attempt first
+    order.refresh_from_db(fields=["external_id", "transaction_id", "payment_status"])
+
+
+def request_to_pay(order, phone_number):
+    """
+    Ask the customer to approve payment of ``order`` from ``phone_number`` and
+    return the reference. MoMo reports the outcome to ``momo_callback_url``;
+    ``reconcile_pending_payments`` catches payments whose callback never came.
+    """
+    if order.payment_status == "completed":
+        raise PaymentError("This order has already been paid.")
+
+    _start_attempt(order)
+    reference = payment_reference(order)
+    payment_data = {
+        "amount": str(order.total_amount),
+        "currency": settings.MTN_CURRENCY,
+        "externalId": order.external_id,
+        "payer": {
+            "partyIdType": "MSISDN",
+            # MSISDN: the E.164 number without its leading "+"
+            "partyId": str(phone_number).lstrip("+"),
+        },
+        "payerMessage": f"Payment for Order #{order.id}",
+        "payeeMessage": "Payment received",
+    }
+    headers = {"X-Reference-Id": reference}
+    callback_url = momo_callback_url(reference)
+    if callback_url:
+        headers["X-Callback-Url"] = callback_url
+    # A network error leaves the order pending: reconciliation finds out
+    # whether MoMo received the request
+    response = _call("post", "v1_0/requesttopay", headers=headers, json=payment_data)
+
+    # 409: MoMo already holds this reference, i.e. the form was resubmitted
+    if response.status_code not in (202, 409):
+        logger.error(f"Payment failed: {response.text}")
+        _settle(order, "failed")
+        raise PaymentError("Payment failed. Please try again.")
+    return reference
+
+
+def fetch_payment_status(reference):
+    """MoMo's status of the request to pay ``reference`` as an ``Order.payment_status``."""
+    response = _call("get", f"v1_0/requesttopay/{reference}")
+    if response.status_code == 404:
+        # The request to pay never reached MoMo
+        return "failed"
+    try:
+        response.raise_for_status()
+        return MOMO_PAYMENT_STATUSES.get(response.json().get("status"), "pending")
+    except (requests.RequestException, ValueError) as e:
+        raise PaymentError(f"Could not read payment {reference}: {e}") from e
+
+
+def _settle(order, payment_status):
+    """Record the outcome of ``order``'s current attempt unless it has moved on."""
+    settled = Order.objects.filter(
+        pk=order.pk, transaction_id=order.transaction_id, payment_status="pending"
+    ).update(payment_status=payment_status, updated_at=timezone.now())
+    if settled:
+        order.payment_status = payment_status
+    return bool(settled)
+
+
+def refresh_payment_status(order):
+    """Update ``order.payment_status`` from MoMo and return it."""
+    payment_status = fetch_payment_status(order.transaction_id)
+    if payment_status != "pending":
+        _settle(order, payment_status)
+    return order.payment_status
+
+
+def settle_payments(transaction_ids, payment_status):
+    """Move the still pending orders of ``transaction_ids`` to ``payment_status``."""
+    return Order.objects.filter(
+        transaction_id__in=transaction_ids, payment_status="pending"
+    ).update(payment_status=payment_status, updated_at=timezone.now())
+
+
+# =================================== Reconciliation ===================================
+# Pending payments without a callback for this long are checked with MoMo
+PAYMENT_STALE_AFTER = timedelta(minutes=10)
+PAYMENT_RECONCILE_WORKERS = 8
+
+
+def _fetch_status_or_pending(reference):
+    try:
+        return fetch_payment_status(reference)
+    except PaymentError as e:
+        logger.warning(f"Payment status of {reference} unavailable: {e}")
+        return "pending"
+
+
+def reconcile_pending_payments(
+    stale_after=PAYMENT_STALE_AFTER, workers=PAYMENT_RECONCILE_WORKERS
+):
+    """
+    Ask MoMo about the Mobile Money payments still pending ``stale_after``
+    after their last change, ``workers`` at a time, and settle them with one
+    UPDATE per outcome. Returns a count of the payments by status.
+    """
+    now = timezone.now()
+    references = list(
+        Order.objects.filter(
+            payment_status="pending",
+            external_id__isnull=False,
+            transaction_id__isnull=False,
+            updated_at__range=(now - MOMO_RECONCILE_WINDOW, now - stale_after),
+        )
+        .order_by("updated_at")
+        .values_list("transaction_id", flat=True)
+    )
+    counts = dict.fromkeys(MOMO_PAYMENT_STATUSES.values(), 0)
+    if not references:
+        return counts
+
+    # Warm the token cache once instead of once per worker
+    get_access_token()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        statuses = dict(zip(references, pool.map(_fetch_status_or_pending, references)))
+
+    for payment_status in counts:
+        settled = [ref for ref, status in statuses.items() if status == payment_status]
+        counts[payment_status] = len(settled)
+        if settled and payment_status != "pending":
+            settle_payments(settled, payment_status)
+    return counts
+
+
+# =================================== Callbacks ===================================
+MOMO_CALLBACK_SALT = "apps.orders.payments.momo-callback"
+FLUTTERWAVE_PAYMENT_STATUSES = {"successful": "completed", "failed": "failed"}
+# Checkout tx_refs are "<prefix><order id>-<attempt>", so webhooks find their
+# order; the order then records Flutterwave's transaction id
+FLUTTERWAVE_TX_REF_PREFIX = "pureshopper-order-"
+
+
+def momo_callback_url(reference):
+    """
+    The signed URL MoMo reports the outcome of ``reference`` to, or None when
+    PAYMENT_CALLBACK_BASE_URL is not set.
+    """
+    if not settings.PAYMENT_CALLBACK_BASE_URL:
+        return None
+    token = signing.Signer(salt=MOMO_CALLBACK_SALT).sign(reference)
+    path = reverse("orders:momo_callback", args=[token])
+    return f"{settings.PAYMENT_CALLBACK_BASE_URL.rstrip('/')}{path}"
+
+
+def verify_momo_callback(token):
+    """The reference signed into a callback URL, or None if it was tampered with."""
+    try:
+        return signing.Signer(salt=MOMO_CALLBACK_SALT).unsign(token)
+    except signing.BadSignature:
+        return None
+
+
+def verify_flutterwave_webhook(signature):
+    """Whether a webhook's ``verif-hash`` header is our Flutterwave secret hash."""
+    secret = settings.FLUTTERWAVE_SECRET_HASH
+    return bool(secret) and hmac.compare_digest(signature or "", secret)
+
+
+def _settle_order(order, transaction_id, payment_status):
+    """
+    Move ``order`` to ``payment_status`` under ``transaction_id`` unless
+    another outcome settled it since it was matched. A success also settles
+    an order whose earlier attempt failed; a failure never overrides a
+    completed payment.
+    """
+    settleable = (
+        ("pending", "failed") if payment_status == "completed" else ("pending",)
+    )
+    return Order.objects.filter(
+        pk=order.pk,
+        transaction_id=order.transaction_id,
+        payment_status__in=settleable,
+    ).update(
+        payment_status=payment_status,
+        transaction_id=transaction_id,
+        updated_at=timezone.now(),
+    )
+
+
+def record_payment_event(provider, transaction_id, payment_status, payload, order):
+    """
+    Store a verified callback for ``order`` and settle it. Returns False when
+    the transaction was already recorded, so redelivered callbacks change nothing.
+    """
+    with transaction.atomic():
+        _, created = PaymentEvent.objects.get_or_create(
+            provider=provider,
+            transaction_id=transaction_id,
+            defaults={"payment_status": payment_status, "payload": payload},
+        )
+        if created:
+            _settle_order(order, transaction_id, payment_status)
+    return created
+
+
+def _record_outcome(provider, transaction_id, payment_status, payload, order):
+    # Intermediate statuses are not recorded so the final one is not deduplicated
+    if not transaction_id or payment_status not in ("completed", "failed"):
+        return "ignored"
+    # Nothing is recorded for unknown orders, so a later delivery still applies
+    if order is None:
+        return "unmatched"
+    if record_payment_event(provider, transaction_id, payment_status, payload, order):
+        return "recorded"
+    return "duplicate"
+
+
+def handle_momo_callback(reference, payload):
+    """Apply a MoMo callback for the signed ``reference``."""
+    payment_status = MOMO_PAYMENT_STATUSES.get(payload.get("status"))
+    order = Order.objects.filter(transaction_id=reference).first()
+    return _record_outcome("momo", reference, payment_status, payload, order)
+
+
+def _flutterwave_order(tx_ref):
+    """The order a checkout ``tx_ref`` was made for, or None."""
+    match = re.fullmatch(
+        rf"{re.escape(FLUTTERWAVE_TX_REF_PREFIX)}(\d+)-\w+", tx_ref or ""
+    )
+    if match is None:
+        return None
+    return Order.objects.filter(pk=match[1]).first()
+
+
+def _flutterwave_amount_matches(order, data):
+    try:
+        amount = Decimal(str(data.get("amount")))
+    except InvalidOperation:
+        return False
+    return (
+        amount == order.total_amount
+        and data.get("currency") == settings.FLUTTERWAVE_CURRENCY
+    )
+
+
+def handle_flutterwave_webhook(payload):
+    """
+    Apply a verified Flutterwave webhook. The order comes from the ``tx_ref``
+    the checkout was opened with, and a payment only settles it when its
+    amount and currency are the order's. Events are recorded under
+    Flutterwave's own transaction id, as every charge retried under the
+    same ``tx_ref`` gets a new one.
+    """
+    data = payload.get("data") or {}
+    tx_ref = data.get("tx_ref")
+    flutterwave_id = str(data["id"]) if data.get("id") else None
+    payment_status = FLUTTERWAVE_PAYMENT_STATUSES.get(data.get("status"))
+    order = _flutterwave_order(tx_ref)
+    if (
+        order is not None
+        and payment_status == "completed"
+        and not _flutterwave_amount_matches(order, data)
+    ):
+        logger.warning(
+            f"Flutterwave payment {tx_ref} of {data.get('amount')} {data.get('currency')}"
+            f" does not match order #{order.pk}"
+        )
+        return "mismatch"
+    return _record_outcome(
+        "flutterwave", flutterwave_id, payment_status, payload, order
+    )
@@ -0,0 +1,172 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import (
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    Prefetch,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce
+
+from apps.products.models import ProductImage
+
+from .models import CART_LINE_TOTAL, CART_UNIT_PRICE, CartItem, Order, OrderDetail
+
+
+# =================================== Cart ===================================
+# Summaries are dropped by the CartItem signals in apps.authentication.navbar
+CART_SUMMARY_TIMEOUT = 300
+
+CART_LINE_SUBTOTAL = ExpressionWrapper(
+    F("product__price") * F("quantity"),
+    output_field=DecimalField(max_digits=12, decimal_places=2),
+)
+CENTS = Decimal("0.01")
+ZERO = Value(
+    Decimal("0.00"), output_field=DecimalField(max_digits=12, decimal_places=2)
+)
+
+
+def cart_summary_key(user_id):
+    return f"cart:summary:{user_id}"
+
+
+def get_cart_lines(cart, with_images=False):
+    """
+    The cart's items in one query, each annotated with its discounted
+    ``unit_price`` and ``line_total``. ``with_images`` also prefetches the
+    product images the confirmation emails use.
+    """
+    items = (
+        CartItem.objects.filter(cart=cart)
+        .select_related("product__category")
+        .annotate(unit_price=CART_UNIT_PRICE, line_total=CART_LINE_TOTAL)
+        .order_by("id")
+    )
+    if with_images:
+        items = items.prefetch_related(
+            Prefetch(
+                "product__images",
+                queryset=ProductImage.objects.filter(
+                    status=ProductImage.READY
+                ).order_by("-is_default", "-created_at"),
+                to_attr="prefetched_images",
+            )
+        )
+    return list(items)
+
+
+def get_cart_total(items):
+    return sum((item.line_total for item in items), Decimal("0.00"))
+
+
+def summarize_cart(items):
+    """The ``get_cart_summary`` figures for lines already fetched by ``get_cart_lines``."""
+    subtotal = sum(
+        (item.product.price * item.quantity for item in items), Decimal("0.00")
+    )
+    total = get_cart_total(items)
+    return {
+        "count": sum(item.quantity for item in items),
+        "lines": len(items),
+        "subtotal": subtotal,
+        "total": total,
+        "discount": subtotal - total,
+    }
+
+
+def get_cart_summary(user_id, items=None):
+    """
+    Item count, line count, subtotal, discount and total of a user's cart.
+
+    Computed in one aggregate and cached until the cart changes, so the header
+    badge, the cart page and checkout share a single computation. Pages that
+    already hold the priced lines pass them as ``items`` to refresh the cache
+    without another query.
+    """
+    key = cart_summary_key(user_id)
+    if items is not None:
+        summary = summarize_cart(items)
+        cache.set(key, summary, CART_SUMMARY_TIMEOUT)
+        return summary
+
+    def build():
+        summary = CartItem.objects.filter(cart__user_id=user_id).aggregate(
+            count=Coalesce(Sum("quantity"), 0),
+            lines=Count("id"),
+            subtotal=Coalesce(Sum(CART_LINE_SUBTOTAL), ZERO),
+            total=Coalesce(Sum(CART_LINE_TOTAL), ZERO),
+        )
+        for field in ("subtotal", "total"):
+            summary[field] = Decimal(summary[field]).quantize(CENTS)
+        summary["discount"] = summary["subtotal"] - summary["total"]
+        return summary
+
+    return cache.get_or_set(key, build, CART_SUMMARY_TIMEOUT)
+
+
+def invalidate_cart_summary(user_id):
+    """Drop the cached summary once the current transaction has committed."""
+    transaction.on_commit(lambda: cache.delete(cart_summary_key(user_id)))
+
+
+# =================================== Checkout ===================================
+CHECKOUT_CONTACT_FIELDS = ("first_name", "last_name", "email", "mobile", "address")
+
+
+def _image_url(product):
+    images = product.get_card_images()
+    return images[0].thumbnail_url if images else ""
+
+
+@transaction.atomic
+def place_order(cart, items, customer, contact):
+    """
+    Turn ``cart`` into a pending Order for ``customer`` and empty the cart.
+
+    ``items`` comes from ``get_cart_lines`` and ``contact`` holds the
+    checkout form's customer fields. Returns the order and the per-line
+    summaries used by the confirmation emails.
+    """
+    if not items:
+        raise ValueError("Your cart is empty.")
+
+    for field in CHECKOUT_CONTACT_FIELDS:
+        setattr(customer, field, contact[field])
+    customer.save()
+
+    order = Order.objects.create(
+        customer=customer,
+        total_amount=get_cart_total(items),
+        status="Pending",
+    )
+    OrderDetail.objects.bulk_create(
+        [
+            OrderDetail(
+                order=order,
+                product=item.product,
+                quantity=item.quantity,
+                discounted_price=item.unit_price,
+                price=item.product.price,
+            )
+            for item in items
+        ]
+    )
+    CartItem.objects.filter(cart=cart).delete()
+
+    order_details = [
+        {
+            "product_name": item.product.name,
+            "quantity": item.quantity,
+            "price": item.unit_price,
+            "image_url": _image_url(item.product),
+            "order_status": order.status,
+        }
+        for item in items
+    ]
+    return order, order_details
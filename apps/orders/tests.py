@@ -1 +1,260 @@
-# Create your tests here.
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.customers.models import Customer
+from apps.products.models import Product
+
+from .models import Cart, CartItem, Order, PaymentEvent
+from .payments import (
+    FLUTTERWAVE_TX_REF_PREFIX,
+    handle_flutterwave_webhook,
+    handle_momo_callback,
+    momo_callback_url,
+    reconcile_pending_payments,
+    record_payment_event,
+)
+from .services import get_cart_lines, get_cart_summary
+
+
+def create_order(**fields):
+    customer = Customer.objects.create(first_name="Test", last_name="Customer")
+    return Order.objects.create(
+        customer=customer,
+        total_amount=Decimal("15000.00"),
+        status="Pending",
+        **fields,
+    )
+
+
+def flutterwave_payload(
+    order, status="successful", amount=15000, currency="UGX", flutterwave_id=4001
+):
+    return {
+        "event": "charge.completed",
+        "data": {
+            "id": flutterwave_id,
+            "tx_ref": f"{FLUTTERWAVE_TX_REF_PREFIX}{order.pk}-1",
+            "status": status,
+            "amount": amount,
+            "currency": currency,
+        },
+    }
+
+
+@override_settings(FLUTTERWAVE_SECRET_HASH="secret-hash", FLUTTERWAVE_CURRENCY="UGX")
+class FlutterwaveWebhookTests(TestCase):
+    def setUp(self):
+        self.order = create_order()
+
+    def post(self, payload, signature="secret-hash"):
+        return self.client.post(
+            reverse("orders:flutterwave_webhook"),
+            json.dumps(payload),
+            content_type="application/json",
+            headers={"verif-hash": signature},
+            # Providers call over HTTPS; plain HTTP is redirected
+            secure=True,
+        )
+
+    def test_rejects_a_wrong_signature(self):
+        response = self.post(flutterwave_payload(self.order), signature="forged")
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(PaymentEvent.objects.exists())
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, "pending")
+
+    def test_settles_the_order_of_the_tx_ref(self):
+        response = self.post(flutterwave_payload(self.order))
+
+        self.assertEqual(response.json(), {"result": "recorded"})
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, "completed")
+        self.assertEqual(self.order.transaction_id, "4001")
+
+    def test_redelivery_is_a_duplicate(self):
+        payload = flutterwave_payload(self.order)
+        handle_flutterwave_webhook(payload)
+
+        self.assertEqual(handle_flutterwave_webhook(payload), "duplicate")
+        self.assertEqual(PaymentEvent.objects.count(), 1)
+
+    def test_retry_under_the_same_tx_ref_settles_the_order(self):
+        failed = flutterwave_payload(self.order, status="failed", flutterwave_id=4001)
+        retried = flutterwave_payload(self.order, flutterwave_id=4002)
+
+        self.assertEqual(handle_flutterwave_webhook(failed), "recorded")
+        self.assertEqual(handle_flutterwave_webhook(retried), "recorded")
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, "completed")
+        self.assertEqual(self.order.transaction_id, "4002")
+
+    def test_amount_or_currency_mismatch_is_not_settled(self):
+        for payload in (
+            flutterwave_payload(self.order, amount=100),
+            flutterwave_payload(self.order, currency="USD"),
+        ):
+            self.assertEqual(handle_flutterwave_webhook(payload), "mismatch")
+
+        self.assertFalse(PaymentEvent.objects.exists())
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, "pending")
+
+    def test_unknown_tx_ref_records_nothing(self):
+        payload = {
+            "data": {"id": 4001, "tx_ref": "txref-unknown", "status": "successful"}
+        }
+
+        self.assertEqual(handle_flutterwave_webhook(payload), "unmatched")
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_failure_does_not_override_a_completed_payment(self):
+        Order.objects.filter(pk=self.order.pk).update(payment_status="completed")
+        payload = flutterwave_payload(self.order, status="failed")
+
+        self.assertEqual(handle_flutterwave_webhook(payload), "recorded")
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, "completed")
+
+
+@override_settings(PAYMENT_CALLBACK_BASE_URL="https://shop.example.com")
+class MomoCallbackTests(TestCase):
+    def setUp(self):
+        self.order = create_order(external_id="ext-1", transaction_id="ref-1")
+
+    def test_rejects_a_tampered_token(self):
+        url = momo_callback_url("ref-1").replace("ref-1", "ref-2")
+        response = self.client.post(
+            url.removeprefix("https://shop.example.com"),
+            json.dumps({"status": "SUCCESSFUL"}),
+            content_type="application/json",
+            secure=True,
+        )
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_settles_once(self):
+        self.assertEqual(
+            handle_momo_callback("ref-1", {"status": "SUCCESSFUL"}), "recorded"
+        )
+        self.assertEqual(
+            handle_momo_callback("ref-1", {"status": "FAILED"}), "duplicate"
+        )
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, "completed")
+
+    def test_intermediate_status_is_ignored(self):
+        self.assertEqual(
+            handle_momo_callback("ref-1", {"status": "PENDING"}), "ignored"
+        )
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_failed_event_leaves_a_failed_order_alone(self):
+        Order.objects.filter(pk=self.order.pk).update(payment_status="failed")
+
+        self.assertTrue(record_payment_event("momo", "ref-1", "failed", {}, self.order))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, "failed")
+        self.assertEqual(PaymentEvent.objects.get().payment_status, "failed")
+
+
+class ReconcilePendingPaymentsTests(TestCase):
+    def create_pending(self, reference, age):
+        order = create_order(external_id=f"ext-{reference}", transaction_id=reference)
+        Order.objects.filter(pk=order.pk).update(updated_at=timezone.now() - age)
+        return order
+
+    @mock.patch("apps.orders.payments.get_access_token")
+    @mock.patch("apps.orders.payments.fetch_payment_status")
+    def test_settles_stale_payments_by_outcome(self, fetch_payment_status, _):
+        statuses = {"paid": "completed", "declined": "failed", "waiting": "pending"}
+        fetch_payment_status.side_effect = statuses.get
+        orders = {
+            reference: self.create_pending(reference, timedelta(minutes=30))
+            for reference in statuses
+        }
+        fresh = self.create_pending("fresh", timedelta(minutes=1))
+
+        counts = reconcile_pending_payments()
+
+        self.assertEqual(counts, {"completed": 1, "failed": 1, "pending": 1})
+        for reference, payment_status in statuses.items():
+            orders[reference].refresh_from_db()
+            self.assertEqual(orders[reference].payment_status, payment_status)
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.payment_status, "pending")
+        self.assertNotIn(mock.call("fresh"), fetch_payment_status.call_args_list)
+
+
+class CartSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("shopper")
+        self.cart = Cart.objects.create(user=self.user)
+        soap, salt = [
+            Product.objects.create(
+                name=name,
+                status="ACTIVE",
+                cost=Decimal("5.00"),
+                price=Decimal("12.50"),
+                discount_value=Decimal(discount),
+            )
+            for name, discount in (("Soap", "0"), ("Salt", "10"))
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soap = CartItem.objects.create(
+                cart=self.cart, product=soap, quantity=2
+            )
+            CartItem.objects.create(cart=self.cart, product=salt, quantity=3)
+
+    def test_lines_are_priced_like_the_products(self):
+        lines = get_cart_lines(self.cart)
+
+        self.assertEqual(
+            [(line.unit_price, line.line_total) for line in lines],
+            [
+                (
+                    line.product.get_discounted_price(),
+                    line.product.get_discounted_price() * line.quantity,
+                )
+                for line in lines
+            ],
+        )
+        self.assertEqual(
+            get_cart_summary(self.user.pk),
+            {
+                "count": 5,
+                "lines": 2,
+                "subtotal": Decimal("62.50"),
+                "total": Decimal("58.75"),
+                "discount": Decimal("3.75"),
+            },
+        )
+        self.assertEqual(
+            get_cart_summary(self.user.pk, items=lines), get_cart_summary(self.user.pk)
+        )
+
+    def test_summary_is_cached_until_the_cart_changes(self):
+        summary = get_cart_summary(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cart_summary(self.user.pk), summary)
+
+        self.soap.quantity = 4
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soap.save()
+        self.assertEqual(get_cart_summary(self.user.pk)["count"], 7)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soap.delete()
+        self.assertEqual(get_cart_summary(self.user.pk)["lines"], 1)
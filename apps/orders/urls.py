@@ -54,4 +54,15 @@ urlpatterns = [
         name="confirm_payment",
     ),
     path("payment/flutter/", views.payment_flutter_view, name="payment_flutter"),
+    # provider callbacks
+    path(
+        "payments/momo/callback/<str:token>/",
+        views.momo_callback_view,
+        name="momo_callback",
+    ),
+    path(
+        "payments/flutterwave/webhook/",
+        views.flutterwave_webhook_view,
+        name="flutterwave_webhook",
+    ),
 ]
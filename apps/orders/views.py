@@ -1,25 +1,36 @@
-from django.core.mail import EmailMultiAlternatives
-from django.core.mail import send_mail
-from django.utils.html import strip_tags
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 from django.conf import settings
 from django.contrib import messages
-import requests
+import json
 import uuid
 from django.http import JsonResponse
 import logging
-import base64
 from django.shortcuts import render, get_object_or_404, redirect
 from django.core.exceptions import ObjectDoesNotExist
 from django.contrib.auth.decorators import login_required
-from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods, require_POST
 from django.db import transaction
-from .models import Cart, CartItem, Order, OrderDetail, Wishlist
-from apps.products.models import Product, ProductImage
+from .models import Cart, CartItem, Order, Wishlist
+from apps.products.catalogue import get_product_fragment
+from apps.products.models import Product
 from .forms import CheckoutForm, OrderStatusForm
+from .payments import (
+    FLUTTERWAVE_TX_REF_PREFIX,
+    PaymentError,
+    handle_flutterwave_webhook,
+    handle_momo_callback,
+    request_to_pay,
+    verify_flutterwave_webhook,
+    verify_momo_callback,
+)
+from .services import get_cart_lines, get_cart_summary, place_order
 from apps.customers.models import Customer
-from apps.products.models import Review
+from apps.inventory.services import InsufficientStockError, fulfil_order, return_order
+from apps.main.exports import export_format, export_queryset
+from apps.main.services import queue_email
+from apps.products.models import ProductImage, Review
 
 from apps.authentication.decorators import (
     admin_required,
@@ -75,9 +86,7 @@ def product_detail(request, id):
         return redirect("orders:product_detail", id=id)
 
     # Continue fetching cart and product details
-    cart, created = Cart.objects.get_or_create(user=request.user)
-    cart_items = CartItem.objects.filter(cart=cart)
-    cart_count = sum(item.quantity for item in cart_items)
+    cart_count = get_cart_summary(request.user.id)["count"]
 
     # Fetch reviews
     reviews = Review.objects.filter(product=product, is_verified=True).order_by(
@@ -89,8 +98,8 @@ def product_detail(request, id):
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
 
-    # Count of verified reviews (assuming there is an 'is_verified' field in your Review model)
-    verified_reviews_count = reviews.filter(is_verified=True).count()
+    # The verified count comes from the product's maintained rating summary
+    verified_reviews_count = product.rating_count
 
     # Process reviews to generate the filled and empty stars
     for review in page_obj:
@@ -99,6 +108,8 @@ def product_detail(request, id):
 
     context = {
         "product": product,
+        # Uploads still being processed have no variants to show yet
+        "images": product.images.filter(status=ProductImage.READY),
         "cart_count": cart_count,
         "reviews": page_obj,  # Pass paginated reviews
         "verified_reviews_count": verified_reviews_count,  # Add verified reviews count
@@ -109,31 +120,31 @@ def product_detail(request, id):
 
 # =================================== Products Detail for quests not signed in ===================================
 def product_details_view(request, id):
-    try:
-        # Fetch the product
-        product = Product.objects.get(id=id)
-
-        # Prepare context with product details
-        context = {
-            "product_id": product.id,
-            "name": product.name,
-            "description": product.description,
-            "category": product.category.name if product.category else "N/A",
-            "price": product.price,  # Using product's price directly
-            "discount_value": product.discount_value
-            or 0,  # Assuming discount_value is on the product
-            "discounted_price": product.get_discounted_price(),  # Get the discounted price if available
-        }
-
-        return render(request, "orders/product_detail_partial.html", context)
-
-    except Product.DoesNotExist:
+    context = get_product_fragment(id, lambda: _guest_product_context(id))
+    if context is None:
         return render(
             request,
             "orders/product_detail_partial.html",
             {"error": "Product not found"},
         )
 
+    return render(request, "orders/product_detail_partial.html", context)
+
+
+def _guest_product_context(id):
+    product = Product.objects.select_related("category").filter(id=id).first()
+    if product is None:
+        return None
+
+    return {
+        "product_id": product.id,
+        "name": product.name,
+        "category": product.category.name if product.category else "N/A",
+        "price": product.price,
+        "discount_value": product.discount_value or 0,
+        "discounted_price": product.get_discounted_price(),
+    }
+
 
 # =================================== Products Wishlist ===================================
 @login_required
@@ -169,7 +180,11 @@ def wishlist_add(request, product_id):
 @login_required
 def wishlist_view(request):
     # Fetch all the products in the user's wishlist
-    wishlist_items = Wishlist.objects.filter(user=request.user)
+    wishlist_items = (
+        Wishlist.objects.filter(user=request.user)
+        .prefetch_related(Prefetch("product", queryset=Product.objects.for_cards()))
+        .order_by("-added_at")
+    )
 
     # Paginate the wishlist items (10 items per page)
     paginator = Paginator(wishlist_items, 12)  # Show 12 wishlist items per page
@@ -178,11 +193,9 @@ def wishlist_view(request):
     )  # Get the current page number from the request
     page_obj = paginator.get_page(page_number)  # Get the page object
 
-    # Fetch the default image for each product in the wishlist
+    # Default images come from the prefetched product cards
     for item in page_obj:
-        item.default_image = ProductImage.objects.filter(
-            product=item.product, is_default=True
-        ).first()
+        item.default_image = item.product.get_default_image()
 
     # Pass the page object to the template
     context = {"page_obj": page_obj}
@@ -261,11 +274,15 @@ def add_to_cart(request, product_id):
 def cart_view(request):
     cart, created = Cart.objects.get_or_create(user=request.user)
 
-    total_price = sum(item.get_total_price() for item in cart.items.all())
+    # One priced query for the lines; the header badge reuses its summary
+    items = get_cart_lines(cart)
+    summary = get_cart_summary(request.user.id, items)
 
     context = {
         "cart": cart,
-        "total_price": total_price,
+        "items": items,
+        "summary": summary,
+        "total_price": summary["total"],
     }
 
     return render(request, "orders/cart.html", context)
@@ -384,18 +401,8 @@ def send_order_email(
         </html>
         """
 
-    from_email = getattr(settings, "EMAIL_HOST_USER", None)
-    to = [recipient_email]
-
-    # Send HTML email
-    try:
-        email = EmailMultiAlternatives(subject, strip_tags(email_body), from_email, to)
-        email.attach_alternative(email_body, "text/html")
-        email.send()
-        return True
-    except Exception as e:
-        logger.error(f"Error sending email to {recipient_email}: {str(e)}")
-        return False
+    # Queued in the outbox; the send_queued_emails worker delivers it
+    return bool(queue_email(subject, [recipient_email], html_body=email_body))
 
 
 @login_required
@@ -408,90 +415,40 @@ def checkout_view(request):
 
     customer, created = Customer.objects.get_or_create(user=request.user)
 
-    total_price = sum(
-        item.get_total_price() for item in cart.items.all()
-    )  # Calculate total price
+    items = get_cart_lines(cart, with_images=True)
+    total_price = get_cart_summary(request.user.id, items)["total"]
 
     if request.method == "POST":
         form = CheckoutForm(request.POST)
         if form.is_valid():
-            total_amount = total_price  # Use total_price here
-
-            # Update customer details
-            customer.first_name = form.cleaned_data["first_name"]
-            customer.last_name = form.cleaned_data["last_name"]
-            customer.email = form.cleaned_data["email"]
-            customer.mobile = form.cleaned_data["mobile"]
-            customer.address = form.cleaned_data["address"]
-            customer.save()
-
-            # Create the order
-            order = Order.objects.create(
-                customer=customer,
-                created_at=timezone.now(),
-                total_amount=total_amount,
-                status="Pending",
-            )
-
-            order_details = []  # Initialize order_details list
-
-            # Create OrderDetail entries
-            for item in cart.items.all():
-                product = item.product
-                discounted_price = product.get_discounted_price()
-                # image_url = (
-                #     product.image.url if product.image else ""
-                # )
-                # Get the first associated image for the product
-                product_image = (
-                    product.images.first()
-                )  # Assuming you want the first image
-                image_url = (
-                    product_image.image.url
-                    if product_image and product_image.image
-                    else ""
-                )
-
-                order_details.append(
-                    {
-                        "product_name": item.product.name,
-                        "quantity": item.quantity,
-                        "price": discounted_price,
-                        "image_url": image_url,
-                        "order_status": order.status,
-                    }
-                )
-
-                OrderDetail.objects.create(
-                    order=order,
-                    product=item.product,
-                    quantity=item.quantity,
-                    discounted_price=discounted_price,
-                    price=item.product.price,
-                )
-
-            # Clear cart after checkout
-            cart.items.all().delete()
-
-            # Send confirmation emails
-            send_order_email(
-                customer.first_name,
-                customer.email,
-                order.id,
-                order_details,
-                order.status,
-                total_price,
-                is_customer=True,
-            )
-            send_order_email(
-                "Perpetual Tech",
-                settings.EMAIL_HOST_USER,
-                order.id,
-                order_details,
-                order.status,
-                total_price,
-                is_customer=False,
-            )
+            try:
+                with transaction.atomic():
+                    order, order_details = place_order(
+                        cart, items, customer, form.cleaned_data
+                    )
+
+                    # Queued with the order, so they only go out if it commits
+                    send_order_email(
+                        customer.first_name,
+                        customer.email,
+                        order.id,
+                        order_details,
+                        order.status,
+                        total_price,
+                        is_customer=True,
+                    )
+                    send_order_email(
+                        "Perpetual Tech",
+                        settings.EMAIL_HOST_USER,
+                        order.id,
+                        order_details,
+                        order.status,
+                        total_price,
+                        is_customer=False,
+                    )
+            except ValueError as e:
+                messages.error(request, str(e))
+                return redirect("orders:cart")
 
             messages.success(
                 request,
@@ -513,7 +470,7 @@ def checkout_view(request):
     return render(
         request,
         "orders/checkout.html",
-        {"form": form, "cart": cart, "total_price": total_price},
+        {"form": form, "cart": cart, "items": items, "total_price": total_price},
     )
 
 
@@ -537,66 +494,11 @@ def process_payment(request, order_id):
         payment_method = request.POST.get("payment_method")
         logger.debug(f"Payment Method: {payment_method}, Phone Number: {phone_number}")
 
-        # Prepare payment data
-        payment_data = {
-            "amount": float(order.total_amount),
-            "currency": "EUR",
-            "externalId": str(order.id),
-            "payer": {
-                "partyIdType": "MSISDN",
-                "partyId": phone_number,
-            },
-            "payerMessage": f"Payment for Order #{order.id}",
-            "payeeMessage": "Payment received",
-        }
-
-        # Fetch access token
-        access_token = get_access_token()
-        if not access_token:
-            return JsonResponse(
-                {"error": "Failed to authenticate with the payment service."},
-                status=500,
-            )
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json",
-            "Ocp-Apim-Subscription-Key": settings.MTN_SUBSCRIPTION_KEY,
-        }
-
         try:
-            # Make the payment request
-            response = requests.post(
-                "https://sandbox.momodeveloper.mtn.com/collection/v1_0/requesttopay",
-                headers=headers,
-                json=payment_data,
-            )
-            response.raise_for_status()
-
-            if (
-                response.status_code == 202
-            ):  # MoMo typically returns 202 for accepted requests
-                transaction_info = response.json()
-                order.transaction_id = transaction_info.get("transactionId")
-                order.payment_status = "pending"
-                order.save()
-                return redirect("orders:customer_order_history")
-            else:
-                logger.error(f"Payment failed: {response.text}")
-                order.payment_status = "failed"
-                order.save()
-                return JsonResponse(
-                    {"error": "Payment failed. Please try again."}, status=400
-                )
-
-        except requests.exceptions.RequestException as req_err:
-            logger.error(f"Request error occurred: {req_err}")
-            order.payment_status = "failed"
-            order.save()
-            return JsonResponse(
-                {"error": "Payment failed due to server error. Please try again."},
-                status=500,
-            )
+            request_to_pay(order, phone_number)
+        except PaymentError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        return redirect("orders:customer_order_history")
 
     # Render the payment form
     return render(
@@ -610,56 +512,62 @@ def process_payment(request, order_id):
     )
 
 
-def get_access_token():
-    """
-    Fetches the access token for MTN API using Basic Authentication.
-    """
-    client_id = settings.MTN_CLIENT_ID
-    client_secret = settings.MTN_CLIENT_SECRET
-    subscription_key = settings.MTN_SUBSCRIPTION_KEY
+# =================================== confirm_payment ===================================
+def confirm_payment_view(request, order_id):
+    order = get_object_or_404(Order, id=order_id)
 
-    if not client_id or not client_secret or not subscription_key:
-        logger.error("MTN API credentials are missing in settings.")
-        return None
+    # The payment status is only ever set by provider callbacks and
+    # reconciliation, never by the browser landing here
+    if order.payment_status == "completed":
+        messages.success(request, "Payment made successfully", extra_tags="bg-success")
+    elif order.payment_status == "failed":
+        messages.error(
+            request, "Payment failed. Please try again.", extra_tags="bg-danger"
+        )
+    else:
+        messages.info(
+            request,
+            "Your payment is being confirmed. This can take a few minutes.",
+            extra_tags="bg-info",
+        )
 
-    url = "https://sandbox.momodeveloper.mtn.com/collection/token/"
-    credentials = f"{client_id}:{client_secret}"
-    encoded_credentials = base64.b64encode(credentials.encode()).decode()
+    return redirect("orders:customer_order_history")
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {encoded_credentials}",
-        "Ocp-Apim-Subscription-Key": subscription_key,
-    }
 
+# =================================== Payment callbacks ===================================
+def _callback_payload(request):
     try:
-        response = requests.post(url, headers=headers)
-        response.raise_for_status()
-        return response.json().get("access_token")
-    except requests.RequestException as e:
-        logger.error(f"Error fetching access token: {e}")
+        payload = json.loads(request.body)
+    except ValueError:
         return None
+    return payload if isinstance(payload, dict) else None
 
 
-# =================================== confirm_payment ===================================
-def confirm_payment_view(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
-    customer = order.customer
-
-    # Update payment status
-    order.payment_status = "completed"
-    order.save()
-
-    # Prepare the context
-    context = {
-        "order": order,
-        "customer": customer,
-    }
-
-    # Add success message
-    messages.success(request, "Payment made successfully", extra_tags="bg-success")
-
-    return render(request, "orders/customer_order_history.html", context)
+@csrf_exempt
+@require_http_methods(["POST", "PUT"])
+def momo_callback_view(request, token):
+    """
+    MoMo reports the outcome of a request to pay to the signed URL it was
+    given in X-Callback-Url.
+    """
+    reference = verify_momo_callback(token)
+    if reference is None:
+        return JsonResponse({"error": "Invalid signature."}, status=403)
+    payload = _callback_payload(request)
+    if payload is None:
+        return JsonResponse({"error": "Invalid payload."}, status=400)
+    return JsonResponse({"result": handle_momo_callback(reference, payload)})
+
+
+@csrf_exempt
+@require_POST
+def flutterwave_webhook_view(request):
+    if not verify_flutterwave_webhook(request.headers.get("verif-hash")):
+        return JsonResponse({"error": "Invalid signature."}, status=403)
+    payload = _callback_payload(request)
+    if payload is None:
+        return JsonResponse({"error": "Invalid payload."}, status=400)
+    return JsonResponse({"result": handle_flutterwave_webhook(payload)})
 
 
 # =================================== payment_flutter_view ===================================
@@ -668,7 +576,7 @@ def payment_flutter_view(request):
     context = {
         "unique_tx_ref": unique_tx_ref,
         "public_key": "FLWPUBK_TEST-02b9b5fc6406bd4a41c3ff141cc45e93-X",
-        "currency": "UGX",
+        "currency": settings.FLUTTERWAVE_CURRENCY,
         "form_title": "Secure Flutterwave Payment",
     }
     return render(request, "orders/payment_flutter.html", context)
@@ -722,7 +630,12 @@ def customer_order_history_view(request):
         return render(
             request,
             "orders/order_history.html",
-            {"orders": orders, "customer": customer},
+            {
+                "orders": orders,
+                "customer": customer,
+                "flutterwave_tx_ref_prefix": FLUTTERWAVE_TX_REF_PREFIX,
+                "flutterwave_currency": settings.FLUTTERWAVE_CURRENCY,
+            },
         )
 
     except ObjectDoesNotExist:
@@ -733,6 +646,18 @@ def customer_order_history_view(request):
 
 
 # =================================== all_orders_view ===================================
+ORDERS_EXPORT_COLUMNS = (
+    ("Order ID", "id"),
+    ("Created At", "created_at"),
+    ("Customer First Name", "customer__first_name"),
+    ("Customer Last Name", "customer__last_name"),
+    ("Status", "status"),
+    ("Payment Method", "payment_method"),
+    ("Payment Status", "payment_status"),
+    ("Transaction ID", "transaction_id"),
+    ("Tax", "tax_amount"),
+    ("Total Amount", "total_amount"),
+)
 
 
 @login_required
@@ -757,6 +682,15 @@ def all_orders_view(request):
             | Q(id__icontains=search_query)
         )
 
+    export = export_format(request)
+    if export:
+        return export_queryset(
+            export,
+            "orders",
+            orders.order_by("-created_at", "-id"),
+            ORDERS_EXPORT_COLUMNS,
+        )
+
     # Paginate orders (25 orders per page)
     paginator = Paginator(orders, 25)
     page_number = request.GET.get("page")
@@ -807,6 +741,11 @@ def order_detail_view(request, order_id):
 
 
 # =================================== order_process_view ===================================
+# Stock leaves when an order ships and comes back when it does not stay sold
+ORDER_FULFILLED_STATUSES = ("Out for Delivery", "Delivered")
+ORDER_RETURNED_STATUSES = ("Canceled", "Refunded", "Returned")
+
+
 @login_required
 @admin_or_manager_or_staff_required
 @login_required
@@ -820,7 +759,16 @@ def order_process_view(request, order_id):
             order_status = form.cleaned_data[
                 "status"
             ]  # Assuming 'status' is the field in the form
-            form.save()
+            try:
+                with transaction.atomic():
+                    form.save()
+                    if order_status in ORDER_FULFILLED_STATUSES:
+                        fulfil_order(order, user=request.user)
+                    elif order_status in ORDER_RETURNED_STATUSES:
+                        return_order(order, user=request.user)
+            except InsufficientStockError as e:
+                messages.error(request, str(e), extra_tags="bg-danger")
+                return redirect("orders:order_process", order_id=order.id)
             messages.success(
                 request, "Order status updated successfully!", extra_tags="bg-success"
             )
@@ -887,15 +835,9 @@ def send_order_status_email(recipient_name, recipient_email, order_status):
     </html>
     """
 
-    from_email = getattr(settings, "EMAIL_HOST_USER", None)
-    recipient_list = [recipient_email]
-
-    # Send the HTML email
-    try:
-        send_mail(subject, "", from_email, recipient_list, html_message=email_body)
-        logger.info(f"Email sent to {recipient_email}")
-    except Exception as e:
-        logger.error(f"Error sending email to {recipient_email}: {str(e)}")
+    # Queued in the outbox; the send_queued_emails worker delivers it
+    if queue_email(subject, [recipient_email], html_body=email_body):
+        logger.info(f"Email queued for {recipient_email}")
 
 
 # =================================== Sale delete view ===================================
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import threading
+import time
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import transaction
+from django.utils.functional import cached_property
+
+from .models import Category
+from .search import search_products
+
+# Every cached entry is stored under the current catalogue version, so a
+# bump orphans them all at once; the entries then age out on their own.
+CATALOGUE_CACHE = "catalogue"
+CATALOGUE_VERSION_KEY = "version"
+CATALOGUE_FILTER_FIELDS = ("category", "min_price", "max_price", "search")
+
+# Whether the current transaction changed the catalogue; drained on commit.
+_pending_bump = threading.local()
+
+
+def _cache():
+    return caches[CATALOGUE_CACHE]
+
+
+# =================================== Versions ===================================
+def catalogue_version():
+    cache = _cache()
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        # Start from the clock so an evicted counter never reuses old versions
+        cache.add(CATALOGUE_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOGUE_VERSION_KEY)
+    return version
+
+
+def bump_catalogue_version():
+    cache = _cache()
+    try:
+        return cache.incr(CATALOGUE_VERSION_KEY)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(CATALOGUE_VERSION_KEY, version, timeout=None)
+        return version
+
+
+def schedule_catalogue_bump():
+    """Invalidate the cached catalogue once the current transaction commits."""
+    _pending_bump.pending = True
+    transaction.on_commit(_flush_pending_bump)
+
+
+def _flush_pending_bump():
+    # Every change registers a flush; the first one of a commit bumps
+    if getattr(_pending_bump, "pending", False):
+        _pending_bump.pending = False
+        bump_catalogue_version()
+
+
+# =================================== Categories ===================================
+def get_category_choices():
+    """``(id, name)`` of every category for the storefront filter."""
+    return _cache().get_or_set(
+        "categories",
+        lambda: list(Category.objects.order_by("name").values_list("id", "name")),
+        version=catalogue_version(),
+    )
+
+
+# =================================== Catalogue pages ===================================
+def catalogue_filters(form, fields=CATALOGUE_FILTER_FIELDS):
+    """
+    The valid ``ProductFilterForm`` filters among ``fields``, normalized to
+    strings so equivalent requests share one cache entry.
+    """
+    if not form.is_valid():
+        return {}
+
+    data = form.cleaned_data
+    filters = {}
+    if "category" in fields and data.get("category"):
+        filters["category"] = str(data["category"].pk)
+    for field in ("min_price", "max_price"):
+        if field in fields and data.get(field) is not None:
+            filters[field] = str(data[field])
+    if "search" in fields and data.get("search"):
+        filters["search"] = " ".join(data["search"].lower().split())
+    return filters
+
+
+def filter_catalogue(products, filters):
+    if "category" in filters:
+        products = products.filter(category_id=int(filters["category"]))
+    if "min_price" in filters:
+        products = products.filter(price__gte=Decimal(filters["min_price"]))
+    if "max_price" in filters:
+        products = products.filter(price__lte=Decimal(filters["max_price"]))
+    if "search" in filters:
+        products = search_products(products, filters["search"])
+    return products
+
+
+class CachedPaginator(Paginator):
+    """A paginator for one cached page whose total count is already known."""
+
+    def __init__(self, count, per_page):
+        super().__init__((), per_page)
+        self._count = count
+
+    @cached_property
+    def count(self):
+        return self._count
+
+
+def _page_number(value):
+    try:
+        return max(int(value), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def get_catalogue_page(scope, products, filters, page_number, per_page):
+    """
+    One storefront page of ``products`` narrowed by ``filters``, read through
+    the catalogue cache.
+
+    ``products`` is the view's ordered, unfiltered queryset and is only
+    evaluated on a miss. Out-of-range pages fall back to the last page, as
+    the views did before. Returns a ``Page`` the templates use unchanged.
+    """
+    number = _page_number(page_number)
+    digest = hashlib.md5(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+
+    def build():
+        paginator = Paginator(filter_catalogue(products, filters), per_page)
+        try:
+            page = paginator.page(number)
+        except EmptyPage:
+            page = paginator.page(paginator.num_pages)
+        return {
+            "count": paginator.count,
+            "number": page.number,
+            "items": list(page.object_list),
+        }
+
+    cached = _cache().get_or_set(
+        f"page:{scope}:{per_page}:{digest}:{number}",
+        build,
+        version=catalogue_version(),
+    )
+    return Page(
+        cached["items"], cached["number"], CachedPaginator(cached["count"], per_page)
+    )
+
+
+# =================================== Product fragments ===================================
+def get_product_fragment(product_id, build):
+    """
+    The cached result of ``build()`` for one product page fragment. ``None``
+    results (missing products) are not cached.
+    """
+    key, version = f"product:{product_id}", catalogue_version()
+    fragment = _cache().get(key, version=version)
+    if fragment is None:
+        fragment = build()
+        if fragment is not None:
+            _cache().set(key, fragment, version=version)
+    return fragment
@@ -6,6 +6,7 @@ from .models import (
     Review,
 )
 from apps.inventory.models import Inventory
+from .catalogue import get_category_choices
 
 
 class ProductFilterForm(forms.Form):
@@ -50,6 +51,12 @@ class ProductFilterForm(forms.Form):
         ),
     )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Rendered from the catalogue cache; validation still checks the table
+        category = self.fields["category"]
+        category.choices = [("", category.empty_label), *get_category_choices()]
+
 
 # =================================== category form ===================================
 class CategoryForm(forms.ModelForm):
@@ -139,22 +146,21 @@ class ProductForm(forms.ModelForm):
 
 # =================================== CHILD PROFILE ===================================
 class ProductImageForm(forms.ModelForm):
-    image = forms.ImageField(required=False)
-
     class Meta:
         model = ProductImage
-        fields = ["image"]
+        fields = ["upload"]
 
         labels = {
-            "image": "Upload Product Image:",
+            "upload": "Upload Product Image:",
         }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields["image"].widget = forms.FileInput(attrs={"accept": "image/*"})
+        self.fields["upload"].required = True
+        self.fields["upload"].widget = forms.FileInput(attrs={"accept": "image/*"})
 
-    def clean_picture(self):
-        picture = self.cleaned_data.get("image")
+    def clean_upload(self):
+        picture = self.cleaned_data.get("upload")
         if picture and picture.size > 1500 * 1024:  # 1.5 MB
             raise forms.ValidationError("Image size should not exceed 1.5 MB.")
         return picture
@@ -0,0 +1,192 @@
+import io
+import logging
+import os
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import ProductImage
+from .storage import staging_storage, variant_storage
+
+logger = logging.getLogger(__name__)
+
+# Longest side in pixels of each variant; every one is also made in WebP
+PRODUCT_IMAGE_VARIANTS = {"thumbnail": 150, "card": 480, "detail": 1200}
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+IMAGE_BATCH_SIZE = 10
+IMAGE_MAX_ATTEMPTS = 3
+# A worker that died mid-image leaves it processing; others take it over after this
+IMAGE_CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+# =================================== Staging ===================================
+def stage_product_image(product, upload, is_default=False):
+    """
+    Save an uploaded file next to ``product`` for the image worker. Only the
+    local staging directory is written, so the request never waits on the
+    image storage; the image shows up on cards once its variants are made.
+    """
+    return ProductImage.objects.create(
+        product=product,
+        upload=upload,
+        is_default=is_default,
+        status=ProductImage.PENDING,
+    )
+
+
+# =================================== Variants ===================================
+def _encode(image, format, **options):
+    output = io.BytesIO()
+    image.save(output, format, **options)
+    return output.getvalue()
+
+
+def _flatten(image):
+    """JPEG has no transparency, so transparent areas become white."""
+    if image.mode == "RGB":
+        return image
+    background = Image.new("RGB", image.size, "white")
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+
+def render_variants(file):
+    """``(name, filename, bytes)`` of every resized variant of an image file."""
+    with Image.open(file) as original:
+        image = ImageOps.exif_transpose(original)
+        has_alpha = "A" in image.getbands() or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+        for name, size in PRODUCT_IMAGE_VARIANTS.items():
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+            yield name, f"{name}.jpg", _encode(
+                _flatten(variant),
+                "JPEG",
+                quality=JPEG_QUALITY,
+                optimize=True,
+                progressive=True,
+            )
+            yield f"{name}_webp", f"{name}.webp", _encode(
+                variant, "WEBP", quality=WEBP_QUALITY, method=4
+            )
+
+
+def variant_prefix(image):
+    """The directory of the variant storage holding ``image``'s files."""
+    return f"{image.product_id}/{image.pk}"
+
+
+def store_variants(image):
+    """Store the original and every variant of ``image``; return their URLs."""
+    storage = variant_storage()
+    prefix = variant_prefix(image)
+    extension = os.path.splitext(image.upload.name)[1].lower()
+
+    def store(name, content):
+        # A retry writes the same names; save() would rename around the old file
+        storage.delete(name)
+        return storage.url(storage.save(name, content))
+
+    with image.upload.open("rb") as upload:
+        urls = {"original": store(f"{prefix}/original{extension}", upload)}
+        upload.seek(0)
+        for name, filename, content in render_variants(upload):
+            urls[name] = store(f"{prefix}/{filename}", ContentFile(content))
+    return urls
+
+
+def delete_image_files(upload_name, prefix):
+    """Remove a deleted image's staged upload and everything stored under ``prefix``."""
+    if upload_name:
+        staging_storage().delete(upload_name)
+    storage = variant_storage()
+    try:
+        _, filenames = storage.listdir(prefix)
+    except FileNotFoundError:
+        return
+    for filename in filenames:
+        storage.delete(f"{prefix}/{filename}")
+
+
+# =================================== Worker ===================================
+def claim_pending_images(batch_size=IMAGE_BATCH_SIZE):
+    """
+    Mark up to ``batch_size`` queued images as processing and return them.
+    The claim commits at once, so no transaction stays open while they are
+    processed, and concurrent workers skip each other's rows.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        image_ids = list(
+            ProductImage.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=ProductImage.PENDING)
+                | Q(
+                    status=ProductImage.PROCESSING,
+                    claimed_at__lt=now - IMAGE_CLAIM_TIMEOUT,
+                )
+            )
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        ProductImage.objects.filter(pk__in=image_ids).update(
+            status=ProductImage.PROCESSING, claimed_at=now
+        )
+    return list(ProductImage.objects.filter(pk__in=image_ids).order_by("id"))
+
+
+def _save_claimed(image, update_fields):
+    """Save a claimed image; False when it was deleted while being processed."""
+    try:
+        image.save(update_fields=update_fields)
+    except DatabaseError:
+        if ProductImage.objects.filter(pk=image.pk).exists():
+            raise
+        return False
+    return True
+
+
+def process_product_image(image, max_attempts=IMAGE_MAX_ATTEMPTS):
+    """Make and store the variants of one claimed image. Returns success."""
+    try:
+        image.variants = store_variants(image)
+    except Exception as e:
+        logger.exception(f"Product image {image.pk} failed")
+        image.attempts += 1
+        image.error = str(e)
+        image.status = (
+            ProductImage.FAILED
+            if image.attempts >= max_attempts
+            else ProductImage.PENDING
+        )
+        _save_claimed(image, ["attempts", "error", "status"])
+        return False
+
+    # The staged upload is not needed once the original is stored
+    image.upload.delete(save=False)
+    image.status = ProductImage.READY
+    image.error = ""
+    if not _save_claimed(image, ["variants", "upload", "status", "error"]):
+        # Deleted meanwhile, so nothing will ever serve what was just stored
+        delete_image_files(None, variant_prefix(image))
+        return False
+    return True
+
+
+def process_pending_images(
+    batch_size=IMAGE_BATCH_SIZE, max_attempts=IMAGE_MAX_ATTEMPTS
+):
+    """Process one batch of queued images. Returns (processed, failed)."""
+    processed = failed = 0
+    for image in claim_pending_images(batch_size):
+        if process_product_image(image, max_attempts):
+            processed += 1
+        else:
+            failed += 1
+    return processed, failed
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.products.images import (
+    IMAGE_BATCH_SIZE,
+    IMAGE_MAX_ATTEMPTS,
+    process_pending_images,
+)
+
+
+class Command(BaseCommand):
+    help = "Make and store the resized variants of uploaded product images."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=IMAGE_BATCH_SIZE)
+        parser.add_argument("--max-attempts", type=int, default=IMAGE_MAX_ATTEMPTS)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling for uploads instead of exiting once none are left.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to sleep between polls when nothing is queued.",
+        )
+
+    def handle(self, *args, **options):
+        total_processed = total_failed = 0
+        while True:
+            processed, failed = process_pending_images(
+                batch_size=options["batch_size"],
+                max_attempts=options["max_attempts"],
+            )
+            total_processed += processed
+            total_failed += failed
+
+            if processed or failed:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {total_processed} image(s), {total_failed} failed."
+            )
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.ratings import rebuild_product_ratings
+
+
+class Command(BaseCommand):
+    help = "Rebuild every product's verified rating summary from its reviews."
+
+    def handle(self, *args, **options):
+        count = rebuild_product_ratings()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt rating summaries; {count} products are rated.")
+        )
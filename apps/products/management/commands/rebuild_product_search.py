@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.search import rebuild_search_documents
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the product search documents, e.g. after bulk updates that "
+        "bypassed the model signals."
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild_search_documents()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {count} product search documents.")
+        )
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0004_remove_product_description_product_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["status", "name"], name="product_status_name_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productimage",
+            index=models.Index(
+                fields=["product", "-is_default", "-created_at"],
+                name="product_image_default_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                condition=models.Q(("is_verified", True)),
+                fields=["product", "-created_at"],
+                name="review_verified_idx",
+            ),
+        ),
+    ]
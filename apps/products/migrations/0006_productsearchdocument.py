@@ -0,0 +1,125 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:24
+
+from django.db import migrations, models, transaction
+from django.db.utils import OperationalError
+import django.db.models.deletion
+
+SEARCH_FTS_TABLE = "product_search_fts"
+
+
+def backfill_search_documents(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    ProductSearchDocument = apps.get_model("products", "ProductSearchDocument")
+
+    documents = []
+    for product in Product.objects.select_related("category", "supplier").iterator():
+        parts = [
+            product.name,
+            product.sku,
+            product.category.name if product.category else "",
+            product.supplier.name if product.supplier else "",
+        ]
+        documents.append(
+            ProductSearchDocument(
+                product=product, document=" ".join(part for part in parts if part)
+            )
+        )
+    ProductSearchDocument.objects.bulk_create(documents, batch_size=1000)
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        from django.contrib.postgres.indexes import GinIndex, OpClass
+        from django.contrib.postgres.search import SearchVector
+        from django.db.models.functions import Upper
+
+        ProductSearchDocument = apps.get_model("products", "ProductSearchDocument")
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.add_index(
+            ProductSearchDocument,
+            GinIndex(
+                SearchVector("document", config="simple"),
+                name="product_search_vector_idx",
+            ),
+        )
+        # icontains compiles to UPPER(document) LIKE UPPER(%s)
+        schema_editor.add_index(
+            ProductSearchDocument,
+            GinIndex(
+                OpClass(Upper("document"), name="gin_trgm_ops"),
+                name="product_search_trgm_idx",
+            ),
+        )
+    elif vendor == "sqlite":
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                schema_editor.execute(
+                    f"CREATE VIRTUAL TABLE {SEARCH_FTS_TABLE} USING fts5("
+                    "document, tokenize = 'unicode61 remove_diacritics 2')"
+                )
+        except OperationalError:
+            # SQLite built without FTS5; search falls back to LIKE
+            return
+        schema_editor.execute(
+            "CREATE TRIGGER product_search_fts_insert AFTER INSERT ON "
+            f"product_search_document BEGIN INSERT INTO {SEARCH_FTS_TABLE}"
+            "(rowid, document) VALUES (new.product_id, new.document); END"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER product_search_fts_update AFTER UPDATE ON "
+            f"product_search_document BEGIN UPDATE {SEARCH_FTS_TABLE} "
+            "SET document = new.document WHERE rowid = old.product_id; END"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER product_search_fts_delete AFTER DELETE ON "
+            f"product_search_document BEGIN DELETE FROM {SEARCH_FTS_TABLE} "
+            "WHERE rowid = old.product_id; END"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {SEARCH_FTS_TABLE}(rowid, document) "
+            "SELECT product_id, document FROM product_search_document"
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS product_search_vector_idx")
+        schema_editor.execute("DROP INDEX IF EXISTS product_search_trgm_idx")
+    elif vendor == "sqlite":
+        # The triggers go with product_search_document itself
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supplier", "0001_initial"),
+        ("products", "0005_product_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductSearchDocument",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="products.product",
+                    ),
+                ),
+                ("document", models.TextField(blank=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "product_search_document",
+            },
+        ),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
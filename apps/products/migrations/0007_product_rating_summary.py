@@ -0,0 +1,72 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:29
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_rating_summaries(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Review = apps.get_model("products", "Review")
+
+    for row in (
+        Review.objects.filter(is_verified=True)
+        .values("product_id")
+        .annotate(
+            rating_count=Count("id"),
+            rating_sum=Sum("rating"),
+            **{
+                f"rating_{star}": Count("id", filter=Q(rating=star))
+                for star in range(1, 6)
+            },
+        )
+        .order_by()
+    ):
+        Product.objects.filter(pk=row.pop("product_id")).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0006_productsearchdocument"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="rating_1",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_2",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_3",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_4",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_5",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Verified Ratings"
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:51
+
+import apps.products.models
+import apps.products.storage
+import django.core.validators
+from django.db import migrations, models
+
+
+def mark_existing_ready(apps, schema_editor):
+    """Images uploaded before the pipeline are already on Cloudinary."""
+    ProductImage = apps.get_model("products", "ProductImage")
+    ProductImage.objects.update(status="ready")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0007_product_rating_summary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productimage",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="productimage",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="productimage",
+            name="error",
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="productimage",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                default="pending",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="productimage",
+            name="upload",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=apps.products.storage.staging_storage,
+                upload_to="%Y/%m/",
+                validators=[
+                    django.core.validators.FileExtensionValidator(
+                        allowed_extensions=["jpg", "jpeg", "png"]
+                    ),
+                    apps.products.models.validate_image_size,
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name="productimage",
+            name="variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddIndex(
+            model_name="productimage",
+            index=models.Index(
+                condition=models.Q(("status__in", ["pending", "processing"])),
+                fields=["status", "id"],
+                name="product_image_queue_idx",
+            ),
+        ),
+        migrations.RunPython(mark_existing_ready, migrations.RunPython.noop),
+    ]
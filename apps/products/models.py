@@ -1,5 +1,7 @@
 import uuid
 from django.db import models
+from django.db.models import Case, DecimalField, F, FloatField, Prefetch, Value, When
+from django.db.models.functions import Cast, Coalesce, Greatest
 from django.contrib.auth.models import User
 from django.forms import model_to_dict
 from django.core.exceptions import ValidationError
@@ -7,7 +9,8 @@ from django.utils import timezone
 from django.core.validators import FileExtensionValidator
 from apps.supplier.models import Supplier
 from cloudinary.models import CloudinaryField
-import cloudinary.uploader
+
+from .storage import staging_storage
 
 
 def validate_image_size(value):
@@ -16,6 +19,13 @@ def validate_image_size(value):
         raise ValidationError("Image size should not exceed 1.5 MB.")
 
 
+# Verified review summary columns, written only by apps.products.ratings
+RATING_STARS = range(1, 6)
+RATING_FIELDS = ("rating_count", "rating_sum") + tuple(
+    f"rating_{star}" for star in RATING_STARS
+)
+
+
 # Define choices for product status
 STATUS_CHOICES = [
     ("", "-- Choose status --"),
@@ -41,6 +51,55 @@ class Category(models.Model):
         return self.name
 
 
+def discounted_price_expression(prefix=""):
+    """
+    SQL for a product's price after its percentage discount, floored at zero.
+    ``prefix`` reaches the product through a relation, e.g. ``"product__"``.
+    """
+    # Computed in floating point and rounded back to cents so SQLite does not
+    # fall into integer division on whole-number prices
+    return Case(
+        When(
+            **{f"{prefix}discount_value__gt": 0},
+            then=Cast(
+                Greatest(
+                    Cast(f"{prefix}price", FloatField())
+                    * (Value(100.0) - Cast(f"{prefix}discount_value", FloatField()))
+                    / Value(100.0),
+                    Value(0.0),
+                ),
+                DecimalField(max_digits=10, decimal_places=2),
+            ),
+        ),
+        default=F(f"{prefix}price"),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+class ProductQuerySet(models.QuerySet):
+    def for_cards(self):
+        """
+        Everything a product card renders in a fixed number of queries: category,
+        stock quantity, discounted price and the product's images (default first).
+        """
+        return (
+            self.select_related("category")
+            .annotate(
+                stock_quantity=Coalesce(F("inventory__quantity"), 0),
+                discounted_price=discounted_price_expression(),
+            )
+            .prefetch_related(
+                Prefetch(
+                    "images",
+                    queryset=ProductImage.objects.filter(
+                        status=ProductImage.READY
+                    ).order_by("-is_default", "-created_at"),
+                    to_attr="prefetched_images",
+                )
+            )
+        )
+
+
 class Product(models.Model):
     name = models.CharField(max_length=256, verbose_name="Product Name")
     sku = models.CharField(max_length=100, unique=True, verbose_name="SKU", blank=True)
@@ -81,6 +140,15 @@ class Product(models.Model):
     expiring_date = models.DateTimeField(
         null=True, blank=True, verbose_name="Expiring Date"
     )
+    rating_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Verified Ratings"
+    )
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created At")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated At")
 
@@ -89,10 +157,63 @@ class Product(models.Model):
         verbose_name = "Product"
         verbose_name_plural = "Products"
         ordering = ["-created_at"]
+        indexes = [
+            # Storefront and POS list active products by name
+            models.Index(fields=["status", "name"], name="product_status_name_idx"),
+        ]
+
+    objects = ProductQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.name}: (Cost: {self.cost}, Price: {self.price})"
 
+    @property
+    def rating_average(self):
+        """Average verified rating rounded to one decimal, 0 without ratings."""
+        if not self.rating_count:
+            return 0
+        return round(self.rating_sum / self.rating_count, 1)
+
+    @property
+    def rating_stars(self):
+        filled = round(self.rating_average)
+        return "★" * filled + "☆" * (5 - filled)
+
+    def rating_histogram(self):
+        """``(star, count, percent)`` for 5 stars down to 1."""
+        return [
+            (
+                star,
+                getattr(self, f"rating_{star}"),
+                (
+                    round(100 * getattr(self, f"rating_{star}") / self.rating_count)
+                    if self.rating_count
+                    else 0
+                ),
+            )
+            for star in reversed(RATING_STARS)
+        ]
+
+    def get_card_images(self):
+        """
+        Default images if any are set, otherwise every image of the product.
+        Uploads still waiting for their variants are left out.
+        """
+        images = getattr(self, "prefetched_images", None)
+        if images is None:
+            images = list(
+                self.images.filter(status=ProductImage.READY).order_by(
+                    "-is_default", "-created_at"
+                )
+            )
+        return [image for image in images if image.is_default] or images
+
+    def get_default_image(self):
+        """The product's default image, or None when no default is set."""
+        return next(
+            (image for image in self.get_card_images() if image.is_default), None
+        )
+
     def to_json(self):
         item = model_to_dict(self)
         item.update(
@@ -137,10 +258,55 @@ class Product(models.Model):
     def save(self, *args, **kwargs):
         if not self.sku:
             self.sku = str(uuid.uuid4()).split("-")[0].upper()  # e.g., 'F3D9A7'
+
+        # The rating summary is refreshed by UPDATEs; a stale instance must not
+        # write its copy back over them
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            skipped = set(RATING_FIELDS) | self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
         super().save(*args, **kwargs)
 
 
+class ProductSearchDocument(models.Model):
+    """
+    Denormalized search text of a product: name, SKU, category and supplier.
+
+    Kept in sync by ``apps.products.signals`` and indexed per database by
+    ``apps.products.search``.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        primary_key=True,
+        related_name="search_document",
+        on_delete=models.CASCADE,
+    )
+    document = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "product_search_document"
+
+    def __str__(self):
+        return self.document
+
+
 class ProductImage(models.Model):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (PROCESSING, "Processing"),
+        (READY, "Ready"),
+        (FAILED, "Failed"),
+    ]
+
     product = models.ForeignKey(
         Product, related_name="images", on_delete=models.CASCADE
     )
@@ -153,6 +319,23 @@ class ProductImage(models.Model):
         null=True,
         blank=True,
     )
+    # New uploads wait here until apps.products.images has made their variants
+    upload = models.ImageField(
+        upload_to="%Y/%m/",
+        storage=staging_storage,
+        validators=[
+            FileExtensionValidator(allowed_extensions=["jpg", "jpeg", "png"]),
+            validate_image_size,
+        ],
+        null=True,
+        blank=True,
+    )
+    # Variant name ("card", "card_webp", ...) to its URL
+    variants = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
     is_default = models.BooleanField(default=False, verbose_name="Is Default")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created at")
     # updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated at")
@@ -162,6 +345,19 @@ class ProductImage(models.Model):
         verbose_name = "Product Image"
         verbose_name_plural = "Product Images"
         ordering = ["-created_at"]
+        indexes = [
+            # Product cards prefetch images default first, then newest
+            models.Index(
+                fields=["product", "-is_default", "-created_at"],
+                name="product_image_default_idx",
+            ),
+            # The image worker's queue
+            models.Index(
+                fields=["status", "id"],
+                condition=models.Q(status__in=["pending", "processing"]),
+                name="product_image_queue_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Image for {self.product.name} (Default: {self.is_default})"
@@ -178,14 +374,35 @@ class ProductImage(models.Model):
             if default_image_exists:
                 raise ValidationError("Only one default image can be set per product.")
 
-    def save(self, *args, **kwargs):
-        if self.image and not str(self.image).startswith("http"):
-            upload_result = cloudinary.uploader.upload(
-                self.image.file, folder="pure_shopper_product_images"
-            )
-            self.image = upload_result["url"]
+    def variant_url(self, name):
+        """URL of the ``name`` variant, or of the original for older images."""
+        return self.variants.get(name) or self.original_url
 
-        super().save(*args, **kwargs)
+    @property
+    def original_url(self):
+        if self.image:
+            return self.image.url
+        return self.variants.get("original", "")
+
+    @property
+    def thumbnail_url(self):
+        return self.variant_url("thumbnail")
+
+    @property
+    def card_url(self):
+        return self.variant_url("card")
+
+    @property
+    def card_webp_url(self):
+        return self.variants.get("card_webp", "")
+
+    @property
+    def detail_url(self):
+        return self.variant_url("detail")
+
+    @property
+    def detail_webp_url(self):
+        return self.variants.get("detail_webp", "")
 
 
 class Review(models.Model):
@@ -200,5 +417,15 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_verified = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Product pages only ever list verified reviews, newest first
+            models.Index(
+                fields=["product", "-created_at"],
+                condition=models.Q(is_verified=True),
+                name="review_verified_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"Review by {self.user} for {self.product.name}"
@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from .catalogue import schedule_catalogue_bump
+from .models import RATING_FIELDS, RATING_STARS, Product, Review
+
+
+# =================================== Rating summary ===================================
+def _rating_totals():
+    return {
+        "rating_count": Count("id"),
+        "rating_sum": Sum("rating"),
+        **{
+            f"rating_{star}": Count("id", filter=Q(rating=star))
+            for star in RATING_STARS
+        },
+    }
+
+
+@transaction.atomic
+def refresh_product_rating(product_id):
+    """
+    Recompute one product's summary from its verified reviews. The product
+    row is locked first, so concurrent review changes refresh it one after
+    another and the last refresh always counts them all.
+    """
+    if not list(
+        Product.objects.select_for_update().filter(pk=product_id).values_list("pk")
+    ):
+        return
+    totals = Review.objects.filter(product_id=product_id, is_verified=True).aggregate(
+        **_rating_totals()
+    )
+    Product.objects.filter(pk=product_id).update(
+        **{field: totals[field] or 0 for field in RATING_FIELDS}
+    )
+    # update() skips Product's signals, so the cached cards are refreshed here
+    schedule_catalogue_bump()
+
+
+@transaction.atomic
+def verify_review(review):
+    """
+    Mark ``review`` verified and count it. The conditional UPDATE skips the
+    refresh when the review was already verified.
+    """
+    if Review.objects.filter(pk=review.pk, is_verified=False).update(is_verified=True):
+        refresh_product_rating(review.product_id)
+    review.is_verified = True
+    return review
+
+
+@transaction.atomic
+def rebuild_product_ratings():
+    """Recompute every product's summary from its verified reviews. Returns the count."""
+    totals = {
+        row["product_id"]: row
+        for row in Review.objects.filter(is_verified=True)
+        .values("product_id")
+        .annotate(**_rating_totals())
+        .order_by()
+    }
+
+    products = list(Product.objects.only(*RATING_FIELDS))
+    for product in products:
+        row = totals.get(product.pk, {})
+        for field in RATING_FIELDS:
+            setattr(product, field, row.get(field) or 0)
+    Product.objects.bulk_update(products, RATING_FIELDS, batch_size=500)
+    schedule_catalogue_bump()
+    return len(totals)
@@ -0,0 +1,218 @@
+import re
+import threading
+
+from django.db import connection, transaction
+from django.db.models import Case, FloatField, OuterRef, Q, Subquery, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import Product, ProductSearchDocument
+
+# PostgreSQL: GIN indexes over the document's tsvector and its trigrams.
+# SQLite: an FTS5 table mirrored from product_search_document by triggers.
+# Both are created by migration 0006; without them search falls back to LIKE.
+SEARCH_CONFIG = "simple"
+SEARCH_FTS_TABLE = "product_search_fts"
+# SQLite ranks through a CASE over the best matches; the rest still match
+# but follow them in the queryset's own order
+SEARCH_RANK_LIMIT = 500
+
+# Products touched inside the current transaction; drained once it commits.
+_pending_products = threading.local()
+
+
+# =================================== Search documents ===================================
+def build_document(product):
+    """The searchable text of ``product``; category and supplier must be loaded."""
+    parts = [
+        product.name,
+        product.sku,
+        product.category.name if product.category else "",
+        product.supplier.name if product.supplier else "",
+    ]
+    return " ".join(part for part in parts if part)
+
+
+def _documents_for(products):
+    now = timezone.now()
+    return [
+        ProductSearchDocument(
+            product=product, document=build_document(product), updated_at=now
+        )
+        for product in products
+    ]
+
+
+def _document_products():
+    return Product.objects.select_related("category", "supplier").only(
+        "name", "sku", "category__name", "supplier__name"
+    )
+
+
+def refresh_search_documents(product_ids):
+    """Upsert the search documents of ``product_ids`` in one statement."""
+    documents = _documents_for(_document_products().filter(id__in=product_ids))
+    ProductSearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=["product"],
+        update_fields=["document", "updated_at"],
+    )
+    return len(documents)
+
+
+@transaction.atomic
+def rebuild_search_documents(batch_size=1000):
+    """Rebuild every search document from the catalogue. Returns the row count."""
+    ProductSearchDocument.objects.all().delete()
+    count = 0
+    batch = []
+    for product in _document_products().order_by("id").iterator(chunk_size=batch_size):
+        batch.append(product)
+        if len(batch) >= batch_size:
+            count += len(
+                ProductSearchDocument.objects.bulk_create(_documents_for(batch))
+            )
+            batch = []
+    if batch:
+        count += len(ProductSearchDocument.objects.bulk_create(_documents_for(batch)))
+    return count
+
+
+def schedule_search_refresh(product_ids):
+    """Refresh the documents of ``product_ids`` once the current transaction commits."""
+    pending = getattr(_pending_products, "ids", None)
+    if pending is None:
+        pending = _pending_products.ids = set()
+    pending.update(product_ids)
+    transaction.on_commit(_flush_pending_products)
+
+
+def _flush_pending_products():
+    product_ids = getattr(_pending_products, "ids", None) or set()
+    _pending_products.ids = set()
+    if product_ids:
+        refresh_search_documents(product_ids)
+
+
+# =================================== Searching ===================================
+def _search_terms(query):
+    return re.findall(r"[^\W_]+", (query or "").lower())
+
+
+def search_products(queryset, query, product_field="pk", ranked=True):
+    """
+    Filter ``queryset`` to products matching ``query``, best matches first.
+
+    Every term must match the start of a word in the product's name, SKU,
+    category or supplier, so partial input such as POS picker keystrokes
+    already finds products; the whole query anywhere in that text (a SKU
+    fragment) matches as well, ranked after word matches. ``product_field`` points at the product from the
+    queryset's model, e.g. ``"product"`` for Inventory. Results are annotated
+    with ``search_rank`` and ordered by it ahead of the queryset's ordering,
+    unless ``ranked`` is False and only the filter is wanted.
+    """
+    terms = _search_terms(query)
+    if not terms:
+        return queryset.none()
+
+    if connection.vendor == "postgresql":
+        queryset, rank = _postgres_search(queryset, query, terms, product_field)
+    elif connection.vendor == "sqlite" and _sqlite_fts_available():
+        queryset, rank = _sqlite_search(queryset, query, terms, product_field, ranked)
+    else:
+        queryset, rank = _fallback_search(queryset, terms, product_field)
+
+    if not ranked:
+        return queryset
+    ordering = queryset.query.order_by or queryset.model._meta.ordering or ["pk"]
+    return queryset.annotate(search_rank=rank).order_by("-search_rank", *ordering)
+
+
+def _postgres_search(queryset, query, terms, product_field):
+    from django.contrib.postgres.search import (
+        SearchQuery,
+        SearchRank,
+        SearchVector,
+        TrigramWordSimilarity,
+    )
+
+    # Same expression as the GIN index built by migration 0006
+    vector = SearchVector("document", config=SEARCH_CONFIG)
+    search_query = SearchQuery(
+        " & ".join(f"{term}:*" for term in terms),
+        search_type="raw",
+        config=SEARCH_CONFIG,
+    )
+    # Substring matches (SKU fragments) are served by the trigram index
+    matches = (
+        ProductSearchDocument.objects.annotate(vector=vector)
+        .filter(Q(vector=search_query) | Q(document__icontains=query.strip()))
+        .values("product_id")
+    )
+    rank = Subquery(
+        ProductSearchDocument.objects.filter(product=OuterRef(product_field))
+        .annotate(
+            rank=SearchRank(vector, search_query)
+            + TrigramWordSimilarity(query.strip(), "document")
+        )
+        .values("rank")[:1],
+        output_field=FloatField(),
+    )
+    return queryset.filter(**{f"{product_field}__in": matches}), rank
+
+
+def _sqlite_fts_available():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [SEARCH_FTS_TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def _sqlite_search(queryset, query, terms, product_field, ranked=True):
+    # Quoted so user input cannot form FTS5 operators; * makes each a prefix
+    match = " ".join(f'"{term}"*' for term in terms)
+    matches = RawSQL(
+        f"SELECT rowid FROM {SEARCH_FTS_TABLE} WHERE {SEARCH_FTS_TABLE} MATCH %s",
+        [match],
+    )
+    # Substring matches (SKU fragments) as on PostgreSQL; they rank last
+    substring_matches = ProductSearchDocument.objects.filter(
+        document__icontains=query.strip()
+    ).values("product_id")
+    queryset = queryset.filter(
+        Q(**{f"{product_field}__in": matches})
+        | Q(**{f"{product_field}__in": substring_matches})
+    )
+    if not ranked:
+        return queryset, None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {SEARCH_FTS_TABLE} WHERE {SEARCH_FTS_TABLE} MATCH %s "
+            "ORDER BY rank LIMIT %s",
+            [match, SEARCH_RANK_LIMIT],
+        )
+        product_ids = [row[0] for row in cursor.fetchall()]
+
+    rank = Case(
+        *[
+            When(**{product_field: product_id}, then=Value(float(-position)))
+            for position, product_id in enumerate(product_ids)
+        ],
+        default=Value(float(-len(product_ids))),
+        output_field=FloatField(),
+    )
+    return queryset, rank
+
+
+def _fallback_search(queryset, terms, product_field):
+    matches = ProductSearchDocument.objects.all()
+    for term in terms:
+        matches = matches.filter(document__icontains=term)
+    return (
+        queryset.filter(**{f"{product_field}__in": matches.values("product_id")}),
+        Value(0.0, output_field=FloatField()),
+    )
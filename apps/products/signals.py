@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from apps.inventory.models import Inventory
+from apps.supplier.models import Supplier
+
+from .catalogue import schedule_catalogue_bump
+from .images import delete_image_files, variant_prefix
+from .models import Category, Product, ProductImage, Review
+from .ratings import refresh_product_rating
+from .search import schedule_search_refresh
+
+
+# =================================== Search document upkeep ===================================
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    schedule_search_refresh([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, **kwargs):
+    schedule_search_refresh(instance.products.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=Supplier)
+def supplier_saved(sender, instance, **kwargs):
+    schedule_search_refresh(instance.products.values_list("id", flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Supplier)
+def product_owner_deleted(sender, instance, **kwargs):
+    # Deleting sets the products' foreign key to NULL without saving them;
+    # the refresh runs after commit, once the link is gone
+    schedule_search_refresh(instance.products.values_list("id", flat=True))
+
+
+# =================================== Catalogue cache upkeep ===================================
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=Inventory)
+@receiver(post_delete, sender=Inventory)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def catalogue_changed(sender, instance, **kwargs):
+    schedule_catalogue_bump()
+
+
+# =================================== Image file cleanup ===================================
+@receiver(post_delete, sender=ProductImage)
+def product_image_deleted(sender, instance, **kwargs):
+    # Read now: the instance loses its pk once the delete completes. Files
+    # only go once the delete commits, so a rolled back one keeps them.
+    upload_name, prefix = instance.upload.name, variant_prefix(instance)
+    transaction.on_commit(lambda: delete_image_files(upload_name, prefix))
+
+
+# =================================== Rating summary upkeep ===================================
+@receiver(pre_save, sender=Review)
+def remember_previous_product(sender, instance, **kwargs):
+    # A review moved to another product must leave the old summary too
+    instance._previous_product_id = (
+        Review.objects.filter(pk=instance.pk)
+        .values_list("product_id", flat=True)
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    if created and not instance.is_verified:
+        return
+    # Recomputed rather than adjusted, so a stale pre_save read cannot skew it
+    previous_product_id = getattr(instance, "_previous_product_id", None)
+    for product_id in {previous_product_id, instance.product_id} - {None}:
+        refresh_product_rating(product_id)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    if instance.is_verified:
+        refresh_product_rating(instance.product_id)
@@ -0,0 +1,17 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.module_loading import import_string
+
+
+def staging_storage():
+    """Local storage holding uploads until their variants are made."""
+    return FileSystemStorage(location=settings.PRODUCT_IMAGE_STAGING_ROOT)
+
+
+@lru_cache(maxsize=1)
+def variant_storage():
+    """The storage backend configured by ``settings.PRODUCT_IMAGE_STORAGE``."""
+    config = settings.PRODUCT_IMAGE_STORAGE
+    return import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
@@ -1 +1,186 @@
-# Create your tests here.
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from .catalogue import catalogue_version, get_product_fragment
+from .images import IMAGE_CLAIM_TIMEOUT, claim_pending_images, process_pending_images
+from .models import Category, Product, ProductImage, Review
+from .ratings import rebuild_product_ratings, verify_review
+
+
+class CatalogueVersionTests(TestCase):
+    def test_a_committed_change_bumps_the_version(self):
+        version = catalogue_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Drinks")
+
+        self.assertGreater(catalogue_version(), version)
+
+    def test_a_rolled_back_change_does_not_block_later_bumps(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Category.objects.create(name="Drinks")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        version = catalogue_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Snacks")
+
+        self.assertGreater(catalogue_version(), version)
+
+    def test_missing_fragments_are_not_cached(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            return None
+
+        get_product_fragment(0, build)
+        get_product_fragment(0, build)
+
+        self.assertEqual(len(builds), 2)
+
+
+class RatingSummaryTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name="Mango Juice",
+            status="ACTIVE",
+            cost=Decimal("500.00"),
+            price=Decimal("800.00"),
+        )
+
+    def review(self, rating, is_verified=False, product=None):
+        return Review.objects.create(
+            product=product or self.product,
+            rating=rating,
+            review_text="Tasty",
+            is_verified=is_verified,
+        )
+
+    def test_only_verified_reviews_count(self):
+        self.review(5, is_verified=True)
+        unverified = self.review(1)
+
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_sum), (1, 5))
+        self.assertEqual(self.product.rating_average, 5)
+
+        verify_review(unverified)
+        verify_review(unverified)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_sum), (2, 6))
+        self.assertEqual((self.product.rating_1, self.product.rating_5), (1, 1))
+
+    def test_edits_and_deletes_move_the_summary(self):
+        review = self.review(4, is_verified=True)
+        review.rating = 2
+        review.save()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_4, self.product.rating_2), (0, 1))
+        self.assertEqual(self.product.rating_sum, 2)
+
+        review.is_verified = False
+        review.save()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_2), (0, 0))
+
+        review.is_verified = True
+        review.save()
+        review.delete()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_sum), (0, 0))
+
+    def test_a_moved_review_leaves_the_old_product(self):
+        other = Product.objects.create(
+            name="Pineapple Juice",
+            status="ACTIVE",
+            cost=Decimal("500.00"),
+            price=Decimal("800.00"),
+        )
+        review = self.review(3, is_verified=True)
+        review.product = other
+        review.save()
+
+        self.product.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.product.rating_count, 0)
+        self.assertEqual((other.rating_count, other.rating_3), (1, 1))
+
+    def test_rebuild_matches_the_maintained_summary(self):
+        self.review(5, is_verified=True)
+        self.review(3, is_verified=True)
+        self.review(1)
+        maintained = Product.objects.values_list(
+            "rating_count", "rating_sum", "rating_3", "rating_5"
+        ).get(pk=self.product.pk)
+
+        Product.objects.update(rating_count=0, rating_sum=0, rating_3=0, rating_5=0)
+        self.assertEqual(rebuild_product_ratings(), 1)
+        self.assertEqual(
+            Product.objects.values_list(
+                "rating_count", "rating_sum", "rating_3", "rating_5"
+            ).get(pk=self.product.pk),
+            maintained,
+        )
+
+
+class ProductImageWorkerTests(TestCase):
+    def setUp(self):
+        product = Product.objects.create(
+            name="Mango Juice",
+            status="ACTIVE",
+            cost=Decimal("500.00"),
+            price=Decimal("800.00"),
+        )
+        self.image = ProductImage.objects.create(
+            product=product, status=ProductImage.PENDING
+        )
+
+    @mock.patch(
+        "apps.products.images.store_variants", side_effect=OSError("corrupt image")
+    )
+    def test_failed_renders_are_retried_then_marked_failed(self, store_variants):
+        for attempt, status in enumerate(
+            (ProductImage.PENDING, ProductImage.PENDING, ProductImage.FAILED), 1
+        ):
+            self.assertEqual(process_pending_images(max_attempts=3), (0, 1))
+            self.image.refresh_from_db()
+            self.assertEqual(
+                (self.image.attempts, self.image.status), (attempt, status)
+            )
+
+        self.assertEqual(process_pending_images(max_attempts=3), (0, 0))
+        self.assertEqual(store_variants.call_count, 3)
+        self.assertEqual(self.image.error, "corrupt image")
+
+    @mock.patch("apps.products.images.store_variants")
+    def test_a_retry_can_succeed(self, store_variants):
+        store_variants.side_effect = [OSError("storage down"), {"card": "/card.jpg"}]
+
+        self.assertEqual(process_pending_images(), (0, 1))
+        self.assertEqual(process_pending_images(), (1, 0))
+
+        self.image.refresh_from_db()
+        self.assertEqual(self.image.status, ProductImage.READY)
+        self.assertEqual(self.image.variants, {"card": "/card.jpg"})
+        self.assertEqual(self.image.error, "")
+
+    def test_timed_out_claims_are_taken_over(self):
+        self.assertEqual(claim_pending_images(), [self.image])
+        self.assertEqual(claim_pending_images(), [])
+
+        ProductImage.objects.update(
+            claimed_at=timezone.now() - IMAGE_CLAIM_TIMEOUT - timedelta(seconds=1)
+        )
+        self.assertEqual(claim_pending_images(), [self.image])
+        self.image.refresh_from_db()
+        self.assertEqual(self.image.status, ProductImage.PROCESSING)
+        self.assertGreater(self.image.claimed_at, timezone.now() - timedelta(minutes=1))
@@ -1,15 +1,18 @@
 from django.contrib import messages
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
-from django.db.models import F, Q
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponseRedirect
 from django.urls import reverse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.db import transaction
-from apps.inventory.models import Inventory
+from apps.inventory.alerts import get_open_alerts
+from apps.inventory.models import Inventory, StockAlert
 
 # Import models and forms
 from .models import Category, Product, ProductImage
+from .catalogue import catalogue_filters, get_catalogue_page
+from .images import stage_product_image
+from .search import search_products
 from .forms import (
     CategoryForm,
     ProductForm,
@@ -31,53 +34,25 @@ def shop_homepage_view(request):
     form = ProductFilterForm(request.GET)
 
     # Start with all active products
-    products = (
-        Product.objects.prefetch_related("images")
-        .filter(status="ACTIVE")
-        .order_by("name")
+    products = Product.objects.for_cards().filter(status="ACTIVE").order_by("name")
+
+    # Filtered, paginated products are read through the catalogue cache
+    page_obj = get_catalogue_page(
+        "shop",
+        products,
+        catalogue_filters(form, fields=("category", "search")),
+        request.GET.get("page", 1),
+        32,
     )
 
-    # Apply filters if the form is valid
-    if form.is_valid():
-        category_filter = form.cleaned_data.get("category")
-        search_query = form.cleaned_data.get("search")
-
-        # Filter by category if selected
-        if category_filter:
-            products = products.filter(category=category_filter)
-
-        # Filter by search query if provided
-        if search_query:
-            products = products.filter(name__icontains=search_query)
-
-    # Pagination setup
-    paginator = Paginator(products, 32)
-    page_number = request.GET.get("page", 1)
-
-    try:
-        page_number = int(page_number)
-        if page_number < 1:
-            page_number = 1
-    except ValueError:
-        page_number = 1
-
-    try:
-        page_obj = paginator.page(page_number)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
-
     # Prepare the products with images
     products_with_images = []
     for product in page_obj:
-        images = product.images.filter(is_default=True)
-        if not images.exists():
-            images = product.images.all()
-
         # Directly use the price from the product model
         products_with_images.append(
             {
                 "product": product,
-                "images": images,
+                "images": product.get_card_images(),
                 "price": product.price,  # Directly use the price from the product
             }
         )
@@ -279,15 +254,9 @@ def products_list_view(request):
     page = request.GET.get("page", 1)
 
     # Filter products based on the search query
-    products = (
-        Product.objects.prefetch_related("inventory")
-        .filter(
-            Q(name__icontains=search_query)
-            | Q(category__name__icontains=search_query)
-            | Q(supplier__name__icontains=search_query)
-        )
-        .order_by("name")
-    )
+    products = Product.objects.prefetch_related("inventory").order_by("name")
+    if search_query:
+        products = search_products(products, search_query)
 
     # Pagination
     paginator = Paginator(products, 25)
@@ -464,20 +433,14 @@ def products_delete_view(request, product_id):
 @login_required
 @admin_or_manager_or_staff_required
 def stock_alerts_view(request):
-    # Fetch all products with inventory details
-    low_stock_products = Inventory.objects.filter(
-        quantity__lte=F("low_stock_threshold"), quantity__gt=0  # Low stock but not 0
-    ).select_related(
-        "product"
-    )  # Ensures related product data is fetched
-
-    out_of_stock_products = Inventory.objects.filter(
-        quantity=0  # Out of stock
-    ).select_related("product")
+    # Open alerts, raised as stock crosses a threshold, instead of scanning Inventory
+    alerts = get_open_alerts().order_by("product__name")
+    low_stock_alerts = [alert for alert in alerts if alert.level == StockAlert.LOW]
+    out_of_stock_alerts = [alert for alert in alerts if alert.level == StockAlert.OUT]
 
     context = {
-        "low_stock_products": low_stock_products,
-        "out_of_stock_products": out_of_stock_products,
+        "low_stock_alerts": low_stock_alerts,
+        "out_of_stock_alerts": out_of_stock_alerts,
     }
 
     return render(request, "products/stock_alerts.html", context)
@@ -492,20 +455,16 @@ def update_product_image(request):
         form = ProductImageForm(request.POST, request.FILES)
         if form.is_valid():
             product_id = request.POST.get("id")
-            product_image = get_object_or_404(Product, id=product_id)
-
-            # Save the new product image without committing
-            new_picture = form.save(commit=False)
-            new_picture.product = product_image
-            new_picture.is_default = True  # Assuming is_current means default image
-            new_picture.save()
+            product = get_object_or_404(Product, id=product_id)
 
-            # Update product's profile image
-            product_image.image = new_picture.image
-            product_image.save()
+            # Only staged locally here; the image worker makes and uploads
+            # the resized variants once this transaction has committed
+            stage_product_image(product, form.cleaned_data["upload"], is_default=True)
 
             messages.success(
-                request, "Product image updated successfully!", extra_tags="bg-success"
+                request,
+                "Product image uploaded! It will appear once it has been processed.",
+                extra_tags="bg-success",
             )
             return redirect("products:update_product_image")
         else:
@@ -587,10 +546,8 @@ def delete_product_image(request, pk):
 def discounted_product_list_view(request):
     # Fetch products with at least one discounted value
     discounted_products = (
-        Product.objects.filter(
-            discount_value__gt=0  # Products with a discount value greater than 0
-        )
-        .distinct()
+        Product.objects.for_cards()
+        .filter(discount_value__gt=0)  # Products with a discount value greater than 0
         .order_by("name")
     )
 
@@ -603,14 +560,9 @@ def discounted_product_list_view(request):
     )  # Get the current page number from the request
     page_obj = paginator.get_page(page_number)  # Get the page object
 
-    # Fetch the default image and discounted prices for each discounted product
+    # Default images come from the card prefetch; discounted_price is annotated
     for product in page_obj:
-        product.default_image = ProductImage.objects.filter(
-            product=product, is_default=True
-        ).first()
-
-        # Get the discounted price using the method from the model
-        product.discounted_price = product.get_discounted_price()
+        product.default_image = product.get_default_image()
 
     # Pass the page object to the template
     context = {
@@ -1,7 +1,8 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Sale, SaleDetail
+from .models import Sale, SaleDetail, DailySalesSummary
 
 admin.site.register(Sale)
 admin.site.register(SaleDetail)
+admin.site.register(DailySalesSummary)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SalesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.sales"
+
+    def ready(self):
+        import apps.sales.signals  # noqa
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.sales.services import rebuild_daily_summaries
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailySalesSummary rollup from the full Sale history."
+
+    def handle(self, *args, **options):
+        count = rebuild_daily_summaries()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {count} daily sales summary rows.")
+        )
@@ -0,0 +1,119 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:05
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+
+
+def backfill_daily_sales_summary(apps, schema_editor):
+    Sale = apps.get_model("sales", "Sale")
+    SaleDetail = apps.get_model("sales", "SaleDetail")
+    DailySalesSummary = apps.get_model("sales", "DailySalesSummary")
+
+    item_totals = {
+        row["sale__trans_date"]: row
+        for row in SaleDetail.objects.values("sale__trans_date").annotate(
+            items_sold=Sum("quantity"),
+            cogs=Sum(
+                ExpressionWrapper(
+                    F("product__cost") * F("quantity"), output_field=DecimalField()
+                )
+            ),
+            profit=Sum(
+                ExpressionWrapper(
+                    (F("price") - F("product__cost")) * F("quantity"),
+                    output_field=DecimalField(),
+                )
+            ),
+        )
+    }
+    summaries = []
+    for row in (
+        Sale.objects.values("trans_date")
+        .annotate(revenue=Sum("grand_total"), transactions=Count("id"))
+        .order_by()
+    ):
+        items = item_totals.get(row["trans_date"], {})
+        summaries.append(
+            DailySalesSummary(
+                date=row["trans_date"],
+                revenue=Decimal(str(row["revenue"] or 0)).quantize(Decimal("0.01")),
+                transactions=row["transactions"],
+                items_sold=items.get("items_sold") or 0,
+                cogs=Decimal(str(items.get("cogs") or 0)).quantize(Decimal("0.01")),
+                profit=Decimal(str(items.get("profit") or 0)).quantize(Decimal("0.01")),
+            )
+        )
+    DailySalesSummary.objects.bulk_create(summaries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sales", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailySalesSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(unique=True, verbose_name="Date")),
+                (
+                    "revenue",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                        verbose_name="Revenue",
+                    ),
+                ),
+                (
+                    "cogs",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                        verbose_name="Cost of Goods Sold",
+                    ),
+                ),
+                (
+                    "profit",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                        verbose_name="Profit",
+                    ),
+                ),
+                (
+                    "items_sold",
+                    models.IntegerField(default=0, verbose_name="Items Sold"),
+                ),
+                (
+                    "transactions",
+                    models.IntegerField(default=0, verbose_name="Transactions"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+                ),
+            ],
+            options={
+                "verbose_name": "Daily Sales Summary",
+                "verbose_name_plural": "Daily Sales Summaries",
+                "db_table": "daily_sales_summary",
+                "ordering": ["date"],
+            },
+        ),
+        migrations.RunPython(backfill_daily_sales_summary, migrations.RunPython.noop),
+    ]
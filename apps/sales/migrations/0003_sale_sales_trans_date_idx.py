@@ -0,0 +1,19 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sales", "0002_dailysalessummary"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="sale",
+            index=models.Index(
+                fields=["trans_date", "id"], name="sales_trans_date_idx"
+            ),
+        ),
+    ]
@@ -52,6 +52,10 @@ class Sale(models.Model):
 
     class Meta:
         db_table = "Sales"
+        indexes = [
+            # Reports and the dashboard filter by receipt date, oldest first
+            models.Index(fields=["trans_date", "id"], name="sales_trans_date_idx"),
+        ]
 
     def __str__(self) -> str:
         return (
@@ -94,3 +98,31 @@ class SaleDetail(models.Model):
             + " Quantity: "
             + str(self.quantity)
         )
+
+
+# =================================== DailySalesSummary model ===================================
+class DailySalesSummary(models.Model):
+    """Per-day rollup of Sale/SaleDetail figures, maintained by apps.sales.signals."""
+
+    date = models.DateField(unique=True, verbose_name="Date")
+    revenue = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Revenue"
+    )
+    cogs = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Cost of Goods Sold"
+    )
+    profit = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Profit"
+    )
+    items_sold = models.IntegerField(default=0, verbose_name="Items Sold")
+    transactions = models.IntegerField(default=0, verbose_name="Transactions")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated at")
+
+    class Meta:
+        db_table = "daily_sales_summary"
+        verbose_name = "Daily Sales Summary"
+        verbose_name_plural = "Daily Sales Summaries"
+        ordering = ["date"]
+
+    def __str__(self) -> str:
+        return f"{self.date}: {self.transactions} sales, revenue {self.revenue}"
@@ -0,0 +1,323 @@
+import threading
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import (
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    Q,
+    Sum,
+    Window,
+)
+from django.db.models.functions import Coalesce
+
+from apps.customers.models import Customer
+from apps.inventory.models import Inventory, StockMovement
+from apps.inventory.services import record_stock_movements
+from apps.products.models import Product
+from apps.products.search import search_products
+
+from .models import DailySalesSummary, Sale, SaleDetail
+
+
+# =================================== Daily sales summary ===================================
+# Days touched inside the current transaction; drained once it commits.
+_pending_days = threading.local()
+
+ITEM_COGS = ExpressionWrapper(
+    F("product__cost") * F("quantity"), output_field=DecimalField()
+)
+ITEM_PROFIT = ExpressionWrapper(
+    (F("price") - F("product__cost")) * F("quantity"), output_field=DecimalField()
+)
+
+
+def _as_date(day):
+    # Sale.trans_date may still hold the raw POST string on a fresh instance
+    return Sale._meta.get_field("trans_date").to_python(day)
+
+
+def _to_decimal(value):
+    return Decimal(str(value or 0)).quantize(Decimal("0.01"))
+
+
+def schedule_summary_refresh(day):
+    """Refresh the rollup row for ``day`` once the current transaction commits."""
+    days = getattr(_pending_days, "days", None)
+    if days is None:
+        days = _pending_days.days = set()
+    days.add(_as_date(day))
+    transaction.on_commit(_flush_pending_days)
+
+
+def _flush_pending_days():
+    days = getattr(_pending_days, "days", None) or set()
+    _pending_days.days = set()
+    for day in days:
+        refresh_daily_summary(day)
+
+
+def refresh_daily_summary(day):
+    """Recompute a single day's rollup from its Sale and SaleDetail rows."""
+    day = _as_date(day)
+    sale_totals = Sale.objects.filter(trans_date=day).aggregate(
+        revenue=Sum("grand_total"), transactions=Count("id")
+    )
+
+    if not sale_totals["transactions"]:
+        DailySalesSummary.objects.filter(date=day).delete()
+        return None
+
+    item_totals = SaleDetail.objects.filter(sale__trans_date=day).aggregate(
+        items_sold=Sum("quantity"),
+        cogs=Sum(ITEM_COGS),
+        profit=Sum(ITEM_PROFIT),
+    )
+
+    summary, _ = DailySalesSummary.objects.update_or_create(
+        date=day,
+        defaults={
+            "revenue": _to_decimal(sale_totals["revenue"]),
+            "transactions": sale_totals["transactions"],
+            "items_sold": item_totals["items_sold"] or 0,
+            "cogs": _to_decimal(item_totals["cogs"]),
+            "profit": _to_decimal(item_totals["profit"]),
+        },
+    )
+    return summary
+
+
+@transaction.atomic
+def rebuild_daily_summaries():
+    """Rebuild every rollup row with two grouped queries. Returns the row count."""
+    sale_totals = Sale.objects.values("trans_date").annotate(
+        revenue=Sum("grand_total"), transactions=Count("id")
+    )
+    item_totals = {
+        row["sale__trans_date"]: row
+        for row in SaleDetail.objects.values("sale__trans_date").annotate(
+            items_sold=Sum("quantity"),
+            cogs=Sum(ITEM_COGS),
+            profit=Sum(ITEM_PROFIT),
+        )
+    }
+
+    summaries = []
+    for row in sale_totals.order_by():
+        items = item_totals.get(row["trans_date"], {})
+        summaries.append(
+            DailySalesSummary(
+                date=row["trans_date"],
+                revenue=_to_decimal(row["revenue"]),
+                transactions=row["transactions"],
+                items_sold=items.get("items_sold") or 0,
+                cogs=_to_decimal(items.get("cogs")),
+                profit=_to_decimal(items.get("profit")),
+            )
+        )
+
+    DailySalesSummary.objects.all().delete()
+    DailySalesSummary.objects.bulk_create(summaries, batch_size=1000)
+    return len(summaries)
+
+
+# =================================== Sales report ===================================
+REPORT_ROW_FIELDS = (
+    "sale_id",
+    "sale__trans_date",
+    "sale__grand_total",
+    "sale__payment_method",
+    "sale__customer__first_name",
+    "sale__customer__last_name",
+    "product__name",
+    "product__price",
+    "product__cost",
+    "price",
+    "quantity",
+    "total_detail",
+    "sale_profit",
+)
+
+
+def get_report_sales(start_date=None, end_date=None):
+    """Sales inside the report period, oldest first; every sale when no period."""
+    sales = Sale.objects.all()
+    if start_date and end_date:
+        sales = sales.filter(trans_date__range=[start_date, end_date])
+    return sales.order_by("trans_date", "id")
+
+
+def get_sales_report_totals(sales):
+    """Revenue, items, transactions, COGS and profit for ``sales`` in one query."""
+    zero = Decimal("0")
+    return SaleDetail.objects.filter(sale__in=sales.values("id")).aggregate(
+        total_revenue=Coalesce(Sum("total_detail"), 0.0),
+        total_items_sold=Coalesce(Sum("quantity"), 0),
+        total_transactions=Count("sale_id", distinct=True),
+        total_cogs=Coalesce(Sum(ITEM_COGS), zero),
+        total_profit=Coalesce(Sum(ITEM_PROFIT), zero),
+    )
+
+
+def iter_sales_report_rows(sales, chunk_size=2000):
+    """
+    Yield one dict per sale with its line items.
+
+    SaleDetail rows are streamed with ``iterator()`` and the per-sale profit is a
+    window over each sale's lines, so memory stays bounded by one sale at a time.
+    """
+    rows = (
+        SaleDetail.objects.filter(sale__in=sales.values("id"))
+        .annotate(
+            sale_profit=Window(Sum(ITEM_PROFIT), partition_by=[F("sale_id")]),
+        )
+        .order_by("sale__trans_date", "sale_id", "id")
+        .values(*REPORT_ROW_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+    for _, lines in groupby(rows, key=itemgetter("sale_id")):
+        lines = list(lines)
+        first = lines[0]
+        customer = " ".join(
+            name
+            for name in (
+                first["sale__customer__first_name"],
+                first["sale__customer__last_name"],
+            )
+            if name
+        )
+        yield {
+            "trans_date": first["sale__trans_date"],
+            "customer": customer or "N/A",
+            "grand_total": first["sale__grand_total"],
+            "profit": first["sale_profit"] or 0,
+            "payment_method": first["sale__payment_method"],
+            "item_details": [
+                {
+                    "product": line["product__name"],
+                    "original_price": line["product__price"],
+                    "price": line["price"],
+                    "cost": line["product__cost"],
+                    "quantity": line["quantity"],
+                    "total": line["total_detail"],
+                }
+                for line in lines
+            ],
+        }
+
+
+# =================================== Sale posting ===================================
+def post_sale(sale_attributes, lines):
+    """
+    Create a Sale with its SaleDetail rows and take the stock off inventory.
+
+    ``lines`` is an iterable of dicts with ``product_id``, ``quantity``, ``price``
+    and ``total``. The stock leaves through ``record_stock_movements``, which
+    locks every involved Inventory row in one query and validates the whole
+    basket before writing, so concurrent tills cannot oversell a product.
+    """
+    lines = list(lines)
+    if any(line["quantity"] <= 0 for line in lines):
+        raise ValueError("Oops! Quantities must be greater than zero.")
+    if not lines:
+        raise ValueError("Oops! A sale needs at least one product.")
+
+    with transaction.atomic():
+        sale = Sale.objects.create(**sale_attributes)
+        SaleDetail.objects.bulk_create(
+            [
+                SaleDetail(
+                    sale=sale,
+                    product_id=line["product_id"],
+                    price=line["price"],
+                    quantity=line["quantity"],
+                    total_detail=line["total"],
+                )
+                for line in lines
+            ]
+        )
+        record_stock_movements(
+            StockMovement(
+                product_id=line["product_id"],
+                kind=StockMovement.SALE,
+                quantity=-line["quantity"],
+                reference=f"sale:{sale.pk}",
+            )
+            for line in lines
+        )
+
+    return sale
+
+
+# =================================== POS lookups ===================================
+POS_LOOKUP_PAGE_SIZE = 20
+
+
+def _keyset_page(queryset, field, after=None, limit=POS_LOOKUP_PAGE_SIZE):
+    """
+    One page of ``queryset`` ordered by ``field`` then id, starting after the
+    row with id ``after``. Returns the rows and the cursor of the next page.
+    """
+    if after:
+        anchor = (
+            queryset.model.objects.filter(pk=after)
+            .values_list(field, flat=True)
+            .first()
+        )
+        if anchor is None:
+            queryset = queryset.filter(pk__gt=after)
+        else:
+            queryset = queryset.filter(
+                Q(**{f"{field}__gt": anchor}) | Q(**{field: anchor, "pk__gt": after})
+            )
+
+    rows = list(queryset.order_by(field, "pk")[: limit + 1])
+    next_cursor = rows[limit - 1].pk if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def get_pos_products(term="", after=None, limit=POS_LOOKUP_PAGE_SIZE):
+    """Active, in-stock products matching ``term``, in ``Product.to_json`` shape."""
+    products = Product.objects.filter(
+        status="ACTIVE", inventory__quantity__gt=0
+    ).select_related("inventory", "category")
+    if term:
+        products = search_products(products, term, ranked=False)
+
+    products, next_cursor = _keyset_page(products, "name", after, limit)
+    results = [
+        dict(
+            product.to_json(),
+            discounted_price=_to_decimal(product.get_discounted_price()),
+        )
+        for product in products
+    ]
+    return results, next_cursor
+
+
+def get_pos_customers(term="", after=None, limit=POS_LOOKUP_PAGE_SIZE):
+    """Customers whose name or email matches every word of ``term``, in ``to_select2`` shape."""
+    customers = Customer.objects.only("first_name", "last_name")
+    for word in term.split():
+        customers = customers.filter(
+            Q(first_name__icontains=word)
+            | Q(last_name__icontains=word)
+            | Q(email__icontains=word)
+        )
+
+    customers, next_cursor = _keyset_page(customers, "first_name", after, limit)
+    return [customer.to_select2() for customer in customers], next_cursor
+
+
+def get_pos_stock_total():
+    return (
+        Inventory.objects.filter(product__status="ACTIVE", quantity__gt=0).aggregate(
+            total=Sum("quantity")
+        )["total"]
+        or 0
+    )
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Sale, SaleDetail
+from .services import schedule_summary_refresh
+
+
+# =================================== Daily sales summary upkeep ===================================
+@receiver(pre_save, sender=Sale)
+def remember_previous_date(sender, instance, **kwargs):
+    # Refreshed in post_save: a sale moved to another receipt date leaves its
+    # old day stale, but only once the row has actually moved
+    instance._previous_trans_date = (
+        Sale.objects.filter(pk=instance.pk).values_list("trans_date", flat=True).first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=Sale)
+@receiver(post_delete, sender=Sale)
+def sale_changed(sender, instance, **kwargs):
+    previous_date = getattr(instance, "_previous_trans_date", None)
+    if previous_date and str(previous_date) != str(instance.trans_date):
+        schedule_summary_refresh(previous_date)
+    schedule_summary_refresh(instance.trans_date)
+
+
+@receiver(post_save, sender=SaleDetail)
+@receiver(post_delete, sender=SaleDetail)
+def sale_detail_changed(sender, instance, **kwargs):
+    if SaleDetail._meta.get_field("sale").is_cached(instance):
+        trans_date = instance.sale.trans_date
+    else:
+        trans_date = (
+            Sale.objects.filter(pk=instance.sale_id)
+            .values_list("trans_date", flat=True)
+            .first()
+        )
+    if trans_date:
+        schedule_summary_refresh(trans_date)
@@ -1 +1,226 @@
-# Create your tests here.
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+
+from apps.inventory.models import Inventory, StockMovement
+from apps.inventory.services import InsufficientStockError, record_stock_movements
+from apps.products.models import Product
+
+from .models import DailySalesSummary, Sale, SaleDetail
+from .services import (
+    get_report_sales,
+    get_sales_report_totals,
+    iter_sales_report_rows,
+    post_sale,
+    rebuild_daily_summaries,
+)
+
+
+def create_product(name, quantity):
+    product = Product.objects.create(
+        name=name, status="ACTIVE", cost=Decimal("500.00"), price=Decimal("800.00")
+    )
+    record_stock_movements(
+        [
+            StockMovement(
+                product=product, kind=StockMovement.ADJUSTMENT, quantity=quantity
+            )
+        ]
+    )
+    return product
+
+
+def line(product, quantity):
+    return {
+        "product_id": product.pk,
+        "quantity": quantity,
+        "price": product.price,
+        "total": product.price * quantity,
+    }
+
+
+class PostSaleTests(TestCase):
+    def setUp(self):
+        self.soap = create_product("Soap", 5)
+        self.salt = create_product("Salt", 1)
+        self.sale_attributes = {"trans_date": date(2025, 1, 15), "grand_total": 0}
+
+    def stock_of(self, product):
+        return Inventory.objects.get(product=product).quantity
+
+    def test_takes_every_line_off_stock(self):
+        sale = post_sale(self.sale_attributes, [line(self.soap, 2), line(self.salt, 1)])
+
+        self.assertEqual(sale.items.count(), 2)
+        self.assertEqual(self.stock_of(self.soap), 3)
+        self.assertEqual(self.stock_of(self.salt), 0)
+        self.assertEqual(
+            StockMovement.objects.filter(reference=f"sale:{sale.pk}").count(), 2
+        )
+
+    def test_oversell_rolls_back_the_whole_sale(self):
+        with self.assertRaises(InsufficientStockError):
+            post_sale(self.sale_attributes, [line(self.soap, 2), line(self.salt, 2)])
+
+        self.assertFalse(Sale.objects.exists())
+        self.assertFalse(SaleDetail.objects.exists())
+        self.assertEqual(self.stock_of(self.soap), 5)
+        self.assertEqual(self.stock_of(self.salt), 1)
+
+    def test_rejects_empty_sales_and_non_positive_quantities(self):
+        for lines in ([], [line(self.soap, 0)], [line(self.soap, -1)]):
+            with self.assertRaises(ValueError):
+                post_sale(self.sale_attributes, lines)
+
+        self.assertFalse(Sale.objects.exists())
+        self.assertEqual(self.stock_of(self.soap), 5)
+
+
+class DailySalesSummaryTests(TestCase):
+    def setUp(self):
+        self.soap = create_product("Soap", 20)
+        self.salt = create_product("Salt", 20)
+
+    def sell(self, day, *lines):
+        # The rollup is refreshed when the sale commits
+        with self.captureOnCommitCallbacks(execute=True):
+            return post_sale({"trans_date": day, "grand_total": 0}, list(lines))
+
+    def raw_summaries(self):
+        summaries = {}
+        for sale in Sale.objects.prefetch_related("items__product"):
+            row = summaries.setdefault(
+                sale.trans_date,
+                {
+                    "revenue": Decimal("0.00"),
+                    "transactions": 0,
+                    "items_sold": 0,
+                    "cogs": Decimal("0.00"),
+                    "profit": Decimal("0.00"),
+                },
+            )
+            row["revenue"] += Decimal(str(sale.grand_total))
+            row["transactions"] += 1
+            for item in sale.items.all():
+                row["items_sold"] += item.quantity
+                row["cogs"] += item.product.cost * item.quantity
+                row["profit"] += (
+                    Decimal(str(item.price)) - item.product.cost
+                ) * item.quantity
+        return summaries
+
+    def assert_rollup_matches_raw_sums(self):
+        self.assertEqual(
+            {
+                summary.date: {
+                    "revenue": summary.revenue,
+                    "transactions": summary.transactions,
+                    "items_sold": summary.items_sold,
+                    "cogs": summary.cogs,
+                    "profit": summary.profit,
+                }
+                for summary in DailySalesSummary.objects.all()
+            },
+            self.raw_summaries(),
+        )
+
+    def test_rollup_follows_posted_sales(self):
+        self.sell(date(2025, 1, 15), line(self.soap, 2), line(self.salt, 1))
+        self.sell(date(2025, 1, 15), line(self.soap, 1))
+        self.sell(date(2025, 1, 16), line(self.salt, 3))
+
+        self.assertEqual(DailySalesSummary.objects.count(), 2)
+        self.assert_rollup_matches_raw_sums()
+
+    def test_edits_and_deletes_refresh_the_rollup(self):
+        sale = self.sell(date(2025, 1, 15), line(self.soap, 2), line(self.salt, 1))
+        self.sell(date(2025, 1, 15), line(self.soap, 1))
+
+        sale.grand_total = 2400
+        sale.trans_date = date(2025, 1, 17)
+        with self.captureOnCommitCallbacks(execute=True):
+            sale.save()
+        self.assert_rollup_matches_raw_sums()
+
+        item = sale.items.get(product=self.soap)
+        item.quantity = 4
+        item.total_detail = item.price * 4
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+        self.assert_rollup_matches_raw_sums()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sale.items.get(product=self.salt).delete()
+        self.assert_rollup_matches_raw_sums()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sale.delete()
+        self.assertFalse(
+            DailySalesSummary.objects.filter(date=date(2025, 1, 17)).exists()
+        )
+        self.assert_rollup_matches_raw_sums()
+
+    def test_rebuild_matches_the_maintained_rollup(self):
+        self.sell(date(2025, 1, 15), line(self.soap, 2))
+        self.sell(date(2025, 1, 16), line(self.salt, 1), line(self.soap, 1))
+
+        self.assertEqual(rebuild_daily_summaries(), 2)
+        self.assert_rollup_matches_raw_sums()
+
+
+class SalesReportTests(TestCase):
+    def setUp(self):
+        soap = create_product("Soap", 20)
+        salt = create_product("Salt", 20)
+        discounted = dict(line(salt, 2), price=600, total=1200)
+        self.first = post_sale(
+            {"trans_date": date(2025, 1, 15), "grand_total": 2800},
+            [line(soap, 2), discounted],
+        )
+        self.second = post_sale(
+            {"trans_date": date(2025, 1, 16), "grand_total": 800}, [line(soap, 1)]
+        )
+        post_sale({"trans_date": date(2025, 2, 1), "grand_total": 800}, [line(salt, 1)])
+
+    def test_period_totals_come_from_the_period_only(self):
+        sales = get_report_sales(date(2025, 1, 1), date(2025, 1, 31))
+
+        self.assertEqual(list(sales), [self.first, self.second])
+        self.assertEqual(
+            get_sales_report_totals(sales),
+            {
+                "total_revenue": 3600.0,
+                "total_items_sold": 5,
+                "total_transactions": 2,
+                "total_cogs": Decimal("2500.00"),
+                # 300 a soap, 100 a salt sold at a discount
+                "total_profit": Decimal("1100.00"),
+            },
+        )
+
+    def test_rows_group_lines_under_their_sale(self):
+        rows = list(
+            iter_sales_report_rows(
+                get_report_sales(date(2025, 1, 1), date(2025, 1, 31)), chunk_size=1
+            )
+        )
+
+        self.assertEqual(
+            [(row["trans_date"], row["grand_total"], row["profit"]) for row in rows],
+            [
+                (date(2025, 1, 15), 2800, Decimal("800.00")),
+                (date(2025, 1, 16), 800, Decimal("300.00")),
+            ],
+        )
+        self.assertEqual(
+            [
+                (item["product"], item["price"], item["quantity"])
+                for item in rows[0]["item_details"]
+            ],
+            [("Soap", 800, 2), ("Salt", 600, 2)],
+        )
+        self.assertEqual(rows[0]["customer"], "N/A")
+
+    def test_no_period_reports_every_sale(self):
+        self.assertEqual(get_report_sales().count(), 3)
@@ -9,6 +9,16 @@ urlpatterns = [
     path("", views.sales_list_view, name="sales_list"),
     path("sales-report/", views.sales_report_view, name="sales_report"),
     path("add", views.sales_add_view, name="sales_add"),
+    path(
+        "lookup/products/",
+        views.pos_products_lookup_view,
+        name="pos_products_lookup",
+    ),
+    path(
+        "lookup/customers/",
+        views.pos_customers_lookup_view,
+        name="pos_customers_lookup",
+    ),
     path("details/<str:sale_id>", views.sales_details_view, name="sales_details"),
     path("sale/delete/<int:sale_id>/", views.sale_delete_view, name="delete_sale"),
     path("pdf/<str:sale_id>", views.receipt_pdf_view, name="sales_receipt_pdf"),
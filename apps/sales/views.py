@@ -1,21 +1,30 @@
 import json
 import logging
-from decimal import Decimal
 from django.core.paginator import Paginator
-from django.db.models import Count, Sum, F, ExpressionWrapper, DecimalField
+from django.db.models import Sum, F, ExpressionWrapper, DecimalField
 from django.db import transaction
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from core.wsgi import *
 from xhtml2pdf import pisa
 from django.template.loader import get_template
 from apps.customers.models import Customer
 from apps.inventory.models import Inventory
-from apps.products.models import Product
+from apps.main.exports import export_format, export_queryset
+from apps.inventory.services import return_sale
 from .models import Sale, SaleDetail
 from .forms import ReportPeriodForm
+from .services import (
+    get_pos_customers,
+    get_pos_products,
+    get_pos_stock_total,
+    get_report_sales,
+    get_sales_report_totals,
+    iter_sales_report_rows,
+    post_sale,
+)
 
 
 # Import custom decorators
@@ -28,6 +37,19 @@ logger = logging.getLogger(__name__)
 
 
 # =================================== Sale list view ===================================
+SALES_EXPORT_COLUMNS = (
+    ("Sale ID", "id"),
+    ("Receipt Number", "receipt_number"),
+    ("Receipt Date", "trans_date"),
+    ("Customer First Name", "customer__first_name"),
+    ("Customer Last Name", "customer__last_name"),
+    ("Type", "sale_type"),
+    ("Payment Method", "payment_method"),
+    ("Sub Total", "sub_total"),
+    ("Tax", "tax_amount"),
+    ("Grand Total", "grand_total"),
+    ("Profit", "profit"),
+)
 
 
 @login_required
@@ -50,6 +72,10 @@ def sales_list_view(request):
         .order_by("id")
     )
 
+    export = export_format(request)
+    if export:
+        return export_queryset(export, "sales", sales, SALES_EXPORT_COLUMNS)
+
     paginator = Paginator(sales, 10)
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
@@ -83,92 +109,34 @@ def sales_report_view(request):
         start_date = form.cleaned_data["start_date"]
         end_date = form.cleaned_data["end_date"]
 
-    # Filter sales by date range and prefetch related data
-    sales = (
-        Sale.objects.all()
-        .select_related("customer")
-        .prefetch_related("items__product__inventory")
-        .order_by("id")
-    )
-
-    # Aggregate totals
-    total_sales = sales.aggregate(
-        total_revenue=Sum("items__total_detail"),  # Calculate directly from items
-        total_items_sold=Sum("items__quantity"),
-        total_transactions=Count("id"),
-    )
-
-    cogs = 0
-    for sale in sales:
-        for item in sale.items.all():
-            product = item.product
-            cogs += product.cost * item.quantity
+    # Filter sales by date range; totals are computed in a single SQL aggregate
+    sales = get_report_sales(start_date, end_date)
+    totals = get_sales_report_totals(sales)
 
     # Calculate stock balance
     stock_balance = (
         Inventory.objects.aggregate(total_stock=Sum("quantity"))["total_stock"] or 0
     )
 
-    # Prepare detailed sales data
-    sale_details = []
-    total_profit_after_sales = 0
-
-    for sale in sales:
-        sale_profit = 0
-        item_details = []
-
-        for item in sale.items.all():
-            product = item.product
-            # Get the original price from the ProductVolume (before discount)
-            original_price = product.price
-
-            # Apply discount if exists (use price from SaleDetail)
-            discounted_price = item.price  # Use the price from SaleDetail directly
-            item_profit = (
-                (Decimal(discounted_price) - product.cost) * item.quantity
-                if product
-                else 0
-            )
-            sale_profit += item_profit
-            total_profit_after_sales += item_profit
-
-            item_details.append(
-                {
-                    "product": product.name,
-                    "original_price": original_price,  # Add original price
-                    "price": discounted_price,  # Use price from SaleDetail
-                    "cost": (product.cost if product else 0),
-                    "quantity": item.quantity,
-                    "total": item.total_detail,
-                }
-            )
-
-        sale_details.append(
-            {
-                "trans_date": sale.trans_date,
-                "customer": (
-                    f"{sale.customer.first_name} {sale.customer.last_name}"
-                    if sale.customer
-                    else "N/A"
-                ),
-                "grand_total": sale.grand_total,
-                "profit": sale_profit,
-                "payment_method": sale.payment_method,
-                "item_details": item_details,
-            }
-        )
+    # Paginate sales; only the current page's line items are fetched
+    paginator = Paginator(sales.values_list("id", flat=True), 50)
+    page_obj = paginator.get_page(request.GET.get("page"))
+    sale_details = list(
+        iter_sales_report_rows(Sale.objects.filter(id__in=list(page_obj)))
+    )
 
     context = {
         "form": form,
         "start_date": start_date,
         "end_date": end_date,
-        "total_revenue": total_sales["total_revenue"],
-        "total_items_sold": total_sales["total_items_sold"],
-        "total_transactions": total_sales["total_transactions"],
-        "total_cogs": cogs,
+        "total_revenue": totals["total_revenue"],
+        "total_items_sold": totals["total_items_sold"],
+        "total_transactions": totals["total_transactions"],
+        "total_cogs": totals["total_cogs"],
         "sales": sale_details,
+        "page_obj": page_obj,
         "stock_balance": stock_balance,
-        "total_profit_after_sales": total_profit_after_sales,
+        "total_profit_after_sales": totals["total_profit"],
         "table_title": "Sales Report",
     }
 
@@ -179,19 +147,8 @@ def sales_report_view(request):
 @admin_or_manager_or_staff_required
 @login_required
 def sales_add_view(request):
-    # Fetch only active products with their inventory
-    products = Product.objects.filter(
-        status="ACTIVE", inventory__quantity__gt=0
-    ).select_related("inventory")
-
-    context = {
-        "customers": [c.to_select2() for c in Customer.objects.all()],
-        "products": products,
-        "total_stock": sum(
-            product.inventory.quantity if hasattr(product, "inventory") else 0
-            for product in products
-        ),
-    }
+    # Products and customers are fetched on demand by the lookup endpoints
+    context = {"total_stock": get_pos_stock_total()}
 
     if request.method == "POST":
         try:
@@ -210,50 +167,26 @@ def sales_add_view(request):
                 "amount_change": float(request.POST.get("amount_change", 0)),
             }
 
-            with transaction.atomic():
-                # Create the sale
-                new_sale = Sale.objects.create(**sale_attributes)
-                logger.info(f"Sale created successfully: {sale_attributes}")
-
-                # Extract product details from form data
-                products_data = request.POST.getlist("products")
-                for product_data_str in products_data:
-                    product_data = json.loads(product_data_str)
-                    product_obj = Product.objects.get(id=int(product_data["id"]))
-                    quantity_requested = int(product_data["quantity"])
-
-                    # Check if the product has inventory and stock is available
-                    if (
-                        not hasattr(product_obj, "inventory")
-                        or product_obj.inventory.quantity < quantity_requested
-                    ):
-                        raise ValueError(
-                            f"Oops! Insufficient stock for {product_obj.name}"
-                        )
-
-                    # Update inventory stock
-                    inventory_obj = product_obj.inventory
-                    inventory_obj.quantity -= quantity_requested
-                    inventory_obj.save()
-                    logger.info(
-                        f"Stock updated for {product_obj.name}: {inventory_obj.quantity}"
-                    )
-
-                    # Create sale detail
-                    detail_attributes = {
-                        "sale": new_sale,
-                        "product": product_obj,
+            # Extract product details from form data
+            lines = []
+            for product_data_str in request.POST.getlist("products"):
+                product_data = json.loads(product_data_str)
+                lines.append(
+                    {
+                        "product_id": int(product_data["id"]),
+                        "quantity": int(product_data["quantity"]),
                         "price": float(product_data["price"]),
-                        "quantity": quantity_requested,
-                        "total_detail": float(product_data["total_product"]),
+                        "total": float(product_data["total_product"]),
                     }
-                    SaleDetail.objects.create(**detail_attributes)
-                    logger.info(f"Sale detail added: {detail_attributes}")
-
-                messages.success(
-                    request, "Sale created successfully!", extra_tags="bg-success"
                 )
-                return redirect("sales:sales_list")
+
+            new_sale = post_sale(sale_attributes, lines)
+            logger.info(f"Sale {new_sale.id} created with {len(lines)} line(s)")
+
+            messages.success(
+                request, "Sale created successfully!", extra_tags="bg-success"
+            )
+            return redirect("sales:sales_list")
 
         except ValueError as ve:
             logger.error(f"Stock error: {ve}")
@@ -271,6 +204,32 @@ def sales_add_view(request):
     return render(request, "sales/sales_add.html", context=context)
 
 
+# =================================== POS lookup views ===================================
+def _lookup_cursor(request):
+    try:
+        return int(request.GET.get("after", ""))
+    except ValueError:
+        return None
+
+
+@login_required
+@admin_or_manager_or_staff_required
+def pos_products_lookup_view(request):
+    results, next_cursor = get_pos_products(
+        request.GET.get("term", "").strip(), _lookup_cursor(request)
+    )
+    return JsonResponse({"results": results, "next": next_cursor})
+
+
+@login_required
+@admin_or_manager_or_staff_required
+def pos_customers_lookup_view(request):
+    results, next_cursor = get_pos_customers(
+        request.GET.get("term", "").strip(), _lookup_cursor(request)
+    )
+    return JsonResponse({"results": results, "next": next_cursor})
+
+
 # =================================== Sale details view ===================================
 @login_required
 @admin_or_manager_or_staff_required
@@ -297,7 +256,10 @@ def sale_delete_view(request, sale_id):
     try:
         # Get the sale to delete
         sale = Sale.objects.get(id=sale_id)
-        sale.delete()
+        with transaction.atomic():
+            # Put the sold stock back before the sale disappears
+            return_sale(sale, user=request.user, note="Sale deleted")
+            sale.delete()
         messages.success(
             request, f"Sale: {sale_id} deleted successfully!", extra_tags="bg-success"
         )
@@ -0,0 +1,93 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.supplier.replenishment import (
+    DEFAULT_LEAD_TIME_DAYS,
+    DEFAULT_REVIEW_DAYS,
+    DEFAULT_SERVICE_LEVEL,
+    FORECAST_HISTORY_DAYS,
+    apply_reorder_points,
+    draft_purchase_orders,
+    replenishment_plan,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Forecast demand from sales and orders, then draft one purchase order per "
+        "supplier for every product at or below its reorder point."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lead-time",
+            type=int,
+            default=DEFAULT_LEAD_TIME_DAYS,
+            help="Days between ordering and receiving stock.",
+        )
+        parser.add_argument(
+            "--review-days",
+            type=int,
+            default=DEFAULT_REVIEW_DAYS,
+            help="Days until the next run; orders cover them too.",
+        )
+        parser.add_argument(
+            "--service-level",
+            type=float,
+            default=DEFAULT_SERVICE_LEVEL,
+            help="Chance of not running out during the lead time, e.g. 0.95.",
+        )
+        parser.add_argument(
+            "--history-days",
+            type=int,
+            default=FORECAST_HISTORY_DAYS,
+            help="Days of sales history to forecast from.",
+        )
+        parser.add_argument(
+            "--update-thresholds",
+            action="store_true",
+            help="Also make each reorder point the product's low stock threshold.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print the suggested orders without drafting them.",
+        )
+
+    def handle(self, *args, **options):
+        if not 0 < options["service_level"] < 1:
+            raise CommandError("--service-level must be between 0 and 1.")
+
+        started = time.monotonic()
+        plan = replenishment_plan(
+            lead_time_days=options["lead_time"],
+            review_days=options["review_days"],
+            service_level=options["service_level"],
+            history_days=options["history_days"],
+        )
+        if plan.empty:
+            self.stdout.write("No active products with a supplier.")
+            return
+        lines = plan[plan["order_quantity"] > 0]
+        self.stdout.write(
+            f"Planned {len(plan)} products in {time.monotonic() - started:.2f}s, "
+            f"{len(lines)} to reorder."
+        )
+
+        if options["dry_run"]:
+            self.stdout.write(
+                lines.sort_values(["supplier_id", "order_quantity"]).to_string()
+            )
+            return
+
+        if options["update_thresholds"]:
+            changed = apply_reorder_points(plan)
+            self.stdout.write(f"Updated {changed} low stock thresholds.")
+        purchase_orders = draft_purchase_orders(plan)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Drafted {len(purchase_orders)} purchase order(s) with "
+                f"{len(lines)} line(s) in {time.monotonic() - started:.2f}s."
+            )
+        )
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:43
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_received_items(apps, schema_editor):
+    """Orders received before receipts existed were stocked by hand already."""
+    PurchaseOrderItem = apps.get_model("supplier", "PurchaseOrderItem")
+    PurchaseOrderItem.objects.filter(purchase_order__status="received").update(
+        received_quantity=F("quantity")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supplier", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="purchaseorderitem",
+            name="received_quantity",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="purchaseorder",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("partial", "Partially Received"),
+                    ("received", "Received"),
+                    ("cancelled", "Cancelled"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+        migrations.RunPython(mark_received_items, migrations.RunPython.noop),
+    ]
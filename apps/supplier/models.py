@@ -51,6 +51,7 @@ class Supplier(models.Model):
 class PurchaseOrder(models.Model):
     STATUS_CHOICES = [
         ("pending", "Pending"),
+        ("partial", "Partially Received"),
         ("received", "Received"),
         ("cancelled", "Cancelled"),
     ]
@@ -85,6 +86,8 @@ class PurchaseOrderItem(models.Model):
     )
     product = models.ForeignKey("products.Product", on_delete=models.PROTECT)
     quantity = models.PositiveIntegerField()
+    # Units already posted into inventory by goods receipts
+    received_quantity = models.PositiveIntegerField(default=0)
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created at")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated at")
@@ -92,6 +95,10 @@ class PurchaseOrderItem(models.Model):
     def total_price(self):
         return self.quantity * self.unit_price
 
+    @property
+    def outstanding_quantity(self):
+        return max(self.quantity - self.received_quantity, 0)
+
     def __str__(self):
         return f"{self.product.name} (x{self.quantity})"
 
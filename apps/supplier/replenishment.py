@@ -0,0 +1,252 @@
+"""
+Reorder points and purchase order drafts from sales history.
+
+Daily demand per product comes from SaleDetail and OrderDetail, aggregated
+in the database and pivoted into a days x products matrix, so every
+forecasting step below is one vectorized NumPy/pandas operation over all
+products at once.
+"""
+
+import math
+from datetime import timedelta
+from itertools import chain
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.inventory.alerts import refresh_stock_alerts
+from apps.inventory.models import Inventory
+from apps.orders.models import OrderDetail
+from apps.products.models import Product
+from apps.sales.models import SaleDetail
+
+from .models import PurchaseOrder, PurchaseOrderItem
+
+FORECAST_HISTORY_DAYS = 182
+# Both windows span whole weeks, so weekday swings average out of them
+FORECAST_SHORT_WINDOW = 7
+FORECAST_LONG_WINDOW = 28
+DEFAULT_LEAD_TIME_DAYS = 7
+# Stock ordered now has to last until the next run has landed as well
+DEFAULT_REVIEW_DAYS = 14
+DEFAULT_SERVICE_LEVEL = 0.95
+# Orders that never left, or came back, are not demand
+LOST_ORDER_STATUSES = ("Canceled", "Refunded", "Returned")
+
+
+# =================================== Demand ===================================
+def load_daily_demand(start, end):
+    """Units sold per day from ``start`` to ``end``: a date x product_id frame."""
+    sales = (
+        SaleDetail.objects.filter(sale__trans_date__range=(start, end))
+        .values_list("product_id", "sale__trans_date")
+        .annotate(units=Sum("quantity"))
+        .order_by()
+    )
+    orders = (
+        OrderDetail.objects.filter(order__created_at__date__range=(start, end))
+        .exclude(order__status__in=LOST_ORDER_STATUSES)
+        .annotate(day=TruncDate("order__created_at"))
+        .values_list("product_id", "day")
+        .annotate(units=Sum("quantity"))
+        .order_by()
+    )
+    records = pd.DataFrame.from_records(
+        chain(sales.iterator(), orders.iterator()),
+        columns=["product_id", "day", "units"],
+    )
+    days = pd.date_range(start, end, freq="D")
+    if records.empty:
+        return pd.DataFrame(index=days, dtype=float)
+
+    records["day"] = pd.to_datetime(records["day"])
+    demand = records.pivot_table(
+        index="day", columns="product_id", values="units", aggfunc="sum"
+    )
+    return demand.reindex(days).fillna(0).astype(float)
+
+
+def weekday_factors(demand):
+    """
+    How each weekday's demand compares to the daily mean, per product:
+    a 7 x products array, 1 where a product has no history.
+    """
+    values = demand.to_numpy()
+    means = values.mean(axis=0)
+    by_weekday = demand.groupby(demand.index.dayofweek).mean()
+    by_weekday = by_weekday.reindex(range(7), fill_value=0).to_numpy()
+    return np.divide(by_weekday, means, out=np.ones_like(by_weekday), where=means > 0)
+
+
+def forecast_demand(demand, start, days, factors=None):
+    """Expected units per product over the ``days`` days from ``start``."""
+    values = demand.to_numpy()
+    # Recent demand weighs as much as the steadier four-week average
+    level = (
+        values[-FORECAST_SHORT_WINDOW:].mean(axis=0)
+        + values[-FORECAST_LONG_WINDOW:].mean(axis=0)
+    ) / 2
+    if factors is None:
+        factors = weekday_factors(demand)
+    weekdays = pd.date_range(start, periods=days, freq="D").dayofweek
+    return level * factors[weekdays].sum(axis=0)
+
+
+# =================================== Replenishment plan ===================================
+def _stock_positions(product_ids):
+    """On hand and on order (outstanding on open purchase orders) per product."""
+    on_hand = dict(
+        Inventory.objects.filter(product_id__in=product_ids).values_list(
+            "product_id", "quantity"
+        )
+    )
+    on_order = dict(
+        PurchaseOrderItem.objects.filter(
+            product_id__in=product_ids,
+            purchase_order__status__in=("pending", "partial"),
+        )
+        .values_list("product_id")
+        .annotate(units=Sum(F("quantity") - F("received_quantity")))
+        .order_by()
+    )
+    return (
+        pd.Series(on_hand, dtype=float).reindex(product_ids, fill_value=0),
+        pd.Series(on_order, dtype=float).reindex(product_ids, fill_value=0),
+    )
+
+
+def replenishment_plan(
+    lead_time_days=DEFAULT_LEAD_TIME_DAYS,
+    review_days=DEFAULT_REVIEW_DAYS,
+    service_level=DEFAULT_SERVICE_LEVEL,
+    history_days=FORECAST_HISTORY_DAYS,
+    today=None,
+):
+    """
+    Reorder point, safety stock and suggested order quantity of every active
+    product that has a supplier, as a frame indexed by product id.
+
+    Safety stock covers demand swings over the lead time at ``service_level``;
+    the reorder point adds the demand expected over the lead time. Products
+    at or below it are ordered up to what lasts the lead and review periods.
+    """
+    today = today or timezone.localdate()
+    products = pd.DataFrame.from_records(
+        Product.objects.filter(status="ACTIVE", supplier__isnull=False)
+        .values_list("id", "supplier_id", "cost")
+        .iterator(),
+        columns=["product_id", "supplier_id", "unit_cost"],
+    ).set_index("product_id")
+    if products.empty:
+        return products
+
+    demand = load_daily_demand(today - timedelta(days=history_days), today)
+    demand = demand.reindex(columns=products.index, fill_value=0.0)
+    factors = weekday_factors(demand)
+    tomorrow = today + timedelta(days=1)
+
+    z = NormalDist().inv_cdf(service_level)
+    daily_std = demand.to_numpy()[-FORECAST_LONG_WINDOW:].std(axis=0)
+    safety_stock = np.ceil(z * daily_std * math.sqrt(lead_time_days))
+    lead_demand = forecast_demand(demand, tomorrow, lead_time_days, factors)
+    cover_demand = forecast_demand(
+        demand, tomorrow, lead_time_days + review_days, factors
+    )
+    on_hand, on_order = _stock_positions(products.index.tolist())
+
+    plan = products.assign(
+        daily_demand=cover_demand / (lead_time_days + review_days),
+        safety_stock=safety_stock,
+        reorder_point=np.ceil(lead_demand + safety_stock),
+        on_hand=on_hand,
+        on_order=on_order,
+    )
+    position = plan["on_hand"] + plan["on_order"]
+    order_up_to = np.ceil(cover_demand + safety_stock)
+    plan["order_quantity"] = np.where(
+        (position <= plan["reorder_point"]) & (order_up_to > position),
+        order_up_to - position,
+        0,
+    )
+    return plan.astype(
+        {
+            "safety_stock": int,
+            "reorder_point": int,
+            "on_hand": int,
+            "on_order": int,
+            "order_quantity": int,
+        }
+    )
+
+
+# =================================== Applying a plan ===================================
+@transaction.atomic
+def draft_purchase_orders(plan, notes=None):
+    """
+    Create one pending PurchaseOrder per supplier holding the plan's
+    suggested quantities, in two bulk inserts. Returns the orders.
+    """
+    lines = plan[plan["order_quantity"] > 0]
+    if lines.empty:
+        return []
+
+    notes = notes or f"Drafted by replenishment on {timezone.localdate():%Y-%m-%d}"
+    # NumPy scalars are turned into Python ints, which database drivers adapt
+    supplier_ids = sorted(set(lines["supplier_id"].tolist()))
+    purchase_orders = PurchaseOrder.objects.bulk_create(
+        [
+            PurchaseOrder(supplier_id=supplier_id, notes=notes)
+            for supplier_id in supplier_ids
+        ]
+    )
+    order_ids = {order.supplier_id: order.pk for order in purchase_orders}
+    PurchaseOrderItem.objects.bulk_create(
+        (
+            # bulk_create skips save(), which would fill in the cost itself
+            PurchaseOrderItem(
+                purchase_order_id=order_ids[supplier_id],
+                product_id=product_id,
+                quantity=quantity,
+                unit_price=unit_cost,
+            )
+            for product_id, supplier_id, quantity, unit_cost in zip(
+                lines.index.tolist(),
+                lines["supplier_id"].tolist(),
+                lines["order_quantity"].tolist(),
+                lines["unit_cost"],
+            )
+        ),
+        batch_size=1000,
+    )
+    return purchase_orders
+
+
+@transaction.atomic
+def apply_reorder_points(plan):
+    """Make each product's reorder point its low stock threshold."""
+    inventories = list(
+        Inventory.objects.filter(product_id__in=plan.index.tolist()).only(
+            "id", "product_id", "low_stock_threshold"
+        )
+    )
+    changed = []
+    for inventory in inventories:
+        threshold = int(plan.at[inventory.product_id, "reorder_point"])
+        if inventory.low_stock_threshold != threshold:
+            inventory.low_stock_threshold = threshold
+            changed.append(inventory)
+    Inventory.objects.bulk_update(changed, ["low_stock_threshold"], batch_size=1000)
+
+    # bulk_update bypasses Inventory's post_save, so re-check alerts directly
+    if changed:
+        transaction.on_commit(
+            lambda: refresh_stock_alerts(
+                [inventory.product_id for inventory in changed]
+            )
+        )
+    return len(changed)
@@ -0,0 +1,74 @@
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from apps.inventory.models import StockMovement
+from apps.inventory.services import record_stock_movements
+
+from .models import PurchaseOrder, PurchaseOrderItem
+
+
+# =================================== Goods receipt ===================================
+@transaction.atomic
+def receive_purchase_order(purchase_order_id, quantities=None, user=None):
+    """
+    Post a delivery against a purchase order into inventory.
+
+    ``quantities`` maps PurchaseOrderItem ids to the units delivered; items
+    left out receive nothing, and ``None`` receives everything outstanding.
+    The order row is locked so two receipts cannot post the same units, the
+    stock moves through ``record_stock_movements`` and the items are marked
+    in one UPDATE, however many lines the delivery has.
+    Returns the purchase order and the number of units received.
+    """
+    purchase_order = PurchaseOrder.objects.select_for_update().get(pk=purchase_order_id)
+    if purchase_order.status == "cancelled":
+        raise ValueError(f"Oops! Purchase order #{purchase_order.pk} is cancelled.")
+
+    items = list(
+        purchase_order.items.only(
+            "id", "product_id", "quantity", "received_quantity", "purchase_order_id"
+        )
+    )
+    if quantities is None:
+        quantities = {item.id: item.outstanding_quantity for item in items}
+
+    received = {}
+    for item in items:
+        quantity = quantities.get(item.id, 0)
+        if quantity < 0 or quantity > item.outstanding_quantity:
+            raise ValueError(
+                f"Oops! Item #{item.id} has {item.outstanding_quantity} units outstanding."
+            )
+        if quantity:
+            received[item] = quantity
+
+    record_stock_movements(
+        StockMovement(
+            product_id=item.product_id,
+            kind=StockMovement.RECEIPT,
+            quantity=quantity,
+            reference=f"po:{purchase_order.pk}",
+            created_by=user,
+        )
+        for item, quantity in received.items()
+    )
+    if received:
+        PurchaseOrderItem.objects.filter(pk__in=[item.pk for item in received]).update(
+            received_quantity=F("received_quantity")
+            + Case(
+                *[
+                    When(pk=item.pk, then=Value(quantity))
+                    for item, quantity in received.items()
+                ],
+                default=Value(0),
+            ),
+            updated_at=timezone.now(),
+        )
+
+    if not any(item.outstanding_quantity > received.get(item, 0) for item in items):
+        purchase_order.status = "received"
+    elif received or any(item.received_quantity for item in items):
+        purchase_order.status = "partial"
+    purchase_order.save(update_fields=["status", "updated_at"])
+    return purchase_order, sum(received.values())
@@ -1 +1,197 @@
-# Create your tests here.
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+
+from apps.inventory.models import Inventory, StockMovement
+from apps.inventory.services import record_stock_movements
+from apps.products.models import Product
+from apps.sales.models import Sale, SaleDetail
+
+from .models import PurchaseOrder, PurchaseOrderItem, Supplier
+from .replenishment import draft_purchase_orders, replenishment_plan
+from .services import receive_purchase_order
+
+
+class ReceivePurchaseOrderTests(TestCase):
+    def setUp(self):
+        supplier = Supplier.objects.create(
+            name="Acme", contact_name="Jo", email="jo@example.com", address="Kampala"
+        )
+        self.purchase_order = PurchaseOrder.objects.create(supplier=supplier)
+        self.soap, self.salt = [
+            PurchaseOrderItem.objects.create(
+                purchase_order=self.purchase_order,
+                product=Product.objects.create(
+                    name=name,
+                    status="ACTIVE",
+                    cost=Decimal("500.00"),
+                    price=Decimal("800.00"),
+                ),
+                quantity=quantity,
+            )
+            for name, quantity in (("Soap", 10), ("Salt", 4))
+        ]
+
+    def stock_of(self, item):
+        return Inventory.objects.get(product_id=item.product_id).quantity
+
+    def test_partial_receipts_complete_the_order(self):
+        purchase_order, units = receive_purchase_order(
+            self.purchase_order.pk, {self.soap.pk: 6}
+        )
+
+        self.assertEqual(units, 6)
+        self.assertEqual(purchase_order.status, "partial")
+        self.soap.refresh_from_db()
+        self.assertEqual(self.soap.outstanding_quantity, 4)
+        self.assertEqual(self.stock_of(self.soap), 6)
+
+        purchase_order, units = receive_purchase_order(self.purchase_order.pk)
+
+        self.assertEqual(units, 8)
+        self.assertEqual(purchase_order.status, "received")
+        self.assertEqual(self.stock_of(self.soap), 10)
+        self.assertEqual(self.stock_of(self.salt), 4)
+        self.assertEqual(
+            StockMovement.objects.filter(
+                reference=f"po:{self.purchase_order.pk}", kind=StockMovement.RECEIPT
+            ).count(),
+            3,
+        )
+
+    def test_over_receipt_posts_nothing(self):
+        receive_purchase_order(self.purchase_order.pk, {self.soap.pk: 8})
+
+        with self.assertRaises(ValueError):
+            receive_purchase_order(
+                self.purchase_order.pk, {self.soap.pk: 3, self.salt.pk: 1}
+            )
+
+        self.salt.refresh_from_db()
+        self.assertEqual(self.salt.received_quantity, 0)
+        self.assertEqual(self.stock_of(self.soap), 8)
+        self.assertFalse(
+            Inventory.objects.filter(product_id=self.salt.product_id).exists()
+        )
+
+    def test_cancelled_orders_cannot_be_received(self):
+        PurchaseOrder.objects.filter(pk=self.purchase_order.pk).update(
+            status="cancelled"
+        )
+
+        with self.assertRaises(ValueError):
+            receive_purchase_order(self.purchase_order.pk)
+        self.assertFalse(StockMovement.objects.exists())
+
+
+class ReplenishmentPlanTests(TestCase):
+    today = date(2025, 3, 31)
+    # 56 days of history: eight whole weeks, so every weekday weighs the same
+    history_days = 55
+
+    def setUp(self):
+        self.supplier = Supplier.objects.create(
+            name="Acme", contact_name="Jo", email="jo@example.com", address="Kampala"
+        )
+        self.steady, self.covered, self.short, self.lumpy = [
+            self.create_product(name, stock)
+            for name, stock in (("Soap", 10), ("Salt", 0), ("Rice", 5), ("Oil", 50))
+        ]
+
+        # Two units a day of each, and 0 and 4 on alternate days of oil
+        for offset in range(self.history_days + 1):
+            sale = Sale.objects.create(trans_date=self.today - timedelta(days=offset))
+            SaleDetail.objects.bulk_create(
+                SaleDetail(
+                    sale=sale,
+                    product=product,
+                    price=800,
+                    quantity=quantity,
+                    total_detail=800 * quantity,
+                )
+                for product, quantity in (
+                    (self.steady, 2),
+                    (self.covered, 2),
+                    (self.short, 2),
+                    (self.lumpy, 4 * (offset % 2)),
+                )
+                if quantity
+            )
+
+        # 15 of salt still to come, 5 of rice; received orders are on hand
+        self.purchase(self.covered, 20, received=5, status="partial")
+        self.purchase(self.short, 5)
+        self.purchase(self.short, 50, received=50, status="received")
+
+    def create_product(self, name, stock):
+        product = Product.objects.create(
+            name=name,
+            status="ACTIVE",
+            supplier=self.supplier,
+            cost=Decimal("500.00"),
+            price=Decimal("800.00"),
+        )
+        if stock:
+            record_stock_movements(
+                [
+                    StockMovement(
+                        product=product, kind=StockMovement.ADJUSTMENT, quantity=stock
+                    )
+                ]
+            )
+        return product
+
+    def purchase(self, product, quantity, received=0, status="pending"):
+        purchase_order = PurchaseOrder.objects.create(
+            supplier=self.supplier, status=status
+        )
+        PurchaseOrderItem.objects.create(
+            purchase_order=purchase_order,
+            product=product,
+            quantity=quantity,
+            received_quantity=received,
+        )
+
+    def plan(self):
+        return replenishment_plan(
+            lead_time_days=7,
+            review_days=14,
+            service_level=0.95,
+            history_days=self.history_days,
+            today=self.today,
+        )
+
+    def test_reorder_points_and_order_quantities(self):
+        plan = self.plan()
+        columns = ["safety_stock", "reorder_point", "on_hand", "on_order"]
+
+        # Steady demand needs no safety stock: 14 units over the lead time,
+        # ordered up to the 42 that last the lead and review periods
+        for product, position in (
+            (self.steady, [0, 14, 10, 0]),
+            (self.covered, [0, 14, 0, 15]),
+            (self.short, [0, 14, 5, 5]),
+        ):
+            with self.subTest(product=product.name):
+                self.assertEqual(plan.loc[product.pk, columns].tolist(), position)
+        self.assertEqual(plan.at[self.steady.pk, "order_quantity"], 32)
+        self.assertEqual(plan.at[self.covered.pk, "order_quantity"], 0)
+        self.assertEqual(plan.at[self.short.pk, "order_quantity"], 32)
+
+        # A daily deviation of 2 over 7 days at 95%: ceil(1.645 * 2 * sqrt(7))
+        self.assertEqual(plan.at[self.lumpy.pk, "safety_stock"], 9)
+        self.assertEqual(plan.at[self.lumpy.pk, "order_quantity"], 0)
+
+    def test_drafts_one_order_per_supplier(self):
+        purchase_orders = draft_purchase_orders(self.plan())
+
+        self.assertEqual(len(purchase_orders), 1)
+        self.assertEqual(
+            dict(
+                PurchaseOrderItem.objects.filter(
+                    purchase_order=purchase_orders[0]
+                ).values_list("product_id", "quantity")
+            ),
+            {self.steady.pk: 32, self.short.pk: 32},
+        )
@@ -34,4 +34,9 @@ urlpatterns = [
         views.purchase_order_update_status,
         name="purchase-order-update-status",
     ),
+    path(
+        "purchase-order/<int:pk>/receive/",
+        views.purchase_order_receive,
+        name="purchase-order-receive",
+    ),
 ]
@@ -1,17 +1,19 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import Q
+from django.db.models import Count, DecimalField, F, Q, Sum
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
 from .models import Supplier, PurchaseOrder, PurchaseOrderItem
 from .forms import SupplierForm, PurchaseOrderForm, PurchaseOrderItemForm
+from .services import receive_purchase_order
 from apps.authentication.decorators import (
     admin_or_manager_or_staff_required,
     admin_required,
 )
 from django.forms import modelformset_factory
 from django.views.decorators.http import require_POST
+from apps.main.exports import export_format, export_queryset
 
 
 # =================================== supplier list view ===================================
@@ -117,6 +119,19 @@ def supplier_delete(request, supplier_id):
 
 
 # =================================== purchase_orders_list ===================================
+PURCHASE_ORDERS_EXPORT_COLUMNS = (
+    ("PO Number", "id"),
+    ("Order Date", "order_date"),
+    ("Supplier", "supplier__name"),
+    ("Contact", "supplier__contact_name"),
+    ("Status", "status"),
+    ("Items", "item_count"),
+    ("Total Quantity", "total_quantity"),
+    ("Total Amount", "total_amount"),
+    ("Notes", "notes"),
+)
+
+
 @login_required
 @admin_or_manager_or_staff_required
 def purchase_orders_list(request):
@@ -131,6 +146,22 @@ def purchase_orders_list(request):
             )  # Searching by supplier's contact name
         )
 
+    export = export_format(request)
+    if export:
+        return export_queryset(
+            export,
+            "purchase_orders",
+            orders.annotate(
+                item_count=Count("items"),
+                total_quantity=Sum("items__quantity"),
+                total_amount=Sum(
+                    F("items__quantity") * F("items__unit_price"),
+                    output_field=DecimalField(max_digits=12, decimal_places=2),
+                ),
+            ),
+            PURCHASE_ORDERS_EXPORT_COLUMNS,
+        )
+
     paginator = Paginator(orders, 25)
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
@@ -252,8 +283,8 @@ def purchase_order_delete(request, purchase_order_id):
 
 # =================================== purchase_order_detail_delete ===================================
 def purchase_order_detail(request, pk):
-    order = get_object_or_404(PurchaseOrder, pk=pk)
-    items = order.items.all()  # Related PurchaseOrderItem objects
+    order = get_object_or_404(PurchaseOrder.objects.select_related("supplier"), pk=pk)
+    items = order.items.select_related("product")  # Related PurchaseOrderItem objects
     return render(
         request, "supplier/purchase_order_detail.html", {"order": order, "items": items}
     )
@@ -263,7 +294,19 @@ def purchase_order_detail(request, pk):
 def purchase_order_update_status(request, pk):
     order = get_object_or_404(PurchaseOrder, pk=pk)
     new_status = request.POST.get("status")
-    if new_status in dict(PurchaseOrder.STATUS_CHOICES).keys():
+    if new_status == "received":
+        # Receiving posts everything still outstanding into inventory
+        try:
+            receive_purchase_order(order.pk, user=request.user)
+        except ValueError as e:
+            messages.error(request, str(e), extra_tags="bg-danger")
+        else:
+            messages.success(
+                request,
+                f"Order #{order.id} received into inventory.",
+                extra_tags="bg-success",
+            )
+    elif new_status in dict(PurchaseOrder.STATUS_CHOICES).keys():
         order.status = new_status
         order.save()
         messages.success(
@@ -274,3 +317,28 @@ def purchase_order_update_status(request, pk):
     else:
         messages.error(request, "Invalid status selected.")
     return redirect("supplier:purchase-orders-list")
+
+
+# =================================== purchase order receive view ===================================
+@login_required
+@admin_or_manager_or_staff_required
+@require_POST
+def purchase_order_receive(request, pk):
+    """Post the delivered quantities (``received_<item id>`` fields) into inventory."""
+    order = get_object_or_404(PurchaseOrder, pk=pk)
+    try:
+        quantities = {
+            int(key.removeprefix("received_")): int(value or 0)
+            for key, value in request.POST.items()
+            if key.startswith("received_")
+        }
+        order, units = receive_purchase_order(order.pk, quantities, user=request.user)
+    except ValueError as e:
+        messages.error(request, str(e), extra_tags="bg-danger")
+    else:
+        messages.success(
+            request,
+            f"{units} units received into inventory for Order #{order.id}.",
+            extra_tags="bg-success",
+        )
+    return redirect("supplier:purchase-order-detail", pk=pk)
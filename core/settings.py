@@ -1,5 +1,6 @@
 # Importing Required Libraries
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 import dj_database_url
@@ -154,6 +155,44 @@ DATABASES = {
 }
 
 
+############################### CACHE CONFIGURATION ###############################
+
+# Shared cache for navbar counters and other short-lived computed values
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "pure-shopper",
+    }
+}
+
+# Storefront catalogue pages and product fragments (apps.products.catalogue).
+# CATALOGUE_CACHE_BACKEND is "locmem", "file" or "redis"; file and Redis
+# caches are shared between worker processes, locmem is per process.
+CATALOGUE_CACHE_BACKENDS = {
+    "locmem": (
+        "django.core.cache.backends.locmem.LocMemCache",
+        "pure-shopper-catalogue",
+    ),
+    "file": (
+        "django.core.cache.backends.filebased.FileBasedCache",
+        os.path.join(tempfile.gettempdir(), "pure-shopper-catalogue"),
+    ),
+    "redis": (
+        "django.core.cache.backends.redis.RedisCache",
+        os.getenv("REDIS_URL", "redis://127.0.0.1:6379/1"),
+    ),
+}
+CATALOGUE_CACHE_BACKEND, CATALOGUE_CACHE_LOCATION = CATALOGUE_CACHE_BACKENDS[
+    os.getenv("CATALOGUE_CACHE_BACKEND", "locmem")
+]
+CACHES["catalogue"] = {
+    "BACKEND": CATALOGUE_CACHE_BACKEND,
+    "LOCATION": os.getenv("CATALOGUE_CACHE_LOCATION", CATALOGUE_CACHE_LOCATION),
+    "TIMEOUT": int(os.getenv("CATALOGUE_CACHE_TIMEOUT", 15 * 60)),
+    "KEY_PREFIX": "catalogue",
+}
+
+
 ############################### STATIC AND MEDIA FILES CONFIGURATION ###############################
 
 # Local media storage
@@ -182,6 +221,28 @@ DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
 # Cloudinary media URL online
 MEDIA_URL = f"https://res.cloudinary.com/{CLOUDINARY_CLOUD_NAME}/"
 
+# Product image pipeline (apps.products.images). Uploads wait in the staging
+# directory until `python manage.py process_product_images` has stored their
+# resized variants, so the web and worker processes must share it.
+PRODUCT_IMAGE_STAGING_ROOT = Path(
+    os.getenv("PRODUCT_IMAGE_STAGING_ROOT", BASE_DIR / "media" / "staging")
+)
+# Where the variants are stored: Cloudinary when it is configured, otherwise
+# the local media directory, which works offline
+if CLOUDINARY_CLOUD_NAME:
+    PRODUCT_IMAGE_STORAGE = {
+        "BACKEND": "cloudinary_storage.storage.MediaCloudinaryStorage",
+        "OPTIONS": {},
+    }
+else:
+    PRODUCT_IMAGE_STORAGE = {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {
+            "location": MEDIA_ROOT / "products",
+            "base_url": f"{LOCAL_MEDIA_URL}products/",
+        },
+    }
+
 
 ############################### EMAIL CONFIGURATION ###############################
 
@@ -200,6 +261,29 @@ EMAIL_HOST_PASSWORD = os.getenv("EMAIL_PASS")
 ED_EMAIL = str(os.getenv("ED_EMAIL"))
 
 
+############################### MOBILE MONEY CONFIGURATION ###############################
+
+# MTN MoMo collection API (apps.orders.payments). Point MTN_BASE_URL at
+# `python manage.py fake_momo_server` to work without the sandbox.
+MTN_BASE_URL = os.getenv("MTN_BASE_URL", "https://sandbox.momodeveloper.mtn.com")
+MTN_TARGET_ENVIRONMENT = os.getenv("MTN_TARGET_ENVIRONMENT", "sandbox")
+MTN_CURRENCY = os.getenv("MTN_CURRENCY", "EUR")
+MTN_CLIENT_ID = os.getenv("MTN_CLIENT_ID")
+MTN_CLIENT_SECRET = os.getenv("MTN_CLIENT_SECRET")
+MTN_SUBSCRIPTION_KEY = os.getenv("MTN_SUBSCRIPTION_KEY")
+# Seconds to open a connection and to wait for a response
+MTN_CONNECT_TIMEOUT = float(os.getenv("MTN_CONNECT_TIMEOUT", 3.05))
+MTN_READ_TIMEOUT = float(os.getenv("MTN_READ_TIMEOUT", 10))
+
+# Public address of this site that payment providers call back, e.g.
+# https://shop.example.com; without it MoMo outcomes arrive by reconciliation
+PAYMENT_CALLBACK_BASE_URL = os.getenv("PAYMENT_CALLBACK_BASE_URL")
+# Flutterwave's webhook "secret hash", sent back in the verif-hash header
+FLUTTERWAVE_SECRET_HASH = os.getenv("FLUTTERWAVE_SECRET_HASH")
+# Currency Flutterwave checkouts charge in; webhooks in another are not settled
+FLUTTERWAVE_CURRENCY = os.getenv("FLUTTERWAVE_CURRENCY", "UGX")
+
+
 ############################### PASSWORD VALIDATION ###############################
 
 # Password validation